@@ -0,0 +1,65 @@
+"""Base of tests which are executed in synthetic git repositories."""
+
+import os
+import pathlib
+import platform
+import typing as t
+import unittest
+import unittest.mock
+
+import boilerplates.git_repo_tests
+import git
+
+
+@unittest.skipIf(
+    platform.system() == 'Windows' and platform.python_implementation() == 'PyPy',
+    'skipping as these tests fail on Windows with PyPy')
+class GitRepoTests(boilerplates.git_repo_tests.GitRepoTests):
+    """Execute each test case in a fresh git repository.
+
+    If tagged_version is set, the repository starts with one commit tagged with it.
+    """
+
+    repo: git.Repo
+    repo_path: pathlib.Path
+
+    tagged_version: t.Optional[str] = None
+
+    def setUp(self):
+        super().setUp()
+        self.default_branch_name = git.GitConfigParser(
+            read_only=True).get_value('init', 'defaultBranch', default='master')
+        self.git_init()
+        if self.tagged_version is not None:
+            self.git_commit_new_file()
+            self.repo.create_tag(self.tagged_version)
+
+    def patch(self, patcher: t.Any) -> None:
+        """Start a patcher from unittest.mock, and stop it at the end of the test case."""
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def patch_environ(self, variables: t.Mapping[str, str]) -> None:
+        """Set environment variables until the end of the test case."""
+        self.patch(unittest.mock.patch.dict(os.environ, variables))
+
+    def git_merge_tagged_branches(self, commits_after_tags: int = 1) -> None:
+        """Merge three branches with version tags into the default branch, tagged with v1.0.0.
+
+        The branches are tagged with v1.1.0, v1.3.0 and v1.2.0, which are followed by a given
+        number of commits. Then, there is one commit on the default branch before the merges,
+        and one after them.
+        """
+        self.git_commit_new_file()
+        self.repo.create_tag('v1.0.0')
+        for branch, version in (('a', '1.1.0'), ('b', '1.3.0'), ('c', '1.2.0')):
+            self.repo.git.checkout('-b', branch, self.default_branch_name)
+            self.git_commit_new_file()
+            self.repo.create_tag(f'v{version}')
+            for _ in range(commits_after_tags):
+                self.git_commit_new_file()
+        self.repo.git.checkout(self.default_branch_name)
+        self.git_commit_new_file()
+        for branch in ('a', 'b', 'c'):
+            self.repo.git.merge(branch)
+        self.git_commit_new_file()
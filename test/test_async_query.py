@@ -0,0 +1,124 @@
+"""Tests of asynchronous version queries."""
+
+import asyncio
+import re
+import unittest.mock
+
+import git
+
+import version_query.async_query
+from version_query.async_query import _predict_git_repo
+from version_query.git_files import InvalidGitRepositoryError, NoSuchPathError
+from version_query.git_query import GIT_BACKEND_ENVVAR, query_git_repo, predict_git_repo
+from version_query.query import query_folder, predict_folder
+from version_query.version import Version
+
+from .git_repo_tests import GitRepoTests
+
+
+def _version_str(version: Version) -> str:
+    return re.sub(r'dirty[0-9]{14}', 'dirty', version.to_str())
+
+
+class Tests(GitRepoTests):
+
+    def _assert_same_as_sync(self, path=None) -> str:
+        """Check that async queries of a folder give the same results as synchronous queries."""
+        if path is None:
+            path = self.repo_path
+        async_query = version_query.async_query
+
+        async def versions():
+            return await asyncio.gather(
+                async_query.query_folder(path), async_query.predict_folder(path),
+                async_query.query_git_repo(path), async_query.predict_git_repo(path),
+                return_exceptions=True)
+
+        queried, predicted, repo_queried, repo_predicted = asyncio.run(versions())
+        for async_version, function in (
+                (queried, query_folder), (repo_queried, query_git_repo),
+                (predicted, predict_folder), (repo_predicted, predict_git_repo)):
+            try:
+                version = function(path)
+            except ValueError:
+                self.assertIsInstance(async_version, ValueError)
+                continue
+            self.assertIsInstance(async_version, Version)
+            self.assertEqual(_version_str(async_version), _version_str(version))
+        return _version_str(repo_predicted)
+
+    def test_repo_states(self):
+        self.git_commit_new_file()
+        self.assertEqual(self._assert_same_as_sync(), f'0.1.0.dev1+git{self.repo_head_hexsha}')
+        self.repo.create_tag('v1.0.0')
+        self.assertEqual(self._assert_same_as_sync(), '1.0.0')
+        path = self.git_commit_new_file()
+        tag = self.repo.create_tag('v1.1.0', message='annotated tag')
+        self.repo.create_tag('v1.2.0', ref=tag.tag, message='tag of annotated tag')
+        self.git_commit_new_file()
+        self.assertEqual(self._assert_same_as_sync(), f'1.2.1.dev1+git{self.repo_head_hexsha}')
+        self.git_modify_file(path)
+        self.assertEqual(
+            self._assert_same_as_sync(), f'1.2.1.dev1+git{self.repo_head_hexsha}.dirty')
+        self.git_modify_file(path, add=True)
+        self.assertEqual(
+            self._assert_same_as_sync(), f'1.2.1.dev1+git{self.repo_head_hexsha}.dirty')
+        folder = self.repo_path.joinpath('folder')
+        folder.mkdir()
+        self._assert_same_as_sync(folder)
+
+    def test_merged_branches(self):
+        self.git_merge_tagged_branches(commits_after_tags=3)
+        with unittest.mock.patch.object(version_query.async_query, '_COMMITS_READ_AT_ONCE', 1):
+            self.assertEqual(
+                self._assert_same_as_sync(), f'1.3.1.dev6+git{self.repo_head_hexsha}')
+
+    def test_no_repo(self):
+        with self.assertRaises(git.InvalidGitRepositoryError):
+            query_git_repo(self.repo_path.parent, False)
+        with self.assertRaises(git.InvalidGitRepositoryError):
+            asyncio.run(version_query.async_query.query_git_repo(self.repo_path.parent, False))
+        with self.assertRaises(git.NoSuchPathError):
+            predict_git_repo(self.repo_path / 'missing')
+        with self.assertRaises(git.NoSuchPathError):
+            asyncio.run(version_query.async_query.predict_git_repo(self.repo_path / 'missing'))
+        self.patch_environ({GIT_BACKEND_ENVVAR: 'files'})
+        with self.assertRaises(InvalidGitRepositoryError):
+            asyncio.run(version_query.async_query.query_git_repo(self.repo_path.parent, False))
+        with self.assertRaises(NoSuchPathError):
+            asyncio.run(version_query.async_query.predict_git_repo(self.repo_path / 'missing'))
+
+    def test_concurrency_limit(self):
+        self.git_commit_new_file()
+        self.repo.create_tag('v1.0.0')
+        queries_count = 0
+        max_queries_count = 0
+
+        async def counting_predict_git_repo(*args):
+            nonlocal queries_count, max_queries_count
+            queries_count += 1
+            max_queries_count = max(max_queries_count, queries_count)
+            try:
+                return await _predict_git_repo(*args)
+            finally:
+                queries_count -= 1
+
+        async def predicted_versions():
+            semaphore = asyncio.Semaphore(3)
+            return await asyncio.gather(*[
+                version_query.async_query.predict_folder(self.repo_path, semaphore=semaphore)
+                for _ in range(12)])
+
+        with unittest.mock.patch.object(
+                version_query.async_query, '_predict_git_repo', counting_predict_git_repo):
+            versions = asyncio.run(predicted_versions())
+        self.assertEqual({version.to_str() for version in versions}, {'1.0.0'})
+        self.assertEqual(max_queries_count, 3)
+
+    def test_files_backend(self):
+        self.git_commit_new_file()
+        self.repo.create_tag('v1.0.0')
+        self.patch_environ({GIT_BACKEND_ENVVAR: 'files'})
+        with unittest.mock.patch.object(asyncio, 'create_subprocess_exec') as create:
+            self.assertEqual(self._assert_same_as_sync(), '1.0.0')
+        create.assert_not_called()
@@ -0,0 +1,104 @@
+"""Tests of querying versions of many folders at once."""
+
+import contextlib
+import io
+import json
+import sys
+import threading
+import unittest
+import unittest.mock
+
+from version_query.batch import iter_query_many, query_many
+from version_query.main import main
+
+from .git_repo_tests import GitRepoTests
+
+
+class Tests(GitRepoTests):
+
+    tagged_version = 'v1.0.0'
+
+    def setUp(self):
+        super().setUp()
+        self.git_commit_new_file()
+        folder = self.repo_path.joinpath('folder')
+        folder.mkdir()
+        self.paths = [self.repo_path, folder, self.repo_path]
+
+    def test_query_many(self):
+        for use_processes in (False, True):
+            results = query_many(self.paths, jobs=2, use_processes=use_processes)
+            self.assertEqual([result.position for result in results], [0, 1, 2])
+            self.assertEqual([result.path for result in results], self.paths)
+            self.assertEqual(results[0].version.to_str(), '1.0.0')
+            self.assertIsNone(results[0].error)
+            self.assertIsNone(results[1].version)
+            self.assertIsInstance(results[1].error, ValueError)
+            self.assertEqual(results[2], results[0]._replace(position=2))
+
+    def test_predict_many(self):
+        results = query_many(self.paths, predict=True)
+        self.assertEqual(results[0].version.to_str(), f'1.0.1.dev1+git{self.repo_head_hexsha}')
+        self.assertEqual(results[0].version, results[1].version)
+        self.assertEqual(results[0].version, results[2].version)
+        unordered = list(iter_query_many(self.paths, predict=True, jobs=3, ordered=False))
+        self.assertCountEqual(unordered, results)
+
+    def test_paths_read_gradually(self):
+        first_result_ready = threading.Event()
+
+        def paths():
+            yield self.repo_path
+            self.assertTrue(first_result_ready.wait(timeout=30))
+            yield self.repo_path.joinpath('missing')
+            raise OSError('paths are not readable')
+
+        results = iter_query_many(paths(), with_context=True)
+        result = next(results)
+        first_result_ready.set()
+        self.assertEqual(result.version.to_str(), '1.0.0')
+        self.assertEqual(result.context.commit_distance, 1)
+        result = next(results)
+        self.assertIsNone(result.version)
+        self.assertIsNotNone(result.error)
+        self.assertIsNone(result.context)
+        with self.assertRaises(OSError):
+            next(results)
+
+    def test_cli_json(self):
+        missing_path = self.repo_path.joinpath('missing')
+        stdin = io.StringIO(f'{self.repo_path}\n\n{missing_path}\n')
+        sio = io.StringIO()
+        with unittest.mock.patch.object(sys, 'stdin', stdin), \
+                contextlib.redirect_stdout(sio), self.assertRaises(ValueError):
+            main(['--json', '-p', '-j', '2', str(self.repo_path), '-'])
+        records = [json.loads(line) for line in sio.getvalue().splitlines()]
+        self.assertEqual(len(records), 3)
+        self.assertEqual(records[0], records[1])
+        self.assertEqual(records[0], {
+            'path': str(self.repo_path), 'version': f'1.0.1.dev1+git{self.repo_head_hexsha}',
+            'tag': 'v1.0.0', 'commit': self.repo.tags['v1.0.0'].commit.hexsha,
+            'commit_distance': 1, 'is_dirty': False, 'head_commit': self.repo.head.commit.hexsha,
+            'error': None})
+        self.assertEqual(records[2]['path'], str(missing_path))
+        self.assertIsNone(records[2]['version'])
+        self.assertIsNotNone(records[2]['error'])
+        sio = io.StringIO()
+        with contextlib.redirect_stdout(sio):
+            main(['--json', '--increment', str(self.repo_path)])
+        self.assertEqual(json.loads(sio.getvalue())['version'], '1.0.1')
+        with self.assertRaises(ValueError):
+            main(['--json', '--context', str(self.repo_path)])
+
+    def test_cli(self):
+        sio = io.StringIO()
+        with contextlib.redirect_stdout(sio):
+            main(['--jobs', '2', '--increment', str(self.repo_path), str(self.repo_path)])
+        self.assertEqual(sio.getvalue().splitlines(), [f'{self.repo_path} 1.0.1'] * 2)
+        sio = io.StringIO()
+        with contextlib.redirect_stdout(sio), contextlib.redirect_stderr(io.StringIO()), \
+                self.assertRaises(ValueError):
+            main(['-j', '2', *map(str, self.paths)])
+        self.assertEqual(len(sio.getvalue().splitlines()), 2)
+        with self.assertRaises(ValueError):
+            main(['--jobs', '0', str(self.repo_path), str(self.repo_path)])
@@ -0,0 +1,126 @@
+"""Tests of version query daemon and its client."""
+
+import contextlib
+import io
+import json
+import os
+import pathlib
+import shutil
+import socket
+import tempfile
+import threading
+import unittest
+import unittest.mock
+
+import version_query.git_cache
+import version_query.service
+from version_query.daemon_client import SOCKET_ENVVAR, daemon_request, default_socket_path
+from version_query.main import main
+from version_query.query import query_folder, predict_folder, folder_version_context
+
+from .git_repo_tests import GitRepoTests
+
+if hasattr(socket, 'AF_UNIX'):
+    import version_query.daemon
+
+
+@unittest.skipUnless(hasattr(socket, 'AF_UNIX'), 'skipping as Unix sockets are not available')
+class Tests(GitRepoTests):
+
+    tagged_version = 'v1.0.0'
+
+    def setUp(self):
+        super().setUp()
+        socket_folder = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, socket_folder)
+        self.socket_path = pathlib.Path(socket_folder, 'daemon.sock')
+        self.patch_environ({SOCKET_ENVVAR: str(self.socket_path)})
+
+    def _start_daemon(self) -> 'version_query.daemon.VersionQueryDaemon':
+        daemon = version_query.daemon.VersionQueryDaemon()
+        thread = threading.Thread(target=daemon.serve_forever)
+        thread.start()
+
+        def stop():
+            daemon.shutdown()
+            thread.join()
+            daemon.server_close()
+
+        self.addCleanup(stop)
+        return daemon
+
+    def test_default_socket_path(self):
+        self.assertEqual(default_socket_path(), self.socket_path)
+        with unittest.mock.patch.dict(os.environ, {SOCKET_ENVVAR: ''}):
+            self.assertNotEqual(default_socket_path(), self.socket_path)
+
+    def test_no_daemon(self):
+        self.assertIsNone(daemon_request('query_folder', self.repo_path))
+        self.socket_path.touch()
+        self.assertIsNone(daemon_request('query_folder', self.repo_path))
+
+    def test_requests(self):
+        daemon = self._start_daemon()
+        self.assertEqual(self.socket_path.stat().st_mode & 0o777, 0o600)
+        for _ in range(2):
+            self.assertEqual(daemon_request('query_folder', self.repo_path), '1.0.0')
+            self.assertEqual(daemon_request('predict_folder', self.repo_path), '1.0.0')
+        self.assertEqual(daemon_request('folder_version_context', self.repo_path),
+                         folder_version_context(self.repo_path).to_dict())
+        path = self.git_commit_new_file()
+        self.assertEqual(daemon_request('predict_folder', self.repo_path),
+                         predict_folder(self.repo_path).to_str())
+        self.git_modify_file(path)
+        self.assertIn('dirty', daemon_request('predict_folder', self.repo_path))
+        folder = self.repo_path.joinpath('folder')
+        folder.mkdir()
+        self.assertEqual(daemon_request('query_folder', folder, True), '1.0.0')
+        with self.assertRaises(ValueError):
+            query_folder(folder)
+        with self.assertRaises(ValueError):
+            daemon_request('query_folder', folder)
+        self.assertIsNone(daemon_request('query_folder', self.repo_path.joinpath('missing')))
+        self.assertEqual(daemon.answer(b'{"function": "main", "path": "/"}')['type'],
+                         'ValueError')
+        self.assertEqual(daemon.answer(b'not json')['type'], 'ValueError')
+
+    def test_invalidation(self):
+        daemon = self._start_daemon()
+        with unittest.mock.patch.object(version_query.service, '_RACY_INTERVAL_NS', 0), \
+                unittest.mock.patch.object(version_query.git_cache, '_RACY_INTERVAL_NS', 0):
+            for _ in range(3):
+                self.assertEqual(daemon_request('predict_folder', self.repo_path), '1.0.0')
+            self.assertGreater(daemon.service.statistics()['hits'], 0)
+            self.repo.create_tag('v1.1.0')
+            self.assertEqual(daemon_request('predict_folder', self.repo_path), '1.1.0')
+            self.git_commit_new_file()
+            self.assertEqual(daemon_request('predict_folder', self.repo_path),
+                             f'1.1.1.dev1+git{self.repo_head_hexsha}')
+            self.repo.git.pack_refs('--all')
+            self.repo.create_tag('v1.2.0')
+            self.assertEqual(daemon_request('predict_folder', self.repo_path), '1.2.0')
+
+    def test_cli(self):
+        daemon = self._start_daemon()
+        context = json.dumps(folder_version_context(self.repo_path).to_dict())
+        for option, output in (('-p', '1.0.0'), ('-i', '1.0.1'), ('-c', context)):
+            sio = io.StringIO()
+            with contextlib.redirect_stdout(sio):
+                main([option, str(self.repo_path)])
+            self.assertEqual(sio.getvalue().rstrip('\n'), output)
+        self.assertEqual(daemon.service.statistics()['misses'], 3)
+
+    def test_existing_socket(self):
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as stale_socket:
+            stale_socket.bind(str(self.socket_path))
+        self.assertIsNone(daemon_request('query_folder', self.repo_path))
+        self._start_daemon()
+        self.assertEqual(daemon_request('query_folder', self.repo_path), '1.0.0')
+        with self.assertRaises(ValueError):
+            version_query.daemon.VersionQueryDaemon()
+
+    def test_not_a_socket(self):
+        self.socket_path.touch()
+        with self.assertRaises(ValueError):
+            version_query.daemon.VersionQueryDaemon()
+        self.assertTrue(self.socket_path.is_file())
@@ -1,34 +1,46 @@
 """Tests of adversarial git repos."""
 
+import contextlib
+import io
 import itertools
+import json
 import logging
 import os
-import platform
+import pathlib
+import runpy
+import subprocess
+import sys
 import unittest
+import unittest.mock
 
-import boilerplates.git_repo_tests
 import git
 
+import version_query.git_query
+
 from version_query.version import VersionComponent, Version
-from version_query.git_query import query_git_repo, predict_git_repo
+from version_query.git_python_backends import GitCliBackend, _GitCommitStream
+from version_query.git_commit_graph import GitCommitGraph
+from version_query.git_query import \
+    _GitVersionTagIndex, _GitHistoryWalk, _described_git_version_tag, \
+    _latest_git_version_tag, _open_git_repo, GIT_BACKEND_ENVVAR, query_git_repo, predict_git_repo, \
+    query_git_revisions, predict_git_revisions, git_repo_version_context
+from version_query.git_files import GitFilesRepo, InvalidGitRepositoryError, NoSuchPathError
+from version_query.main import main
+from version_query.query import \
+    _caller_versions, _caller_git_results, query_folder, predict_folder
+
+from .git_repo_tests import GitRepoTests
 
 _LOG = logging.getLogger(__name__)
 
 
-@unittest.skipIf(
-    platform.system() == 'Windows' and platform.python_implementation() == 'PyPy',
-    'skipping as these tests fail on Windows with PyPy')
-class Tests(boilerplates.git_repo_tests.GitRepoTests):
+class Tests(GitRepoTests):
     """Test suite for automated tests of generated git repositories.
 
     Each case is executed in a fresh empty repository.
     """
 
-    def setUp(self):
-        super().setUp()
-        self.default_branch_name = git.GitConfigParser(
-            read_only=True).get_value('init', 'defaultBranch', default='master')
-        self.git_init()
+    # pylint: disable = too-many-public-methods
 
     def test_empty_repo(self):
         with self.assertRaises(ValueError):
@@ -239,3 +251,429 @@ class Tests(boilerplates.git_repo_tests.GitRepoTests):
         self.assertEqual(current_version.to_str(), '0.1.0')
         upcoming_version = predict_git_repo(self.repo_path)
         self.assertEqual(upcoming_version.to_str(), f'0.1.1.dev1+git{self.repo_head_hexsha}')
+
+    def test_tag_index(self):
+        self.git_commit_new_file()
+        tag_index = _GitVersionTagIndex(self.repo)
+        self.assertFalse(tag_index)
+        with self.assertRaises(ValueError):
+            _latest_git_version_tag(self.repo, tag_index=tag_index)
+        self.repo.create_tag('v0.1.0')
+        self.repo.create_tag('v0.2.0')
+        self.repo.create_tag('release')
+        self.git_commit_new_file()
+        tag_index = _GitVersionTagIndex(self.repo)
+        self.assertTrue(tag_index)
+        self.assertEqual(len(tag_index.commits), 1)
+        commit = self.repo.head.commit.parents[0].hexsha
+        self.assertIn(commit, tag_index)
+        self.assertNotIn(self.repo.head.commit.hexsha, tag_index)
+        self.assertEqual({tag: version.to_str()
+                          for tag, version in tag_index.tags_at(commit).items()},
+                         {'v0.1.0': '0.1.0', 'v0.2.0': '0.2.0'})
+        commit_, tag, version, distance = _latest_git_version_tag(self.repo, tag_index=tag_index)
+        self.assertEqual(commit_, commit)
+        self.assertEqual(tag, 'v0.2.0')
+        self.assertEqual(version, query_git_repo(self.repo_path))
+        self.assertEqual(distance, 1)
+
+    def test_tags_on_many_merged_branches(self):
+        self.git_merge_tagged_branches()
+        current_version = query_git_repo(self.repo_path)
+        self.assertEqual(current_version.to_str(), '1.3.0')
+        upcoming_version = predict_git_repo(self.repo_path)
+        self.assertEqual(upcoming_version.to_str(), f'1.3.1.dev4+git{self.repo_head_hexsha}')
+
+    def test_tags_on_octopus_merged_branches(self):
+        self.git_commit_new_file()
+        self.repo.create_tag('v1.0.0')
+        for branch, version in (('a', '1.1.0'), ('b', '1.2.0'), ('c', '1.1.5')):
+            self.repo.git.checkout('-b', branch, self.default_branch_name)
+            self.git_commit_new_file()
+            self.repo.create_tag(f'v{version}')
+        self.repo.git.checkout(self.default_branch_name)
+        self.repo.git.merge('a', 'b', 'c')
+        self.assertEqual(len(self.repo.head.commit.parents), 3)
+        current_version = query_git_repo(self.repo_path)
+        self.assertEqual(current_version.to_str(), '1.2.0')
+        upcoming_version = predict_git_repo(self.repo_path)
+        self.assertEqual(upcoming_version.to_str(), f'1.2.1.dev1+git{self.repo_head_hexsha}')
+
+    def test_criss_cross_merges(self):
+        self.git_commit_new_file()
+        self.repo.create_tag('v0.1.0')
+        self.repo.create_head('devel')
+        self.git_commit_new_file()
+        self.repo.git.checkout('devel')
+        self.git_commit_new_file()
+        self.repo.create_tag('v0.2.0')
+        self.repo.git.checkout(self.default_branch_name)
+        self.repo.git.merge('devel')
+        for _ in range(2):
+            self.repo.git.checkout('devel')
+            self.git_commit_new_file()
+            self.repo.git.merge(self.default_branch_name)
+            self.repo.git.checkout(self.default_branch_name)
+            self.git_commit_new_file()
+            self.repo.git.merge('devel')
+        current_version = query_git_repo(self.repo_path)
+        self.assertEqual(current_version.to_str(), '0.2.0')
+        upcoming_version = predict_git_repo(self.repo_path)
+        self.assertEqual(upcoming_version.to_str(), f'0.2.1.dev5+git{self.repo_head_hexsha}')
+
+    def test_no_tags_on_merged_branches(self):
+        self.git_commit_new_file()
+        for branch in ('a', 'b'):
+            self.repo.git.checkout('-b', branch, self.default_branch_name)
+            self.git_commit_new_file()
+            self.git_commit_new_file()
+        self.repo.git.checkout(self.default_branch_name)
+        self.repo.git.merge('a', 'b')
+        with self.assertRaises(ValueError):
+            query_git_repo(self.repo_path)
+        upcoming_version = predict_git_repo(self.repo_path)
+        self.assertEqual(upcoming_version.to_str(), f'0.1.0.dev4+git{self.repo_head_hexsha}')
+
+    def test_annotated_tags(self):
+        self.git_commit_new_file()
+        self.repo.create_tag('v0.1.0', message='lightweight tags are not the only option')
+        self.git_commit_new_file()
+        tag = self.repo.create_tag('v0.2.0', message='annotated tag')
+        self.repo.create_tag('v0.3.0', ref=tag.tag, message='tag of annotated tag')
+        self.repo.create_tag('v1.0.0', ref=self.repo.head.commit.tree, message='tag of tree')
+        self.git_commit_new_file()
+        tag_index = _GitVersionTagIndex(self.repo)
+        self.assertEqual(len(tag_index.commits), 2)
+        self.assertEqual(
+            sorted(tag_index.tags_at(self.repo.head.commit.parents[0].hexsha)),
+            ['v0.2.0', 'v0.3.0'])
+        current_version = query_git_repo(self.repo_path)
+        self.assertEqual(current_version.to_str(), '0.3.0')
+        upcoming_version = predict_git_repo(self.repo_path)
+        self.assertEqual(upcoming_version.to_str(), f'0.3.1.dev1+git{self.repo_head_hexsha}')
+
+    def test_commit_stream(self):
+        for _ in range(3):
+            self.git_commit_new_file()
+        commit = self.repo.head.commit
+        commits = _GitCommitStream(self.repo)
+        self.assertEqual(commits.parents(commit.hexsha), (commit.parents[0].hexsha,))
+        commits.close()
+        self.assertIsNotNone(commits._process.proc.poll())  # pylint: disable = protected-access
+        with _GitCommitStream(self.repo) as commits:
+            self.assertEqual(commits.parents(commit.parents[0].parents[0].hexsha), ())
+            with self.assertRaises(ValueError):
+                commits.parents('0' * 40)
+
+    def test_described_version_tag(self):
+        self.git_commit_new_file()
+        self.repo.create_tag('v0.1.0')
+        self.repo.create_tag('v0.2.0', message='annotated tag')
+        self.git_commit_new_file()
+        self.repo.create_tag('v0.3.0_invalid')
+        self.git_commit_new_file()
+        head = self.repo.head.commit
+        tag_index = _GitVersionTagIndex(self.repo)
+        self.assertIsNone(_described_git_version_tag(self.repo, tag_index, head.hexsha))
+        self.repo.delete_tag('v0.3.0_invalid')
+        _, tag, version, distance = _described_git_version_tag(
+            self.repo, tag_index, head.hexsha)
+        self.assertEqual(tag, 'v0.2.0')
+        self.assertEqual(version.to_str(), '0.2.0')
+        self.assertEqual(distance, 2)
+        self.repo.create_head('devel', head.parents[0])
+        self.repo.git.checkout('devel')
+        self.git_commit_new_file()
+        self.repo.git.checkout(self.default_branch_name)
+        self.repo.git.merge('devel')
+        self.assertIsNone(_described_git_version_tag(
+            self.repo, tag_index, self.repo.head.commit.hexsha))
+        upcoming_version = predict_git_repo(self.repo_path)
+        self.assertEqual(upcoming_version.to_str(), f'0.2.1.dev3+git{self.repo_head_hexsha}')
+
+    def test_commit_graph_skipped_branch(self):
+        self.git_commit_new_file()
+        self.repo.create_tag('v1.0.0')
+        self.repo.create_head('devel')
+        self.git_commit_new_file()
+        self.git_commit_new_file()
+        self.repo.create_tag('v2.0.0')
+        self.git_commit_new_file()
+        self.repo.git.checkout('devel')
+        self.git_commit_new_file()
+        self.repo.create_tag('v1.0.5')
+        self.repo.git.checkout(self.default_branch_name)
+        self.repo.git.merge('devel')
+        for write_commit_graph, skipped_branches in ((False, 0), (True, 1)):
+            if write_commit_graph:
+                self.repo.git.commit_graph('write', '--reachable')
+            commit_graph = GitCommitGraph.open(pathlib.Path(self.repo.common_dir, 'objects'))
+            self.assertEqual(commit_graph is not None, write_commit_graph)
+            with _GitCommitStream(self.repo, commit_graph=commit_graph) as commits:
+                walk = _GitHistoryWalk(self.repo, commits, _GitVersionTagIndex(self.repo))
+                _, tag, _, distance = walk.run(self.repo.head.commit.hexsha)
+            self.assertEqual(walk.skipped_branches, skipped_branches)
+            self.assertEqual(tag, 'v2.0.0')
+            self.assertEqual(distance, 2)
+            upcoming_version = predict_git_repo(self.repo_path)
+            self.assertEqual(upcoming_version.to_str(), f'2.0.1.dev2+git{self.repo_head_hexsha}')
+
+    def test_revisions(self):
+        self.git_commit_new_file()
+        self.repo.create_tag('v1.0.0', message='annotated tag')
+        self.repo.create_head('devel')
+        for _ in range(3):
+            self.git_commit_new_file()
+        self.repo.git.checkout('devel')
+        self.git_commit_new_file()
+        self.repo.create_tag('v1.1.0')
+        self.git_commit_new_file()
+        self.repo.git.checkout(self.default_branch_name)
+        self.repo.git.merge('devel')
+        for _ in range(2):
+            self.git_commit_new_file()
+        revisions = ['HEAD', 'HEAD~1', 'HEAD~2^2', 'devel', 'v1.1.0', 'v1.0.0^0',
+                     f'{self.default_branch_name}~4', self.repo.tags['v1.0.0'].commit.hexsha,
+                     'v1.0.0..HEAD']
+        with unittest.mock.patch.object(
+                _GitHistoryWalk, 'run', autospec=True, side_effect=_GitHistoryWalk.run) as run:
+            queried = query_git_revisions(self.repo_path, revisions)
+            predicted = predict_git_revisions(self.repo_path, revisions)
+            self.assertLessEqual(run.call_count, 2 * 4)
+        commits = self.repo.git.rev_list('v1.0.0..HEAD').split()
+        self.assertEqual(list(queried)[:len(revisions) - 1], revisions[:-1])
+        self.assertCountEqual(list(queried)[len(revisions) - 1:], commits)
+        self.assertEqual(list(predicted), list(queried))
+        for revision in revisions[:-1] + commits:
+            commit = self.repo.commit(revision).hexsha
+            with self.subTest(revision=revision):
+                *_, version, distance = _latest_git_version_tag(self.repo, False, commit)
+                self.assertEqual(queried[revision], version)
+                *_, version, distance = _latest_git_version_tag(self.repo, True, commit)
+                if distance > 0:
+                    version.devel_increment(distance)
+                    version.local = (f'git{commit[:8]}',)
+                self.assertEqual(predicted[revision], version)
+        self.assertEqual(predicted['HEAD'], predict_git_repo(self.repo_path))
+        self.assertEqual(predicted['devel'].to_str(),
+                         f'1.1.1.dev1+git{self.repo.heads.devel.commit.hexsha[:8]}')
+        self.assertEqual(queried['HEAD~2^2'].to_str(), '1.1.0')
+        sio = io.StringIO()
+        with contextlib.redirect_stdout(sio):
+            main(['revisions', '--predict', '--repo', str(self.repo_path), 'HEAD', 'devel'])
+        self.assertEqual(sio.getvalue(), f'HEAD {predicted["HEAD"]}\ndevel {predicted["devel"]}\n')
+
+    def test_invalid_revisions(self):
+        self.git_commit_new_file()
+        with self.assertRaises(ValueError):
+            query_git_revisions(self.repo_path, ['HEAD'])
+        self.repo.create_tag('v1.0.0')
+        for revision in ('no_such_branch', 'HEAD~5', 'HEAD^2', 'HEAD^{tree}'):
+            with self.subTest(revision=revision), self.assertRaises(ValueError):
+                predict_git_revisions(self.repo_path, [revision])
+        self.assertEqual(query_git_revisions(self.repo_path, ['HEAD..HEAD']), {})
+
+    def test_untagged_revisions(self):
+        self.git_commit_new_file()
+        self.repo.create_head('untagged')
+        self.git_commit_new_file()
+        self.repo.create_tag('v1.0.0')
+        self.git_commit_new_file()
+        queried = query_git_revisions(self.repo_path, ['HEAD', 'untagged', 'HEAD~2..HEAD'])
+        self.assertEqual({revision: None if version is None else version.to_str()
+                          for revision, version in queried.items()},
+                         {'HEAD': '1.0.0', 'untagged': None,
+                          self.repo.head.commit.hexsha: '1.0.0',
+                          self.repo.tags['v1.0.0'].commit.hexsha: '1.0.0'})
+        predicted = predict_git_revisions(self.repo_path, ['untagged'])
+        self.assertEqual(predicted['untagged'].to_str(),
+                         f'0.1.0.dev1+git{self.repo.heads.untagged.commit.hexsha[:8]}')
+        sio = io.StringIO()
+        with contextlib.redirect_stdout(sio), self.assertRaisesRegex(ValueError, 'untagged'):
+            main(['revisions', '--repo', str(self.repo_path), 'untagged', 'HEAD'])
+        self.assertEqual(sio.getvalue(), 'HEAD 1.0.0\n')
+
+    def test_revisions_git_executable(self):
+        self.git_commit_new_file()
+        backend = GitCliBackend(self.repo)
+        self.assertEqual(backend.revision_commits('HEAD'), [self.repo.head.commit.hexsha])
+        with unittest.mock.patch.object(git.Git, 'GIT_PYTHON_GIT_EXECUTABLE', 'no_such_git'):
+            for revision in ('HEAD', 'HEAD..HEAD'):
+                with self.subTest(revision=revision), self.assertRaises(git.GitCommandNotFound):
+                    backend.revision_commits(revision)
+
+    def test_folder_in_repo(self):
+        self.git_commit_new_file()
+        self.repo.create_tag('v1.0.0')
+        folder = self.repo_path.joinpath('src', 'package', 'module')
+        folder.mkdir(parents=True)
+        with unittest.mock.patch.object(
+                version_query.git_query, '_open_git_repo', autospec=True,
+                side_effect=_open_git_repo) as open_git_repo:
+            self.assertEqual(predict_folder(folder).to_str(), '1.0.0')
+            self.assertEqual(query_folder(folder, True).to_str(), '1.0.0')
+            self.assertEqual(open_git_repo.call_count, 2)
+        self.assertEqual(open_git_repo.call_args.args[0], self.repo_path)
+        with self.assertRaises(ValueError):
+            query_folder(folder)
+
+    def test_callers_in_repo(self):
+        self.git_commit_new_file()
+        self.repo.create_tag('v1.0.0')
+        paths = []
+        for i in range(20):
+            folder = self.repo_path.joinpath('package', f'subpackage_{i % 4}')
+            folder.mkdir(parents=True, exist_ok=True)
+            paths.append(folder.joinpath(f'module_{i}.py'))
+            paths[-1].write_text('from version_query import predict_version_str\n'
+                                 'VERSION = predict_version_str()\n', encoding='utf-8')
+        with unittest.mock.patch.dict(_caller_versions, clear=True), \
+                unittest.mock.patch.dict(_caller_git_results, clear=True), \
+                unittest.mock.patch.object(
+                    version_query.git_query, 'predict_git_repo', autospec=True,
+                    side_effect=version_query.git_query.predict_git_repo) as predict:
+            versions = {runpy.run_path(str(path))['VERSION'] for path in paths}
+        self.assertEqual(versions, {'1.0.0'})
+        self.assertEqual(predict.call_count, 1)
+
+    def test_version_context(self):
+        path = self.git_commit_new_file()
+        context = git_repo_version_context(self.repo_path)
+        self.assertIsNone(context.tag)
+        with self.assertRaises(ValueError):
+            _ = context.queried
+        self.assertEqual(context.predicted, predict_git_repo(self.repo_path))
+        self.assertIsNone(context.to_dict()['queried'])
+        self.repo.create_tag('v1.0.0')
+        for _ in range(2):
+            self.git_commit_new_file()
+        with unittest.mock.patch.object(
+                _GitHistoryWalk, 'run', autospec=True, side_effect=_GitHistoryWalk.run) as run:
+            context = git_repo_version_context(self.repo_path)
+            self.assertLessEqual(run.call_count, 1)
+        self.assertEqual((context.tag, context.commit_distance), ('v1.0.0', 2))
+        self.assertEqual(context.head_commit, self.repo.head.commit.hexsha)
+        self.assertFalse(context.is_dirty)
+        self.assertEqual(context.queried, query_git_repo(self.repo_path))
+        self.assertEqual(context.predicted, predict_git_repo(self.repo_path))
+        self.git_modify_file(path)
+        context = git_repo_version_context(self.repo_path)
+        self.assertTrue(context.is_dirty)
+        self.assertEqual(context.queried.to_str(), '1.0.0')
+        self.assertRegex(context.predicted.to_str(),
+                         rf'^1\.0\.1\.dev2\+git{self.repo_head_hexsha}\.dirty[0-9]{{14}}$')
+        sio = io.StringIO()
+        with contextlib.redirect_stdout(sio):
+            main(['--context', str(self.repo_path)])
+        output = json.loads(sio.getvalue())
+        self.assertEqual(output['queried'], '1.0.0')
+        self.assertEqual(output['tag'], 'v1.0.0')
+        self.assertTrue(output['is_dirty'])
+        with self.assertRaises(ValueError):
+            main(['--context', '--predict', str(self.repo_path)])
+
+
+class FilesBackendTests(Tests):
+    """Run the same test suite, but read repositories directly from their files."""
+
+    def setUp(self):
+        super().setUp()
+        self.patch_environ({GIT_BACKEND_ENVVAR: 'files'})
+
+    def test_invalid_backend(self):
+        self.git_commit_new_file()
+        self.repo.create_tag('v1.0.0')
+        with unittest.mock.patch.dict(os.environ, {GIT_BACKEND_ENVVAR: 'telepathy'}):
+            with self.assertRaises(ValueError):
+                query_git_repo(self.repo_path)
+
+    def test_not_a_repo(self):
+        with self.assertRaises(NoSuchPathError):
+            query_git_repo(self.repo_path.joinpath('no_such_folder'))
+        with self.assertRaises(InvalidGitRepositoryError):
+            query_git_repo(self.repo_path.parent, search_parent_directories=False)
+
+    def test_without_git(self):
+        self.git_commit_new_file()
+        self.repo.create_tag('v1.0.0')
+        self.git_commit_new_file()
+        code = ('import pathlib, sys\n'
+                'from version_query.query import predict_folder, query_folder\n'
+                'path = pathlib.Path(sys.argv[1])\n'
+                'print(query_folder(path), predict_folder(path).to_str().partition("+")[0])\n'
+                'assert "git" not in sys.modules\n')
+        result = subprocess.run(
+            [sys.executable, '-c', code, str(self.repo_path)], capture_output=True, text=True,
+            check=False, env={**os.environ, 'PATH': '', GIT_BACKEND_ENVVAR: 'files'})
+        self.assertEqual(result.returncode, 0, result.stderr)
+        self.assertEqual(result.stdout.split(), ['1.0.0', '1.0.1.dev1'])
+
+    def test_stored_tag_index(self):
+        self.git_commit_new_file()
+        self.repo.create_tag('v0.1.0')
+        tag = self.repo.create_tag('v0.2.0', message='annotated tag')
+        self.repo.create_tag('v0.3.0', ref=tag.tag, message='tag of annotated tag')
+        self.repo.create_tag('v1.0.0', ref=self.repo.head.commit.tree, message='tag of tree')
+        self.git_commit_new_file()
+        self.repo.create_tag('release')
+        self.repo.git.pack_refs('--all')
+        self.repo.create_tag('v0.4.0')
+        with GitFilesRepo.open(self.repo_path) as repo:
+            self.assertEqual(_GitVersionTagIndex(repo).commits,
+                             _GitVersionTagIndex(self.repo).commits)
+
+    def test_dirty_repo_changes(self):
+        path = self.git_commit_new_file()
+        self.repo.create_tag('v1.0.0')
+        with GitFilesRepo.open(self.repo_path) as repo:
+            self.assertFalse(repo.is_dirty())
+            path.write_text('eggs\n', encoding='utf-8')
+            self.assertTrue(repo.is_dirty())
+            self.repo.git.add(path.name)
+            self.assertTrue(repo.is_dirty())
+            self.repo.git.reset('--hard')
+            self.assertFalse(repo.is_dirty())
+            path.unlink()
+            self.assertTrue(repo.is_dirty())
+            self.repo.git.checkout('--', path.name)
+            path.chmod(0o755)
+            self.assertEqual(repo.is_dirty(), self.repo.is_dirty())
+            path.chmod(0o644)
+            self.assertFalse(repo.is_dirty())
+            self.repo_path.joinpath('new_file').write_text('ham\n', encoding='utf-8')
+            for index_version in (2, 3, 4):
+                self.repo.git.update_index('--index-version', str(index_version))
+                self.assertFalse(repo.is_dirty())
+                self.repo.git.add('--intent-to-add', 'new_file')
+                self.assertTrue(repo.is_dirty())
+                self.repo.git.rm('--cached', 'new_file')
+
+
+class GitPythonBackendTests(Tests):
+    """Run the same test suite, but read refs and objects using object model of GitPython."""
+
+    def setUp(self):
+        super().setUp()
+        self.patch_environ({GIT_BACKEND_ENVVAR: 'gitpython'})
+
+    def test_backend_per_call(self):
+        self.git_commit_new_file()
+        self.repo.create_tag('v1.0.0', message='annotated tag')
+        path = self.git_commit_new_file()
+        self.git_modify_file(path)
+        contexts = {}
+        for backend in ('cli', 'gitpython', 'files'):
+            with self.subTest(backend=backend):
+                contexts[backend] = git_repo_version_context(self.repo_path, backend=backend)
+                versions = predict_git_revisions(
+                    self.repo_path, ['HEAD~1..HEAD'], backend=backend)
+                self.assertEqual({commit: version.to_str() for commit, version in versions.items()},
+                                 {self.repo.head.commit.hexsha:
+                                  f'1.0.1.dev1+git{self.repo_head_hexsha}'})
+        self.assertEqual({repr(_) for _ in contexts.values()}, {repr(contexts['cli'])})
+        self.assertTrue(contexts['cli'].is_dirty)
+        with unittest.mock.patch.object(git, 'Repo', wraps=git.Repo) as repo:
+            self.assertEqual(query_git_repo(self.repo_path, backend='files').to_str(), '1.0.0')
+        repo.assert_not_called()
+        with self.assertRaises(ValueError):
+            query_git_repo(self.repo_path, backend='telepathy')
@@ -0,0 +1,177 @@
+"""Tests of persistent cache of git query results."""
+
+import concurrent.futures
+import contextlib
+import io
+import json
+import os
+import pathlib
+import tempfile
+import unittest
+import unittest.mock
+
+from version_query.git_cache import CACHE_FILE_NAME, GitResultCache
+from version_query.git_query import \
+    _GitHistoryWalk, CACHE_ENVVAR, query_git_repo, predict_git_repo
+from version_query.main import main
+
+from .git_repo_tests import GitRepoTests
+
+
+def _put_many(git_dir: pathlib.Path, prefix: str, count: int) -> None:
+    cache = GitResultCache(git_dir)
+    for i in range(count):
+        cache.put(f'{prefix} {i}', i)
+
+
+def _counting_walks():
+    return unittest.mock.patch.object(
+        _GitHistoryWalk, 'run', autospec=True, side_effect=_GitHistoryWalk.run)
+
+
+class Tests(GitRepoTests):
+
+    tagged_version = 'v1.0.0'
+
+    def setUp(self):
+        super().setUp()
+        self.git_commit_new_file()
+        self.cache_path = pathlib.Path(self.repo.git_dir, CACHE_FILE_NAME)
+
+    def test_disabled(self):
+        with unittest.mock.patch.dict(os.environ, {CACHE_ENVVAR: '0'}):
+            query_git_repo(self.repo_path)
+            predict_git_repo(self.repo_path)
+        self.assertFalse(self.cache_path.exists())
+
+    def test_hit(self):
+        expected = (query_git_repo(self.repo_path), predict_git_repo(self.repo_path))
+        with unittest.mock.patch.dict(os.environ, {CACHE_ENVVAR: '1'}):
+            self.assertEqual((query_git_repo(self.repo_path),
+                              predict_git_repo(self.repo_path)), expected)
+        self.assertTrue(self.cache_path.is_file())
+        with _counting_walks() as run:
+            self.assertEqual((query_git_repo(self.repo_path, cache=True),
+                              predict_git_repo(self.repo_path, cache=True)), expected)
+            self.assertEqual(run.call_count, 0)
+
+    def test_invalidation(self):
+        self.assertEqual(query_git_repo(self.repo_path, cache=True).to_str(), '1.0.0')
+        self.repo.create_tag('v1.1.0')
+        self.assertEqual(query_git_repo(self.repo_path, cache=True).to_str(), '1.1.0')
+        self.git_commit_new_file()
+        predicted = predict_git_repo(self.repo_path, cache=True)
+        self.assertEqual(predicted.to_str(), f'1.1.1.dev1+git{self.repo_head_hexsha}')
+        self.repo.git.pack_refs('--all')
+        self.repo.create_tag('v2.0.0', force=True, ref='HEAD~1')
+        self.assertEqual(predict_git_repo(self.repo_path, cache=True).to_str(),
+                         f'2.0.1.dev1+git{self.repo_head_hexsha}')
+
+    def test_memo(self):
+        predict_git_repo(self.repo_path, cache=True)
+        for _ in range(3):
+            self.git_commit_new_file()
+        expected = predict_git_repo(self.repo_path)
+        with _counting_walks() as run:
+            self.assertEqual(predict_git_repo(self.repo_path, cache=True), expected)
+            self.assertEqual(run.call_count, 0)
+        self.assertEqual(expected.to_str(), f'1.0.1.dev4+git{self.repo_head_hexsha}')
+
+    def test_memo_after_merge(self):
+        predict_git_repo(self.repo_path, cache=True)
+        self.repo.create_head('devel').checkout()
+        self.git_commit_new_file()
+        self.repo.create_tag('v1.1.0')
+        self.repo.heads.master.checkout()
+        self.git_commit_new_file()
+        self.repo.git.merge('--no-ff', '-m', 'merged devel', 'devel')
+        self.git_commit_new_file()
+        expected = predict_git_repo(self.repo_path)
+        with _counting_walks() as run:
+            self.assertEqual(predict_git_repo(self.repo_path, cache=True), expected)
+            self.assertEqual(run.call_count, 1)
+        self.git_commit_new_file()
+        with _counting_walks() as run:
+            self.assertEqual(predict_git_repo(self.repo_path, cache=True).to_str(),
+                             f'1.1.1.dev3+git{self.repo_head_hexsha}')
+            self.assertEqual(run.call_count, 0)
+
+    def test_dirty(self):
+        with unittest.mock.patch('version_query.git_cache._RACY_INTERVAL_NS', 0):
+            clean = predict_git_repo(self.repo_path, cache=True)
+            path = self._repo_files[-1]
+            self.git_modify_file(path)
+            with _counting_walks() as run:
+                dirty = predict_git_repo(self.repo_path, cache=True)
+                self.assertEqual(run.call_count, 0)
+            self.assertNotEqual(dirty, clean)
+            self.assertEqual(dirty, predict_git_repo(self.repo_path))
+            self.assertEqual(predict_git_repo(self.repo_path, cache=True), dirty)
+            self.repo.git.checkout('--', path.name)
+            self.assertEqual(predict_git_repo(self.repo_path, cache=True), clean)
+
+    def test_racily_clean(self):
+        predict_git_repo(self.repo_path, cache=True)
+        entries = json.loads(self.cache_path.read_text(encoding='utf-8'))['entries']
+        self.assertFalse([_ for _ in entries if _.startswith('dirty ')])
+
+    def test_corrupted(self):
+        self.cache_path.write_text('{not json', encoding='utf-8')
+        expected = predict_git_repo(self.repo_path)
+        self.assertEqual(predict_git_repo(self.repo_path, cache=True), expected)
+        self.assertEqual(predict_git_repo(self.repo_path, cache=True), expected)
+
+    def test_unwritable(self):
+        expected = predict_git_repo(self.repo_path)
+        git_dir = pathlib.Path(self.repo.git_dir)
+        for module, function in ((os, 'replace'), (tempfile, 'NamedTemporaryFile')):
+            with self.subTest(function=function), unittest.mock.patch.object(
+                    module, function, side_effect=PermissionError('cache is read-only')):
+                self.assertEqual(predict_git_repo(self.repo_path, cache=True), expected)
+            self.assertFalse(self.cache_path.exists())
+            self.assertEqual(list(git_dir.glob(f'{CACHE_FILE_NAME}.*')), [])
+        self.assertEqual(predict_git_repo(self.repo_path, cache=True), expected)
+        self.assertTrue(self.cache_path.exists())
+
+    def test_concurrent_puts(self):
+        git_dir = pathlib.Path(self.repo.git_dir)
+        with concurrent.futures.ProcessPoolExecutor(4) as executor:
+            futures = [executor.submit(_put_many, git_dir, f'process{i}', 8) for i in range(4)]
+        with concurrent.futures.ThreadPoolExecutor(4) as executor:
+            futures += [executor.submit(_put_many, git_dir, f'thread{i}', 8) for i in range(4)]
+        for future in futures:
+            future.result()
+        cache = GitResultCache(git_dir)
+        for kind in ('process', 'thread'):
+            for i in range(4):
+                for j in range(8):
+                    self.assertEqual(cache.get(f'{kind}{i} {j}'), j)
+
+    def test_eviction(self):
+        cache = GitResultCache(pathlib.Path(self.repo.git_dir))
+        _put_many(pathlib.Path(self.repo.git_dir), 'key', 100)
+        self.assertIsNone(cache.get('key 0'))
+        self.assertEqual(cache.get('key 99'), 99)
+
+    def test_cli(self):
+        sio = io.StringIO()
+        with contextlib.redirect_stdout(sio):
+            main(['cache', 'warm', str(self.repo_path)])
+        self.assertEqual(sio.getvalue().rstrip(), predict_git_repo(self.repo_path).to_str())
+        with _counting_walks() as run:
+            query_git_repo(self.repo_path, cache=True)
+            predict_git_repo(self.repo_path, cache=True)
+            self.assertEqual(run.call_count, 0)
+        main(['cache', 'clear', str(self.repo_path)])
+        self.assertFalse(self.cache_path.exists())
+        main(['cache', 'clear', str(self.repo_path)])
+
+    def test_cli_folder_named_like_subcommand(self):
+        self.repo_path.joinpath('cache').mkdir()
+        self.addCleanup(os.chdir, os.getcwd())
+        os.chdir(self.repo_path)
+        sio = io.StringIO()
+        with contextlib.redirect_stdout(sio):
+            main(['cache', '--predict'])
+        self.assertEqual(sio.getvalue().rstrip(), predict_git_repo(self.repo_path).to_str())
+        self.assertFalse(self.cache_path.exists())
@@ -0,0 +1,80 @@
+"""Tests of commit-graph reader."""
+
+import pathlib
+
+from version_query.git_commit_graph import GitCommitGraph
+
+from .git_repo_tests import GitRepoTests
+
+
+class Tests(GitRepoTests):
+
+    @property
+    def objects_path(self) -> pathlib.Path:
+        return pathlib.Path(self.repo.common_dir, 'objects')
+
+    def _commit_branches(self, branches: int):
+        self.git_commit_new_file()
+        for i in range(branches):
+            self.repo.git.checkout('-b', f'branch{i}', self.default_branch_name)
+            self.git_commit_new_file()
+        self.repo.git.checkout(self.default_branch_name)
+        self.git_commit_new_file()
+
+    def _check_commit_graph(self, commit_graph: GitCommitGraph):
+        commits = self.repo.git.rev_list('--parents', 'HEAD').splitlines()
+        self.assertEqual(commit_graph.commit_count, len(commits))
+        for line in commits:
+            sha, *parents = line.split()
+            with self.subTest(commit=sha):
+                self.assertEqual(commit_graph.parents(sha), tuple(parents))
+                generation = commit_graph.generation(sha)
+                assert generation is not None
+                for parent in parents:
+                    parent_generation = commit_graph.generation(parent)
+                    assert parent_generation is not None
+                    self.assertLess(parent_generation, generation)
+
+    def test_no_commit_graph(self):
+        self.git_commit_new_file()
+        self.assertIsNone(GitCommitGraph.open(self.objects_path))
+
+    def test_commit_graph(self):
+        self._commit_branches(2)
+        self.repo.git.merge('branch0')
+        self.repo.git.merge('branch1')
+        self.repo.git.commit_graph('write', '--reachable')
+        with GitCommitGraph.open(self.objects_path) as commit_graph:
+            self.assertEqual(len(commit_graph.files), 1)
+            self._check_commit_graph(commit_graph)
+            self.assertIsNone(commit_graph.parents('0' * 40))
+            self.assertIsNone(commit_graph.generation('f' * 40))
+
+    def test_octopus_merge(self):
+        self._commit_branches(4)
+        self.repo.git.merge('branch0', 'branch1', 'branch2', 'branch3')
+        self.assertEqual(len(self.repo.head.commit.parents), 5)
+        self.repo.git.commit_graph('write', '--reachable')
+        with GitCommitGraph.open(self.objects_path) as commit_graph:
+            self._check_commit_graph(commit_graph)
+
+    def test_commit_graph_chain(self):
+        self._commit_branches(3)
+        self.repo.git.merge('branch0', 'branch1')
+        self.repo.git.commit_graph('write', '--reachable', '--split')
+        self.repo.git.merge('branch2')
+        self.git_commit_new_file()
+        self.repo.git.commit_graph('write', '--reachable', '--split=no-merge')
+        with GitCommitGraph.open(self.objects_path) as commit_graph:
+            self.assertEqual(len(commit_graph.files), 2)
+            self._check_commit_graph(commit_graph)
+
+    def test_partial_commit_graph(self):
+        self._commit_branches(1)
+        self.repo.git.commit_graph('write', '--reachable')
+        self.repo.git.merge('branch0')
+        with GitCommitGraph.open(self.objects_path) as commit_graph:
+            self.assertIsNone(commit_graph.parents(self.repo.head.commit.hexsha))
+            parent = self.repo.head.commit.parents[0]
+            self.assertEqual(commit_graph.parents(parent.hexsha),
+                             tuple(_.hexsha for _ in parent.parents))
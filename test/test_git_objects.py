@@ -0,0 +1,72 @@
+"""Tests of git object store reader."""
+
+import pathlib
+
+import git
+
+from version_query.git_objects import GitObjectStore
+
+from .git_repo_tests import GitRepoTests
+
+
+class Tests(GitRepoTests):
+
+    def setUp(self):
+        super().setUp()
+        path = self.git_commit_new_file()
+        for i in range(20):
+            self.git_modify_file(path, commit=True)
+            if i % 5 == 0:
+                self.git_commit_new_file()
+        tag = self.repo.create_tag('v1.0.0', ref='HEAD~3', message='annotated tag')
+        self.repo.create_tag('v1.0.1', ref=tag.tag, message='tag of annotated tag')
+
+    @property
+    def objects_path(self) -> pathlib.Path:
+        return pathlib.Path(self.repo.common_dir, 'objects')
+
+    def _check_objects(self, objects: GitObjectStore):
+        shas = self.repo.git.rev_list('--objects', '--all').splitlines()
+        shas = [_.split()[0] for _ in shas]
+        shas += self.repo.git.for_each_ref('--format=%(objectname)', 'refs/tags').splitlines()
+        for sha in shas:
+            with self.subTest(sha=sha):
+                object_type = self.repo.git.cat_file('-t', sha)
+                data = self.repo.git.cat_file(
+                    object_type, sha, stdout_as_string=False, strip_newline_in_stdout=False)
+                self.assertEqual(objects.read(sha), (object_type, data))
+        for line in self.repo.git.rev_list('--parents', 'HEAD').splitlines():
+            sha, *parents = line.split()
+            self.assertEqual(objects.commit_parents(sha), tuple(parents))
+        tag_sha = self.repo.git.rev_parse('refs/tags/v1.0.1')
+        self.assertEqual(objects.peel(tag_sha),
+                         ('commit', self.repo.git.rev_parse('HEAD~3')))
+        with self.assertRaises(ValueError):
+            objects.read('0' * 40)
+
+    def test_loose_objects(self):
+        with GitObjectStore(self.objects_path) as objects:
+            self.assertEqual(objects.packs, [])
+            self._check_objects(objects)
+
+    def test_offset_deltas(self):
+        self.repo.git.repack('-a', '-d', '-f', '--window=50', '--depth=50')
+        with GitObjectStore(self.objects_path) as objects:
+            self.assertEqual(len(objects.packs), 1)
+            self._check_objects(objects)
+
+    def test_reference_deltas(self):
+        self.repo.git(c='repack.useDeltaBaseOffset=false').repack(
+            '-a', '-d', '-f', '--window=50', '--depth=50')
+        with GitObjectStore(self.objects_path) as objects:
+            self._check_objects(objects)
+
+    def test_alternates(self):
+        self.repo.git.repack('-a', '-d')
+        clone_path = self.repo_path.joinpath('clone')
+        clone = git.Repo.clone_from(str(self.repo_path), str(clone_path), shared=True)
+        clone.close()
+        with GitObjectStore(clone_path.joinpath('.git', 'objects')) as objects:
+            self.assertEqual(objects.packs, [])
+            self.assertEqual(len(objects.alternates), 1)
+            self._check_objects(objects)
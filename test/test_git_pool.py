@@ -0,0 +1,110 @@
+"""Tests of pool of open git repositories."""
+
+import pathlib
+import typing as t
+import unittest
+import unittest.mock
+
+import git
+
+from version_query.git_pool import GitRepoPool, active_git_repo_pool
+from version_query.git_query import query_git_repo, predict_git_repo
+from version_query.service import VersionQueryService
+
+from .git_repo_tests import GitRepoTests
+
+
+def _counting_repos():
+    return unittest.mock.patch.object(git, 'Repo', wraps=git.Repo)
+
+
+def _counting_closes():
+    return unittest.mock.patch.object(
+        git.Repo, 'close', autospec=True, side_effect=git.Repo.close)
+
+
+def _closed_repos(close: unittest.mock.Mock, repo_path: pathlib.Path) -> t.List[git.Repo]:
+    """Get repositories at a given path closed so far, ignoring ones of garbage collected repos."""
+    return [call.args[0] for call in close.call_args_list
+            if pathlib.Path(call.args[0].git_dir).parent == repo_path]
+
+
+class Tests(GitRepoTests):
+
+    tagged_version = 'v1.0.0'
+
+    def test_invalid_size(self):
+        with self.assertRaises(ValueError):
+            GitRepoPool(max_size=0)
+
+    def test_reuse(self):
+        folder = self.repo_path.joinpath('folder')
+        folder.mkdir()
+        with GitRepoPool() as pool:
+            with pool.borrow(self.repo_path) as repo:
+                with pool.borrow(self.repo_path) as other_repo:
+                    self.assertIsNot(other_repo, repo)
+            self.assertEqual(len(pool), 2)
+            for path in (self.repo_path, folder, self.repo_path):
+                with pool.borrow(path) as borrowed_repo:
+                    self.assertTrue(borrowed_repo is repo or borrowed_repo is other_repo)
+            self.assertEqual(len(pool), 2)
+        self.assertEqual(len(pool), 0)
+
+    def test_queries(self):
+        with GitRepoPool() as pool, _counting_repos() as repo_class:
+            self.assertIsNone(active_git_repo_pool())
+            with pool.activated():
+                self.assertIs(active_git_repo_pool(), pool)
+                for _ in range(3):
+                    self.assertEqual(query_git_repo(self.repo_path).to_str(), '1.0.0')
+                    self.assertEqual(predict_git_repo(self.repo_path).to_str(), '1.0.0')
+                self.repo.delete_tag('v1.0.0')
+                with self.assertRaises(ValueError):
+                    query_git_repo(self.repo_path)
+            self.assertIsNone(active_git_repo_pool())
+            self.assertEqual(repo_class.call_count, 1)
+            self.assertEqual(len(pool), 1)
+            predict_git_repo(self.repo_path)
+            self.assertEqual(repo_class.call_count, 2)
+
+    def test_eviction(self):
+        with GitRepoPool(max_size=1) as pool, _counting_closes() as close:
+            with pool.borrow(self.repo_path) as repo, pool.borrow(self.repo_path) as other_repo:
+                pass
+            closed = _closed_repos(close, self.repo_path)
+            self.assertEqual(len(closed), 1)
+            self.assertIs(closed[-1], other_repo)
+            self.assertEqual(len(pool), 1)
+            pool.idle_timeout = 0
+            with pool.borrow(self.repo_path) as new_repo:
+                self.assertIsNot(new_repo, repo)
+                self.assertIs(_closed_repos(close, self.repo_path)[-1], repo)
+            self.assertIs(_closed_repos(close, self.repo_path)[-1], new_repo)
+            self.assertEqual(len(pool), 0)
+
+    def test_errors(self):
+        with GitRepoPool() as pool, _counting_closes() as close:
+            with self.assertRaises(ValueError), pool.borrow(self.repo_path):
+                raise ValueError()
+            self.assertEqual(len(pool), 1)
+            with self.assertRaises(RuntimeError), pool.borrow(self.repo_path):
+                raise RuntimeError()
+            self.assertEqual(len(pool), 0)
+            self.assertEqual(len(_closed_repos(close, self.repo_path)), 1)
+            with pool.borrow(self.repo_path) as repo:
+                pool.close()
+            self.assertIs(_closed_repos(close, self.repo_path)[-1], repo)
+            self.assertEqual(len(pool), 0)
+            with self.assertRaises(ValueError), pool.borrow(self.repo_path):
+                pass
+
+    def test_service(self):
+        with _counting_repos() as repo_class:
+            with VersionQueryService() as service:
+                for _ in range(3):
+                    service.clear()
+                    self.assertEqual(service.predict_folder(self.repo_path).to_str(), '1.0.0')
+                self.assertEqual(len(service.repo_pool), 1)
+            self.assertEqual(len(service.repo_pool), 0)
+        self.assertEqual(repo_class.call_count, 1)
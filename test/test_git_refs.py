@@ -0,0 +1,216 @@
+"""Tests of git references reader."""
+
+import pathlib
+import struct
+import typing as t
+import unittest
+import zlib
+
+import git
+
+from version_query.git_refs import PackedRefs, ReftableStack, GitRefStore
+
+from .git_repo_tests import GitRepoTests
+
+
+def _varint(value: int) -> bytes:
+    encoded = [value & 0x7f]
+    value >>= 7
+    while value:
+        value -= 1
+        encoded.insert(0, 0x80 | (value & 0x7f))
+        value >>= 7
+    return bytes(encoded)
+
+
+def _reftable(records: list, block_size: int = 0) -> bytes:
+    """Create contents of reftable file version 1 with all given records in one block.
+
+    Each record is a tuple (name, value type, values).
+    """
+    header = b'REFT' + struct.pack('>B', 1) + block_size.to_bytes(3, 'big') \
+        + struct.pack('>QQ', 1, 1)
+    block = b''
+    previous_name = b''
+    for name, value_type, values in records:
+        name = name.encode()
+        prefix_length = 0
+        while prefix_length < min(len(name), len(previous_name)) \
+                and name[prefix_length] == previous_name[prefix_length]:
+            prefix_length += 1
+        block += _varint(prefix_length) \
+            + _varint(((len(name) - prefix_length) << 3) | value_type) \
+            + name[prefix_length:] + _varint(0)
+        if value_type == 3:
+            block += _varint(len(values[0])) + values[0].encode()
+        else:
+            block += b''.join(bytes.fromhex(_) for _ in values)
+        previous_name = name
+    block += (len(header) + 4).to_bytes(3, 'big') + struct.pack('>H', 1)
+    block = b'r' + (len(header) + 4 + len(block)).to_bytes(3, 'big') + block
+    padding = b''
+    if block_size:
+        padding = b'\0' * (block_size - len(header) - len(block))
+    footer = header + struct.pack('>QQQQQ', 0, 0, 0, 0, 0)
+    return header + block + padding + footer + struct.pack('>I', zlib.crc32(footer))
+
+
+class Tests(GitRepoTests):
+
+    def setUp(self):
+        super().setUp()
+        self.git_commit_new_file()
+
+    @property
+    def git_path(self) -> pathlib.Path:
+        return pathlib.Path(self.repo.git_dir)
+
+    def _expected_tags(self):
+        lines = self.repo.git.for_each_ref(
+            'refs/tags', format='%(refname) %(objectname) %(*objectname)').splitlines()
+        return {name: (sha, peeled or None)
+                for name, sha, peeled in (f'{_} '.split(' ')[:3] for _ in lines)}
+
+    def _check_refs(self, refs: GitRefStore, peeled: bool, loose_tags: t.Container[str] = ()):
+        """Check references against git.
+
+        If peeled is True, peeled values are expected for all tags except the loose ones,
+        otherwise they are expected only for annotated tags, if at all.
+        """
+        expected = self._expected_tags()
+        tags = refs.refs('refs/tags/')
+        self.assertListEqual(list(tags), sorted(expected))
+        for name, (sha, peeled_sha) in tags.items():
+            with self.subTest(tag=name):
+                self.assertEqual(sha, expected[name][0])
+                if name in loose_tags:
+                    self.assertIsNone(peeled_sha)
+                elif peeled:
+                    self.assertEqual(peeled_sha, expected[name][1] or sha)
+                else:
+                    self.assertIn(peeled_sha, (None, expected[name][1]))
+        self.assertEqual(refs.resolve(), self.repo.head.commit.hexsha)
+        self.assertEqual(refs.resolve('refs/heads/devel'), self.repo.heads.devel.commit.hexsha)
+        self.assertIsNone(refs.resolve('refs/heads/no_such_branch'))
+
+    def _create_tags(self, count: int):
+        self.repo.create_head('devel')
+        for i in range(count):
+            if i % 3 == 0:
+                self.repo.create_tag(f'v{i}.0', message=f'annotated tag {i}')
+            else:
+                self.repo.create_tag(f'v{i}.0')
+            if i % 50 == 0:
+                self.git_commit_new_file()
+        self.repo.create_tag('release/1.0')
+        self.repo.create_tag('zzz')
+
+    def test_loose_refs(self):
+        self._create_tags(10)
+        with GitRefStore(self.git_path) as refs:
+            self.assertIsNone(refs.packed_refs.get('refs/tags/v1.0'))
+            self._check_refs(refs, False, refs.refs())
+
+    def test_packed_refs(self):
+        self._create_tags(300)
+        self.repo.git.pack_refs('--all')
+        self.repo.create_tag('v1000.0')
+        self.repo.create_tag('v1.0', force=True, ref='HEAD~1')
+        with GitRefStore(self.git_path) as refs:
+            self.assertIn('sorted', refs.packed_refs.traits)
+            self._check_refs(refs, True, {'refs/tags/v1000.0', 'refs/tags/v1.0'})
+            self.assertEqual(
+                list(refs.packed_refs.refs('refs/tags/v10')),
+                [_ for _ in refs.packed_refs.refs('refs/tags/')
+                 if _[0].startswith('refs/tags/v10')])
+            self.assertEqual(list(refs.packed_refs.refs('refs/tags/x')), [])
+            self.assertEqual(list(refs.packed_refs.refs('refs/tags/zzz')),
+                             [('refs/tags/zzz', (self.repo.tags['zzz'].commit.hexsha,) * 2)])
+
+    def test_unsorted_packed_refs(self):
+        self._create_tags(30)
+        self.repo.git.pack_refs('--all')
+        path = self.git_path.joinpath('packed-refs')
+        lines = path.read_text(encoding='ascii').splitlines()
+        records = []
+        for line in lines[1:]:
+            if line.startswith('^'):
+                records[-1] += f'\n{line}'
+            else:
+                records.append(line)
+        path.write_text('\n'.join(reversed(records)) + '\n', encoding='ascii')
+        with GitRefStore(self.git_path) as refs:
+            self.assertEqual(refs.packed_refs.traits, frozenset())
+            self._check_refs(refs, False)
+            self.assertEqual(refs.packed_refs.get('refs/tags/v3.0')[0],
+                             self.repo.tags['v3.0'].object.hexsha)
+
+    def test_empty_packed_refs(self):
+        self.repo.create_head('devel')
+        self.git_path.joinpath('packed-refs').touch()
+        with GitRefStore(self.git_path) as refs:
+            self.assertEqual(list(refs.packed_refs.refs()), [])
+            self._check_refs(refs, True)
+
+    def test_worktree(self):
+        self._create_tags(5)
+        self.repo.git.pack_refs('--all')
+        worktree_path = self.repo_path.joinpath('worktree')
+        self.repo.git.worktree('add', str(worktree_path), 'devel')
+        with GitRefStore(self.git_path.joinpath('worktrees', 'worktree'), self.git_path) as refs:
+            self.assertEqual(refs.resolve(), self.repo.heads.devel.commit.hexsha)
+            self.assertEqual(refs.refs(), GitRefStore(self.git_path).refs())
+
+    def test_reftable(self):
+        commit = self.repo.head.commit.hexsha
+        tag = self.repo.create_tag('v2.0', message='annotated tag').tag.hexsha
+        reftable_path = self.repo_path.joinpath('reftable')
+        reftable_path.mkdir()
+        reftable_path.joinpath('0001.ref').write_bytes(_reftable([
+            ('HEAD', 3, ('refs/heads/main',)),
+            ('refs/heads/main', 1, (commit,)),
+            ('refs/tags/v1.0', 1, (commit,)),
+            ('refs/tags/v1.1', 1, (commit,)),
+            ('refs/tags/v2.0', 2, (tag, commit))]))
+        reftable_path.joinpath('0002.ref').write_bytes(_reftable([
+            ('HEAD', 3, ('refs/heads/devel',)),
+            ('refs/heads/devel', 1, (commit,)),
+            ('refs/tags/v1.1', 0, ()),
+            ('refs/tags/v3.0', 3, ('refs/heads/main',))], block_size=256))
+        reftable_path.joinpath('tables.list').write_text('0001.ref\n0002.ref\n', encoding='ascii')
+        with GitRefStore(self.repo_path) as refs:
+            self.assertEqual(refs.resolve(), commit)
+            self.assertEqual(refs.refs(), {
+                'refs/tags/v1.0': (commit, commit),
+                'refs/tags/v2.0': (tag, commit),
+                'refs/tags/v3.0': (commit, None)})
+            self.assertIsNone(refs.resolve('refs/tags/v1.1'))
+        stack = ReftableStack.open(self.repo_path)
+        self.assertEqual(len(stack.tables), 2)
+        stack.close()
+        self.assertIsNone(ReftableStack.open(self.git_path))
+
+    @unittest.skipIf(git.Git().version_info < (2, 45), 'git does not support reftable format')
+    def test_reftable_repo(self):
+        self.repo.close()
+        self._tmpdir.cleanup()
+        self.repo = git.Repo.init(str(self.repo_path), ref_format='reftable')
+        self.repo.git.config('user.email', 'you@example.com')
+        self.repo.git.config('user.name', 'Your Name')
+        self.git_commit_new_file()
+        self._create_tags(100)
+        self.repo.git.pack_refs('--all')
+        self.repo.create_tag('v1000.0')
+        self.repo.git.tag('-d', 'v2.0')
+        with GitRefStore(self.git_path) as refs:
+            self.assertIsNotNone(ReftableStack.open(self.git_path))
+            self._check_refs(refs, True)
+
+
+class PackedRefsTests(unittest.TestCase):
+
+    def test_no_packed_refs(self):
+        packed_refs = PackedRefs(pathlib.Path('no_such_file'))
+        self.assertEqual(list(packed_refs.refs()), [])
+        self.assertIsNone(packed_refs.get('refs/tags/v1.0'))
+        packed_refs.close()
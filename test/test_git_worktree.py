@@ -0,0 +1,178 @@
+"""Tests of checking tracked files in the working tree of a git repository."""
+
+import asyncio
+import os
+import pathlib
+import platform
+import stat
+import tempfile
+import unittest
+import unittest.mock
+
+import version_query.async_query
+import version_query.git_worktree
+from version_query.git_backends import GitCliBackend
+from version_query.git_index import GitIndex
+from version_query.git_query import git_repo_version_context
+from version_query.git_worktree import GitWorktreeOptions, is_worktree_modified
+
+from .git_repo_tests import GitRepoTests
+
+
+class Tests(GitRepoTests):
+
+    @property
+    def index(self) -> GitIndex:
+        return GitIndex.read(pathlib.Path(self.repo.git_dir, 'index'))
+
+    def _commit_files(self, count: int) -> list:
+        paths = [self.repo_path.joinpath(f'file{i}.txt') for i in range(count)]
+        for i, path in enumerate(paths):
+            path.write_text(f'spam {i:03}\n', encoding='utf-8')
+        self.repo.git.add('--', *[_.name for _ in paths])
+        self.repo.git.commit('-m', 'add files')
+        return paths
+
+    def test_many_files(self):
+        paths = self._commit_files(50)
+        confirm = unittest.mock.Mock(return_value=True)
+        with unittest.mock.patch.object(version_query.git_worktree, '_ENTRIES_PER_TASK', 4):
+            for jobs in (None, 1, 3):
+                with self.subTest(jobs=jobs):
+                    self.assertFalse(is_worktree_modified(
+                        self.repo_path, self.index, confirm, jobs))
+            confirm.assert_not_called()
+            paths[37].write_text('eggs 037\n', encoding='utf-8')
+            for jobs in (None, 1, 3):
+                with self.subTest(jobs=jobs):
+                    self.assertTrue(is_worktree_modified(
+                        self.repo_path, self.index, confirm, jobs))
+            paths[37].unlink()
+            self.assertTrue(is_worktree_modified(self.repo_path, self.index))
+
+    def test_same_size_and_time(self):
+        path, = self._commit_files(1)
+        entry, = self.index.entries
+        path.write_text('eggs 000\n', encoding='utf-8')
+        mtime_ns = entry.mtime_s * 1_000_000_000 + entry.mtime_ns
+        os.utime(path, ns=(mtime_ns, mtime_ns))
+        index = self.index
+        later_index = GitIndex(index.version, index.entries, mtime_ns + 1_000_000_000)
+        self.assertTrue(is_worktree_modified(self.repo_path, later_index))
+        for backend in ('cli', 'gitpython', 'files'):
+            with self.subTest(backend=backend):
+                self.assertTrue(
+                    git_repo_version_context(self.repo_path, True, backend=backend).is_dirty)
+        for options in (
+                GitWorktreeOptions(trust_ctime=False), GitWorktreeOptions(check_stat=False)):
+            with self.subTest(options=options):
+                self.assertFalse(is_worktree_modified(self.repo_path, later_index, options=options))
+                self.assertTrue(is_worktree_modified(self.repo_path, GitIndex(
+                    index.version, index.entries, mtime_ns), options=options))
+
+    def test_racily_clean_entry(self):
+        path, = self._commit_files(1)
+        entry, = self.index.entries
+        path.write_text('ham and eggs\n', encoding='utf-8')
+        mtime_ns = entry.mtime_s * 1_000_000_000 + entry.mtime_ns
+        os.utime(path, ns=(mtime_ns, mtime_ns))
+        index = GitIndex(self.index.version, [entry._replace(size=0)], mtime_ns + 1_000_000_000)
+        options = GitWorktreeOptions(check_stat=False)
+        self.assertTrue(is_worktree_modified(self.repo_path, index, options=options))
+        confirm = unittest.mock.Mock(return_value=False)
+        self.assertFalse(is_worktree_modified(self.repo_path, index, confirm, options=options))
+        confirm.assert_called_once_with(index.entries[0])
+
+    def test_confirm(self):
+        path, = self._commit_files(1)
+        path.write_text('spam 000\r\n', encoding='utf-8')
+        confirm = unittest.mock.Mock(return_value=False)
+        self.assertFalse(is_worktree_modified(self.repo_path, self.index, confirm))
+        confirm.assert_called_once_with(self.index.entries[0])
+        self.assertTrue(is_worktree_modified(self.repo_path, self.index))
+
+    def test_entries_without_status(self):
+        path = self.git_commit_new_file()
+        entry, = self.index.entries
+        self.assertEqual((entry.size, entry.mtime_s), (0, 0))
+        self.assertFalse(is_worktree_modified(self.repo_path, self.index))
+        path.write_text('ham and eggs\n', encoding='utf-8')
+        self.assertTrue(is_worktree_modified(self.repo_path, self.index))
+
+    def test_backend(self):
+        paths = self._commit_files(3)
+        backend = GitCliBackend(self.repo)
+        self.assertFalse(backend.is_dirty())
+        paths[1].write_text('eggs\n', encoding='utf-8')
+        self.assertTrue(backend.is_dirty())
+        self.repo.git.add(paths[1].name)
+        self.assertTrue(backend.is_dirty())
+        self.repo.git.commit('-m', 'modify file')
+        self.assertFalse(backend.is_dirty())
+        self.repo.git.update_index('--split-index')
+        self.assertFalse(backend.is_dirty())
+        paths[2].write_text('ham\n', encoding='utf-8')
+        self.assertTrue(backend.is_dirty())
+
+    def test_options(self):
+        with tempfile.TemporaryDirectory() as folder:
+            config_path = pathlib.Path(folder, 'config')
+            self.assertEqual(GitWorktreeOptions.read(config_path), GitWorktreeOptions())
+            for text, options in (
+                    ('[core]\n\tfilemode = false\n\tsymlinks = false\n',
+                     GitWorktreeOptions(file_mode=False, symlinks=False)),
+                    ('[Core]\n\tFileMode = no ; comment\n\tsymlinks\n',
+                     GitWorktreeOptions(file_mode=False)),
+                    ('[core "x"]\n\tfileMode = false\n[core]\n\tsymlinks = "off"\n',
+                     GitWorktreeOptions(symlinks=False)),
+                    ('[user]\n\tfileMode = false\n# [core]\n\tsymlinks = false\n',
+                     GitWorktreeOptions()),
+                    ('[core]\n\ttrustctime = false\n\tcheckStat = minimal\n',
+                     GitWorktreeOptions(trust_ctime=False, check_stat=False)),
+                    ('[core]\n\tcheckStat = default\n', GitWorktreeOptions())):
+                with self.subTest(text=text):
+                    config_path.write_text(text, encoding='utf-8')
+                    self.assertEqual(GitWorktreeOptions.read(config_path), options)
+
+    @unittest.skipIf(platform.system() == 'Windows', 'executable bit is not supported on Windows')
+    def test_file_mode(self):
+        path, = self._commit_files(1)
+        path.chmod(path.stat().st_mode | stat.S_IXUSR)
+        self.assertTrue(is_worktree_modified(self.repo_path, self.index))
+        confirm = unittest.mock.Mock(return_value=False)
+        self.assertFalse(is_worktree_modified(self.repo_path, self.index, confirm))
+        confirm.assert_called_once_with(self.index.entries[0])
+        self.assertFalse(is_worktree_modified(
+            self.repo_path, self.index, options=GitWorktreeOptions(file_mode=False)))
+
+    @unittest.skipIf(platform.system() == 'Windows', 'executable bit is not supported on Windows')
+    def test_file_mode_in_config(self):
+        path, = self._commit_files(1)
+        self.repo.git.config('core.fileMode', 'false')
+        path.chmod(path.stat().st_mode | stat.S_IXUSR)
+        for backend in ('cli', 'gitpython', 'files'):
+            with self.subTest(backend=backend):
+                self.assertFalse(
+                    git_repo_version_context(self.repo_path, True, backend=backend).is_dirty)
+        version = asyncio.run(version_query.async_query.predict_git_repo(self.repo_path))
+        self.assertNotIn('dirty', version.to_str())
+        self.repo.git.config('core.fileMode', 'true')
+        for backend in ('cli', 'gitpython', 'files'):
+            with self.subTest(backend=backend):
+                self.assertTrue(
+                    git_repo_version_context(self.repo_path, True, backend=backend).is_dirty)
+
+    @unittest.skipIf(platform.system() == 'Windows', 'symlinks are not supported on Windows')
+    def test_symlinks(self):
+        path = self.repo_path.joinpath('link')
+        path.symlink_to('target')
+        self.repo.git.add('link')
+        self.repo.git.commit('-m', 'add symlink')
+        self.assertFalse(is_worktree_modified(self.repo_path, self.index))
+        path.unlink()
+        path.write_text('target', encoding='utf-8')
+        self.assertTrue(is_worktree_modified(self.repo_path, self.index))
+        options = GitWorktreeOptions(symlinks=False)
+        self.assertFalse(is_worktree_modified(self.repo_path, self.index, options=options))
+        path.write_text('tarjet', encoding='utf-8')
+        self.assertTrue(is_worktree_modified(self.repo_path, self.index, options=options))
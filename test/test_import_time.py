@@ -0,0 +1,64 @@
+"""Tests of modules imported, and time needed, to import version_query and query a version."""
+
+import logging
+import os
+import pathlib
+import subprocess
+import sys
+import tempfile
+import typing as t
+import unittest
+
+import version_query
+
+_LOG = logging.getLogger(__name__)
+
+_HEAVY_MODULES = (
+    'git', 'gitdb', 'semver', 'packaging', 'boilerplates', 'version_query.git_query')
+
+
+def _imported_modules(code: str, folder: pathlib.Path) -> t.Tuple[t.Set[str], t.Dict[str, int]]:
+    """Run given code in a new interpreter.
+
+    Return names of all modules imported by it, and cumulative import times of modules
+    in microseconds, which are informational only, as they depend on the load of the machine.
+    """
+    python_path = [str(folder), str(pathlib.Path(version_query.__file__).parent.parent)]
+    env = {**os.environ, 'PYTHONPATH': os.pathsep.join(python_path)}
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c',
+         f'{code}\nimport sys\nprint("\\n".join(sys.modules))'], cwd=folder, env=env,
+        capture_output=True, text=True, check=True)
+    import_times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, module = line.split('|')
+        import_times[module.strip()] = int(cumulative)
+    return set(result.stdout.splitlines()), import_times
+
+
+class Tests(unittest.TestCase):
+
+    def test_import(self):
+        with tempfile.TemporaryDirectory() as folder:
+            modules, import_times = _imported_modules('import version_query', pathlib.Path(folder))
+        _LOG.info('importing version_query took %i us', import_times['version_query'])
+        for module in _HEAVY_MODULES:
+            self.assertNotIn(module, modules)
+
+    def test_query_installed_package(self):
+        with tempfile.TemporaryDirectory() as folder:
+            path = pathlib.Path(folder)
+            path.joinpath('example_package').mkdir()
+            path.joinpath('example_package', '__init__.py').write_text(
+                'from version_query import query_version_str\n'
+                'VERSION = query_version_str()\n'
+                'assert VERSION == "1.2.3", VERSION\n', encoding='utf-8')
+            metadata_path = path.joinpath('example_package-1.2.3.dist-info')
+            metadata_path.mkdir()
+            metadata_path.joinpath('METADATA').write_text(
+                'Name: example_package\nVersion: 1.2.3\n', encoding='utf-8')
+            modules, _ = _imported_modules('import example_package', path)
+        for module in _HEAVY_MODULES:
+            self.assertNotIn(module, modules)
@@ -1,10 +1,15 @@
 """Tests of local_git_version module."""
 
+import importlib
 import logging
-
+import os
+import pathlib
+import tempfile
 import unittest
+import unittest.mock
 
-
+import version_query.local_git_version
+import version_query.git_query
 from version_query.local_git_version import QUERIED, PREDICTED
 
 _LOG = logging.getLogger(__name__)
@@ -19,3 +24,41 @@ class Tests(unittest.TestCase):
     def test_predicted(self):
         _LOG.debug('PREDICTED: %s', PREDICTED)
         self.assertIsInstance(PREDICTED, str)
+
+
+class LazyTests(unittest.TestCase):
+
+    def _reloaded_module(self):
+        module = version_query.local_git_version
+        self.addCleanup(module.__dict__.update, dict(module.__dict__))
+        for name in ('QUERIED', 'PREDICTED'):
+            module.__dict__.pop(name, None)
+        return importlib.reload(module)
+
+    def test_lazy(self):
+        with unittest.mock.patch.object(
+                version_query.git_query, 'git_repo_version_context',
+                wraps=version_query.git_query.git_repo_version_context) as context:
+            module = self._reloaded_module()
+            context.assert_not_called()
+            predicted = module.PREDICTED
+            self.assertEqual(module.PREDICTED, predicted)
+            context.assert_called_once()
+        self.assertIn('PREDICTED', dir(module))
+        with self.assertRaises(AttributeError):
+            _ = module.NO_SUCH_ATTRIBUTE
+
+    def test_version_override(self):
+        with unittest.mock.patch.dict(os.environ, {'VERSION_QUERY_VERSION': '1.2.3.dev4'}):
+            module = self._reloaded_module()
+            self.assertEqual(module.QUERIED, '1.2.3.dev4')
+            self.assertEqual(module.PREDICTED, '1.2.3.dev4')
+
+    def test_version_file_override(self):
+        with tempfile.TemporaryDirectory() as folder:
+            pathlib.Path(folder, 'VERSION').write_text('4.5.6\n', encoding='utf-8')
+            with unittest.mock.patch.dict(os.environ, {
+                    'PROJECT_FOLDER': folder, 'VERSION_QUERY_VERSION_FILE': 'VERSION'}):
+                module = self._reloaded_module()
+                self.assertEqual(module.PREDICTED, '4.5.6')
+                self.assertEqual(module.QUERIED, '4.5.6')
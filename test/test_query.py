@@ -7,13 +7,15 @@ import pathlib
 import sys
 import tempfile
 import unittest
+import unittest.mock
 
 from boilerplates.packaging_tests import run_module
 
 from version_query.version import Version
 from version_query.git_query import query_git_repo, predict_git_repo
 from version_query.py_query import query_metadata_json, query_pkg_info, query_package_folder
-from version_query.query import query_folder, query_caller
+from version_query.query import \
+    _probe_folder, query_folder, query_caller, folder_version_context
 from .examples import \
     PY_LIB_DIR, GIT_REPO_EXAMPLES, METADATA_JSON_EXAMPLE_PATHS, PKG_INFO_EXAMPLE_PATHS, \
     PACKAGE_FOLDER_EXAMPLES
@@ -145,9 +147,58 @@ class Tests(unittest.TestCase):
         _LOG.debug('%s: %s', path, version)
         self.assertIsInstance(version, Version)
 
+    def test_query_package_folder_index(self):
+        with tempfile.TemporaryDirectory() as folder:
+            path = pathlib.Path(folder)
+            path.joinpath('example').mkdir()
+            path.joinpath('example-1.0.dist-info').mkdir()
+            path.joinpath('example-1.0.dist-info', 'METADATA').write_text(
+                'Version: 1.0\n', encoding='utf-8')
+            os.utime(path, ns=(0, 0))
+            with unittest.mock.patch.object(os, 'listdir', wraps=os.listdir) as listdir:
+                for _ in range(3):
+                    self.assertEqual(
+                        query_package_folder(path.joinpath('example')), Version.from_str('1.0'))
+                self.assertEqual(listdir.call_count, 1)
+                path.joinpath('example-1.1.dist-info').mkdir()
+                path.joinpath('example-1.1.dist-info', 'METADATA').write_text(
+                    'Version: 1.1\n', encoding='utf-8')
+                os.utime(path, ns=(1, 1))
+                with self.assertRaises(ValueError):
+                    query_package_folder(path.joinpath('example'))
+                self.assertEqual(listdir.call_count, 2)
+
+    def test_probe_folder(self):
+        with tempfile.TemporaryDirectory() as folder:
+            path = pathlib.Path(folder)
+            self.assertEqual(_probe_folder(path), (None, False, False))
+            path.joinpath('example-1.0.dist-info').mkdir()
+            path.joinpath('setup.py').write_text('', encoding='utf-8')
+            path.joinpath('.git').write_text('gitdir: elsewhere\n', encoding='utf-8')
+            os.utime(path, ns=(0, 0))
+            with unittest.mock.patch.object(os, 'listdir', wraps=os.listdir) as listdir:
+                for _ in range(3):
+                    self.assertEqual(_probe_folder(path), ('gitfile', True, True))
+                self.assertEqual(listdir.call_count, 1)
+            with self.assertRaises(ValueError):
+                query_folder(path)
+            self.assertIsNone(_probe_folder(path.joinpath('no_such_folder')))
+
     def test_query_folder(self):
         self._query_test_case(PACKAGE_FOLDER_EXAMPLES, query_folder)
 
+    def test_folder_version_context(self):
+        for path in PACKAGE_FOLDER_EXAMPLES[:10]:
+            with self.subTest(path=path):
+                try:
+                    version = query_package_folder(path, search_parent_directories=False)
+                except ValueError:
+                    continue
+                context = folder_version_context(path, search_parent_directories=False)
+                self.assertIsNone(context.head_commit)
+                self.assertEqual(context.queried, version)
+                self.assertEqual(context.predicted, version)
+
     def test_query_folder_current(self):
         path = pathlib.Path.cwd()
         version = query_folder(path)
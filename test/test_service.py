@@ -0,0 +1,114 @@
+"""Tests of in-process version query service."""
+
+import concurrent.futures
+import pathlib
+import tempfile
+import time
+import unittest.mock
+
+import version_query.service
+from version_query.git_files import GitFilesRepo
+from version_query.query import predict_folder
+from version_query.service import VersionQueryService, _git_dirs
+
+from .git_repo_tests import GitRepoTests
+
+
+class Tests(GitRepoTests):
+
+    tagged_version = 'v1.0.0'
+
+    def setUp(self):
+        super().setUp()
+        self.patch(unittest.mock.patch.object(version_query.service, '_RACY_INTERVAL_NS', 0))
+
+    def test_invalid_size(self):
+        with self.assertRaises(ValueError):
+            VersionQueryService(max_size=0)
+
+    def _predicted(self, service: VersionQueryService) -> str:
+        """Predict version, and check that it is cached once git stops refreshing the index."""
+        version = service.predict_folder(self.repo_path).to_str()
+        service.predict_folder(self.repo_path)
+        hits = service.statistics()['hits']
+        self.assertEqual(service.predict_folder(self.repo_path).to_str(), version)
+        self.assertEqual(service.statistics()['hits'], hits + 1)
+        return version
+
+    def test_hits_and_invalidation(self):
+        service = VersionQueryService()
+        self.assertEqual(self._predicted(service), '1.0.0')
+        version = service.predict_folder(self.repo_path)
+        version.increment(version_query.VersionComponent.Minor)
+        self.assertEqual(service.predict_folder(self.repo_path).to_str(), '1.0.0')
+        self.assertEqual(service.query_folder(self.repo_path).to_str(), '1.0.0')
+        self.assertEqual(service.statistics()['size'], 2)
+        path = self.git_commit_new_file()
+        self.assertEqual(self._predicted(service), f'1.0.1.dev1+git{self.repo_head_hexsha}')
+        self.repo.create_tag('v1.1.0')
+        self.assertEqual(self._predicted(service), '1.1.0')
+        self.git_modify_file(path, add=True)
+        self.assertIn('dirty', self._predicted(service))
+        context = service.folder_version_context(self.repo_path)
+        self.assertIs(service.folder_version_context(self.repo_path), context)
+        service.clear()
+        self.assertEqual(service.statistics()['size'], 0)
+
+    def test_worktree_tracking(self):
+        path = self.git_commit_new_file()
+        self.repo.create_tag('v2.0.0')
+        service = VersionQueryService(track_worktree=True)
+        with unittest.mock.patch.object(version_query.git_cache, '_RACY_INTERVAL_NS', 0):
+            self.assertEqual(self._predicted(service), '2.0.0')
+            self.git_modify_file(path)
+            self.assertIn('dirty', self._predicted(service))
+
+    def test_linked_worktree(self):
+        with tempfile.TemporaryDirectory() as folder:
+            worktree_path = pathlib.Path(folder, 'worktree')
+            self.repo.git.worktree('add', '--detach', str(worktree_path))
+            repo = GitFilesRepo.open(worktree_path)
+            self.assertEqual(_git_dirs(worktree_path), (repo.git_dir, repo.common_dir))
+            service = VersionQueryService()
+            self.assertEqual(service.predict_folder(worktree_path).to_str(), '1.0.0')
+            self.repo.create_tag('v1.1.0')
+            self.assertEqual(service.predict_folder(worktree_path).to_str(), '1.1.0')
+            self.repo.git.worktree('remove', str(worktree_path))
+
+    def test_eviction(self):
+        folders = [self.repo_path.joinpath(f'folder_{i}') for i in range(3)]
+        for folder in folders:
+            folder.mkdir()
+        service = VersionQueryService(max_size=2)
+        for folder in folders + folders[2:]:
+            service.query_folder(folder, True)
+        self.assertEqual(service.statistics(), {'hits': 1, 'misses': 3, 'waits': 0, 'size': 2})
+        service.query_folder(folders[0], True)
+        self.assertEqual(service.statistics()['misses'], 4)
+
+    def test_errors(self):
+        self.repo.delete_tag('v1.0.0')
+        service = VersionQueryService()
+        for _ in range(2):
+            with self.assertRaises(ValueError):
+                service.query_folder(self.repo_path)
+        self.assertEqual(service.statistics(), {'hits': 0, 'misses': 2, 'waits': 0, 'size': 0})
+
+    def test_coalescing(self):
+        service = VersionQueryService()
+        threads_count = 8
+
+        def slow_predict_folder(*args):
+            deadline = time.monotonic() + 10
+            while service.statistics()['waits'] < threads_count - 1:
+                self.assertLess(time.monotonic(), deadline)
+                time.sleep(0.01)
+            return predict_folder(*args)
+
+        with unittest.mock.patch.object(
+                version_query.service, 'predict_folder', slow_predict_folder), \
+                concurrent.futures.ThreadPoolExecutor(threads_count) as pool:
+            versions = list(pool.map(
+                lambda _: service.predict_folder(self.repo_path), range(threads_count)))
+        self.assertEqual({version.to_str() for version in versions}, {'1.0.0'})
+        self.assertEqual(service.statistics(), {'hits': 0, 'misses': 1, 'waits': 7, 'size': 1})
@@ -2,9 +2,42 @@
 
 __all__ = ['VersionComponent', 'Version',
            'query_folder', 'query_caller', 'query_version_str', 'predict_git_repo',
-           'predict_caller', 'predict_version_str']
+           'predict_caller', 'predict_version_str', 'query_git_revisions', 'predict_git_revisions',
+           'RepoVersionContext', 'git_repo_version_context', 'folder_version_context',
+           'VersionQueryService', 'GitRepoPool', 'QueryResult', 'query_many']
+
+import importlib
+import typing as t
 
 from .version import VersionComponent, Version
 from .query import query_folder, query_caller, query_version_str
-from .git_query import predict_git_repo
 from .query import predict_caller, predict_version_str
+from .repo_context import RepoVersionContext
+from .query import folder_version_context
+
+if t.TYPE_CHECKING:
+    from .git_query import \
+        predict_git_repo, query_git_revisions, predict_git_revisions, git_repo_version_context
+    from .service import VersionQueryService
+    from .git_pool import GitRepoPool
+    from .batch import QueryResult, query_many
+
+# GitPython is imported only when git_query module is needed, and so are modules
+# needed only by long-running services or batch queries
+_LAZY_ATTRIBUTES = {
+    'predict_git_repo': 'git_query', 'query_git_revisions': 'git_query',
+    'predict_git_revisions': 'git_query', 'git_repo_version_context': 'git_query',
+    'VersionQueryService': 'service', 'GitRepoPool': 'git_pool',
+    'QueryResult': 'batch', 'query_many': 'batch'}
+
+
+def __getattr__(name: str) -> t.Any:
+    if name not in _LAZY_ATTRIBUTES:
+        raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
+    value = getattr(importlib.import_module(f'.{_LAZY_ATTRIBUTES[name]}', __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__() -> t.List[str]:
+    return sorted({*globals(), *_LAZY_ATTRIBUTES})
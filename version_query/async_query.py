@@ -0,0 +1,356 @@
+"""Asynchronous versions of version query functions, for use in asyncio event loops.
+
+Git is run in asyncio subprocesses, and the filesystem is examined in threads of the default
+executor of the event loop, so that the loop is never blocked. The number of queries in progress
+at the same time is limited using a semaphore.
+
+Tracked files in the working tree are checked in a thread like in git_query module, so git may
+also run in that thread, to confirm that a file whose status is inconclusive is modified.
+"""
+
+import asyncio
+import logging
+import os
+import pathlib
+import typing as t
+import weakref
+
+from .version import Version
+from .git_backends import \
+    _TAG_REFS_FORMAT, _git_executable, _is_worktree_dirty, _parse_version_tag_refs
+from .git_commit_graph import GitCommitGraph
+from .git_files import \
+    InvalidGitRepositoryError, NoSuchPathError, find_common_dir, find_git_dir
+from .git_query import \
+    CACHE_ENVVAR, _DESCRIBE_MATCH_PATTERNS, _GitHistoryWalk, \
+    _GitVersionTagIndex, _GitWalkResult, _described_tag_commit, _described_walk_result, \
+    _git_backend, _invalid_git_repo_errors
+from .py_query import query_package_folder
+from .query import _git_repo_folder, _may_be_package_folder
+from .repo_context import _apply_commit_distance, _apply_dirty
+
+__all__ = ['query_folder', 'predict_folder', 'query_git_repo', 'predict_git_repo']
+
+_LOG = logging.getLogger(__name__)
+
+MAX_CONCURRENT_QUERIES = 64
+
+_semaphores: 'weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, asyncio.Semaphore]' = \
+    weakref.WeakKeyDictionary()
+
+_COMMITS_READ_AT_ONCE = 256
+
+
+def _default_semaphore() -> asyncio.Semaphore:
+    """Get the semaphore shared by all queries in the running event loop."""
+    loop = asyncio.get_running_loop()
+    semaphore = _semaphores.get(loop)
+    if semaphore is None:
+        semaphore = asyncio.Semaphore(MAX_CONCURRENT_QUERIES)
+        _semaphores[loop] = semaphore
+    return semaphore
+
+
+class _GitRepoDirs:
+    """Folders of a git repository, found like GitPython finds them.
+
+    Errors of GitPython are raised if there is no repository, like in "cli" backend.
+    """
+
+    # pylint: disable = too-few-public-methods
+
+    def __init__(self, path: pathlib.Path, search_parent_directories: bool):
+        import git  # pylint: disable = import-outside-toplevel
+        try:
+            self.git_dir, self.working_dir = find_git_dir(path, search_parent_directories)
+        except NoSuchPathError as err:
+            raise git.NoSuchPathError(path) from err
+        except InvalidGitRepositoryError as err:
+            raise git.InvalidGitRepositoryError(path) from err
+        self.common_dir = find_common_dir(self.git_dir)
+        self.has_index = self.git_dir.joinpath('index').is_file()
+
+    def __repr__(self) -> str:
+        return f'<{type(self).__name__} "{self.git_dir}">'
+
+
+async def _run_git(repo: _GitRepoDirs, *args: str, check: bool = True) -> t.Tuple[int, str]:
+    """Run git in a repository, and get its exit status and output.
+
+    If check is True, raise git.GitCommandError if git fails, like GitPython does.
+    """
+    import git  # pylint: disable = import-outside-toplevel
+    command = [_git_executable(), *args]
+    process = await asyncio.create_subprocess_exec(
+        *command, cwd=repo.working_dir or repo.git_dir,
+        stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE)
+    stdout, stderr = await process.communicate()
+    assert process.returncode is not None
+    if check and process.returncode != 0:
+        raise git.GitCommandError(command, process.returncode, stderr, stdout)
+    return process.returncode, stdout.decode().rstrip('\n')
+
+
+async def _version_tag_index(repo: _GitRepoDirs) -> _GitVersionTagIndex:
+    """Build index of version tags, like _GitVersionTagIndex() does for a git.Repo."""
+    version_tag_commits: t.Dict[str, t.Dict[str, Version]] = {}
+    _, output = await _run_git(repo, 'for-each-ref', f'--format={_TAG_REFS_FORMAT}', 'refs/tags')
+    for path, tag_name, version, sha in _parse_version_tag_refs(repo, output):
+        if sha is None:
+            status, sha = await _run_git(
+                repo, 'rev-parse', '--verify', '--quiet', f'{path}^{{commit}}', check=False)
+            if status != 0:
+                _LOG.debug('%s: ignoring tag %s which does not point to a commit', repo, tag_name)
+                continue
+        if sha not in version_tag_commits:
+            version_tag_commits[sha] = {}
+        version_tag_commits[sha][tag_name] = version
+    return _GitVersionTagIndex(version_tag_commits)
+
+
+async def _head_commit(repo: _GitRepoDirs) -> str:
+    status, sha = await _run_git(repo, 'rev-parse', '--verify', '--quiet', 'HEAD', check=False)
+    if status != 0:
+        raise ValueError(f'HEAD of {repo} does not point to any commit')
+    return sha
+
+
+async def _described_git_version_tag(
+        repo: _GitRepoDirs, tag_index: _GitVersionTagIndex, base_commit: str) -> t.Optional[
+            _GitWalkResult]:
+    """Find the latest version tag using "git describe", like git_query module does."""
+    status, description = await _run_git(
+        repo, 'describe', '--tags', '--long', *[f'--match={_}' for _ in _DESCRIBE_MATCH_PATTERNS],
+        base_commit, check=False)
+    described = _described_tag_commit(repo, tag_index, description if status == 0 else None)
+    if described is None:
+        return None
+    _, merge_count = await _run_git(
+        repo, 'rev-list', '--count', '--min-parents=2', f'{described[0]}..{base_commit}')
+    return _described_walk_result(repo, tag_index, *described, merge_count)
+
+
+class _UnreadParents(Exception):
+    """Parents of a commit are not read yet from the output of git."""
+
+
+class _GitCommitReader:
+    """Parents of commits in history of a git repository, read asynchronously from git process.
+
+    Parents are read from "git rev-list --topo-order --parents" output, which is consumed only
+    as far as needed. The history walk cannot wait for the output, so when it reaches a commit
+    whose parents are not read yet, it is interrupted with _UnreadParents and started over
+    once more output is read. Each time, at least as many commits as already known are read,
+    so that the work of interrupted walks does not exceed the work of the final one.
+    """
+
+    def __init__(
+            self, repo: _GitRepoDirs, rev: str, commit_graph: t.Optional[GitCommitGraph] = None):
+        self._repo = repo
+        self._rev = rev
+        self._process: t.Any = None
+        self._parents: t.Dict[str, t.Tuple[str, ...]] = {}
+        self._complete = False
+        self.commit_graph = commit_graph
+
+    def parents(self, commit: str) -> t.Tuple[str, ...]:
+        """Get SHAs of parents of a commit with a given SHA, if they are already read."""
+        if self.commit_graph is not None and commit not in self._parents:
+            parents = self.commit_graph.parents(commit)
+            if parents is not None:
+                return parents
+        if commit in self._parents:
+            return self._parents[commit]
+        if self._complete:
+            raise ValueError(f'commit {commit} not found in the history')
+        raise _UnreadParents(commit)
+
+    def generation(self, commit: str) -> t.Optional[int]:
+        """Get generation number of a commit, if it is known from the commit-graph."""
+        if self.commit_graph is None:
+            return None
+        return self.commit_graph.generation(commit)
+
+    async def read_more(self) -> None:
+        """Read parents of more commits."""
+        if self._process is None:
+            self._process = await asyncio.create_subprocess_exec(
+                _git_executable(), 'rev-list', '--topo-order',
+                '--parents', self._rev, cwd=self._repo.working_dir or self._repo.git_dir,
+                stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.DEVNULL)
+        assert self._process.stdout is not None
+        for _ in range(max(len(self._parents), _COMMITS_READ_AT_ONCE)):
+            line = await self._process.stdout.readline()
+            if not line:
+                self._complete = True
+                return
+            sha, *parents = line.decode().split()
+            self._parents[sha] = tuple(parents)
+
+    async def close(self) -> None:
+        """Close the commit-graph and kill the git process, if it is still running."""
+        if self.commit_graph is not None:
+            self.commit_graph.close()
+        if self._process is None:
+            return
+        if self._process.returncode is None:
+            self._process.kill()
+        await self._process.wait()
+
+
+async def _latest_git_version_tag(
+        repo: _GitRepoDirs, assume_if_none: bool, base_commit: str) -> _GitWalkResult:
+    """Find the latest version tag, like the function of the same name in git_query module."""
+    tag_index = await _version_tag_index(repo)
+    if not tag_index and not assume_if_none:
+        raise ValueError(f'the given repo {repo} has no version tags')
+    if tag_index:
+        result = await _described_git_version_tag(repo, tag_index, base_commit)
+        if result is not None:
+            return result
+    commit_graph = await asyncio.to_thread(
+        GitCommitGraph.open, repo.common_dir.joinpath('objects'))
+    commits = _GitCommitReader(repo, base_commit, commit_graph)
+    try:
+        return await _walk_history(repo, commits, tag_index, assume_if_none, base_commit)
+    finally:
+        await commits.close()
+
+
+async def _walk_history(
+        repo: _GitRepoDirs, commits: _GitCommitReader, tag_index: _GitVersionTagIndex,
+        assume_if_none: bool, base_commit: str) -> _GitWalkResult:
+    """Walk the history, and start it over whenever more commits need to be read."""
+    while True:
+        try:
+            return _GitHistoryWalk(repo, commits, tag_index, assume_if_none).run(base_commit)
+        except _UnreadParents:
+            await commits.read_more()
+
+
+async def _is_git_repo_dirty(repo: _GitRepoDirs) -> bool:
+    """Check if tracked files differ from the last commit, like "cli" backend does."""
+    if repo.working_dir is None:
+        return False
+    diff_args = ('--abbrev=40', '--full-index', '--raw')
+    if repo.has_index and (await _run_git(repo, 'diff', '--cached', *diff_args))[1]:
+        return True
+    is_worktree_dirty = await asyncio.to_thread(
+        _is_worktree_dirty, repo.git_dir, repo.common_dir, repo.working_dir)
+    if is_worktree_dirty is None:
+        return bool((await _run_git(repo, 'diff', *diff_args))[1])
+    return is_worktree_dirty
+
+
+def _runs_in_thread() -> bool:
+    """Check if queries need to run git_query functions in a thread, instead of git processes.
+
+    It is the case when other git backend than "cli" is configured, for example when
+    repositories are read directly from their files, which doesn't start any processes,
+    or when results are cached, which is done only by git_query module.
+    """
+    return _git_backend() != 'cli' or os.environ.get(CACHE_ENVVAR) == '1'
+
+
+async def _query_git_repo(
+        repo_path: pathlib.Path, search_parent_directories: bool) -> Version:
+    if _runs_in_thread():
+        from . import git_query  # pylint: disable = import-outside-toplevel
+        return await asyncio.to_thread(
+            git_query.query_git_repo, repo_path, search_parent_directories)
+    repo = await asyncio.to_thread(_GitRepoDirs, repo_path, search_parent_directories)
+    version = (await _latest_git_version_tag(repo, False, await _head_commit(repo)))[2]
+    assert isinstance(version, Version), version
+    return version
+
+
+async def _predict_git_repo(
+        repo_path: pathlib.Path, search_parent_directories: bool) -> Version:
+    if _runs_in_thread():
+        from . import git_query  # pylint: disable = import-outside-toplevel
+        return await asyncio.to_thread(
+            git_query.predict_git_repo, repo_path, search_parent_directories)
+    repo = await asyncio.to_thread(_GitRepoDirs, repo_path, search_parent_directories)
+    head_commit = await _head_commit(repo)
+    _, _, version, commit_distance = await _latest_git_version_tag(repo, True, head_commit)
+    assert isinstance(version, Version), version
+    _apply_commit_distance(version, commit_distance, head_commit)
+    if await _is_git_repo_dirty(repo):
+        _apply_dirty(version)
+    return version
+
+
+async def query_git_repo(
+        repo_path: pathlib.Path, search_parent_directories: bool = True,
+        semaphore: t.Optional[asyncio.Semaphore] = None) -> Version:
+    """Determine version from tags of a git repository, like git_query module does.
+
+    If semaphore is not given, the one shared by all queries in the event loop is used.
+    It allows at most MAX_CONCURRENT_QUERIES queries at the same time.
+    """
+    async with semaphore or _default_semaphore():
+        return await _query_git_repo(repo_path, search_parent_directories)
+
+
+async def predict_git_repo(
+        repo_path: pathlib.Path, search_parent_directories: bool = True,
+        semaphore: t.Optional[asyncio.Semaphore] = None) -> Version:
+    """Predict version of a git repository, like git_query module does.
+
+    See query_git_repo() for how concurrency is limited.
+    """
+    async with semaphore or _default_semaphore():
+        return await _predict_git_repo(repo_path, search_parent_directories)
+
+
+async def _from_git_repo(
+        function: t.Callable[[pathlib.Path, bool], t.Awaitable[Version]],
+        path: pathlib.Path, search_parent_directories: bool) -> t.Optional[Version]:
+    """Await a git query on a path, or return None if there is no repository, like in query."""
+    folder = await asyncio.to_thread(_git_repo_folder, path, search_parent_directories)
+    if folder is None:
+        return None
+    try:
+        return await function(folder, search_parent_directories)
+    except _invalid_git_repo_errors():
+        return None
+
+
+async def query_folder(
+        path: pathlib.Path, search_parent_directories: bool = False,
+        semaphore: t.Optional[asyncio.Semaphore] = None) -> Version:
+    """Determine version of code in a given folder, like query module does.
+
+    See query_git_repo() for how concurrency is limited.
+    """
+    async with semaphore or _default_semaphore():
+        version = await _from_git_repo(_query_git_repo, path, search_parent_directories)
+        if version is not None:
+            return version
+        return await asyncio.to_thread(query_package_folder, path, search_parent_directories)
+
+
+async def predict_folder(
+        path: pathlib.Path, search_parent_directories: bool = True,
+        semaphore: t.Optional[asyncio.Semaphore] = None) -> Version:
+    """Predict version of code residing in a given folder, like query module does.
+
+    See query_git_repo() for how concurrency is limited.
+    """
+    async with semaphore or _default_semaphore():
+        priority_cutoff = 2
+        paths = [path] + (
+            list(path.parents)[:priority_cutoff] if search_parent_directories else [])
+        for pth in paths:
+            version = await _from_git_repo(_predict_git_repo, pth, False)
+            if version is not None:
+                return version
+        if await asyncio.to_thread(_may_be_package_folder, path):
+            try:
+                return await asyncio.to_thread(query_package_folder, path, False)
+            except ValueError:
+                pass
+        version = await _from_git_repo(_predict_git_repo, path, search_parent_directories)
+        if version is not None:
+            return version
+        return await asyncio.to_thread(query_package_folder, path, search_parent_directories)
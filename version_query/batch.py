@@ -0,0 +1,163 @@
+"""Querying or predicting versions of many folders at once, in parallel."""
+
+import concurrent.futures
+import functools
+import pathlib
+import queue
+import threading
+import typing as t
+
+from .version import Version
+from .query import query_folder, predict_folder, folder_version_context
+from .repo_context import RepoVersionContext
+
+__all__ = ['QueryResult', 'iter_query_many', 'query_many']
+
+_Future = concurrent.futures.Future
+
+
+class QueryResult(t.NamedTuple):
+    """Outcome of querying or predicting version of one of many folders."""
+
+    position: int
+    """Position of the folder among all queried folders."""
+    path: pathlib.Path
+    version: t.Optional[Version]
+    """Version, or None if it could not be determined."""
+    error: t.Optional[Exception]
+    """Reason why the version could not be determined, or None if it was determined."""
+    context: t.Optional[RepoVersionContext] = None
+    """Version information of the folder, if it was requested and it was determined."""
+
+
+def _version_of(
+        path: pathlib.Path, predict: bool, context: t.Optional[RepoVersionContext]) -> Version:
+    if context is not None:
+        return context.predicted if predict else context.queried
+    return predict_folder(path) if predict else query_folder(path)
+
+
+def _query_one(
+        position: int, path: pathlib.Path, predict: bool, with_context: bool) -> QueryResult:
+    try:
+        context = folder_version_context(path) if with_context else None
+    except Exception as err:  # pylint: disable = broad-exception-caught
+        return QueryResult(position, path, None, err)
+    try:
+        version = _version_of(path, predict, context)
+    except Exception as err:  # pylint: disable = broad-exception-caught
+        return QueryResult(position, path, None, err, context)
+    return QueryResult(position, path, version, None, context)
+
+
+class _Submitter(threading.Thread):
+    """Submit queries of folders to an executor while the paths are being enumerated.
+
+    Paths may come from a slow source, like standard input, so they are enumerated in a separate
+    thread, and results of the queries which are already submitted can be used in the meantime.
+    """
+
+    def __init__(
+            self, executor: concurrent.futures.Executor, paths: t.Iterable[pathlib.Path],
+            predict: bool, with_context: bool):
+        super().__init__(name='version_query-submitter', daemon=True)
+        self._submit: t.Callable[[int, pathlib.Path], _Future] = functools.partial(
+            executor.submit, functools.partial(
+                _query_one, predict=predict, with_context=with_context))
+        self._paths = paths
+        self._stopped = threading.Event()
+        self.submitted: t.List[_Future] = []
+        self.futures: 'queue.SimpleQueue[t.Optional[_Future]]' = queue.SimpleQueue()
+        """Submitted futures in order of submission, followed by None."""
+        self.completed: 'queue.SimpleQueue[t.Optional[_Future]]' = queue.SimpleQueue()
+        """Futures in order of completion, and None at the point when all were submitted."""
+        self.error: t.Optional[BaseException] = None
+        """Error raised while enumerating the paths, if any."""
+
+    def run(self) -> None:
+        try:
+            self._submit_all()
+        except BaseException as err:  # pylint: disable = broad-exception-caught
+            self.error = err
+        finally:
+            self.futures.put(None)
+            self.completed.put(None)
+
+    def _submit_all(self) -> None:
+        for position, path in enumerate(self._paths):
+            if self._stopped.is_set():
+                break
+            future = self._submit(position, path)
+            self.submitted.append(future)
+            future.add_done_callback(self.completed.put)
+            self.futures.put(future)
+
+    def stop(self) -> None:
+        """Stop submitting queries, and cancel the submitted ones which did not start yet."""
+        self._stopped.set()
+        for future in self.submitted:
+            future.cancel()
+
+    def results_in_order(self) -> t.Iterator[QueryResult]:
+        """Yield results in order of the paths."""
+        while (future := self.futures.get()) is not None:
+            yield future.result()
+
+    def results_as_completed(self) -> t.Iterator[QueryResult]:
+        """Yield results in order of their completion."""
+        results_count = 0
+        all_submitted = False
+        while not all_submitted or results_count < len(self.submitted):
+            future = self.completed.get()
+            if future is None:
+                all_submitted = True
+                continue
+            results_count += 1
+            yield future.result()
+
+
+def iter_query_many(
+        paths: t.Iterable[pathlib.Path], predict: bool = False, jobs: t.Optional[int] = None,
+        use_processes: bool = False, ordered: bool = True, *,
+        with_context: bool = False) -> t.Iterator[QueryResult]:
+    # pylint: disable = too-many-arguments
+    """Query or predict versions of many folders in parallel, and yield results as they are ready.
+
+    Folders are handled like by query_folder() or predict_folder() respectively, using a pool
+    of jobs threads (or processes, if use_processes is True). If jobs is None, the default
+    number of workers of the pool is used. Paths are enumerated while queries are running,
+    so they can be read gradually, for example from standard input.
+
+    If ordered is True, results are yielded in the order of the paths, each one as soon as it
+    and all the preceding ones are ready. Otherwise, they are yielded in the order in which
+    they become ready.
+
+    If with_context is True, folders are handled like by folder_version_context() instead,
+    the version is taken from the version information, and the information is in the result.
+
+    Errors don't stop other queries, and are reported in the results. An error raised while
+    enumerating the paths is raised after all results for the preceding paths are yielded.
+    """
+    executor_class: t.Callable[[t.Optional[int]], concurrent.futures.Executor] = (
+        concurrent.futures.ProcessPoolExecutor if use_processes
+        else concurrent.futures.ThreadPoolExecutor)
+    with executor_class(jobs) as executor:
+        submitter = _Submitter(executor, paths, predict, with_context)
+        submitter.start()
+        try:
+            yield from (
+                submitter.results_in_order() if ordered else submitter.results_as_completed())
+        finally:
+            submitter.stop()
+    if submitter.error is not None:
+        raise submitter.error
+
+
+def query_many(
+        paths: t.Iterable[pathlib.Path], predict: bool = False, jobs: t.Optional[int] = None,
+        use_processes: bool = False) -> t.List[QueryResult]:
+    """Query or predict versions of many folders in parallel, and get results in their order.
+
+    See iter_query_many() for details.
+    """
+    return list(iter_query_many(paths, predict, jobs, use_processes))
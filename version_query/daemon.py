@@ -0,0 +1,139 @@
+"""Daemon which keeps state of repositories in memory and answers version queries over a socket.
+
+Requests and responses are JSON objects, one per line. A request names the function
+(one of query_folder, predict_folder, folder_version_context), an absolute path, and optionally
+whether to search parent directories. A response has either the result (version string,
+or dictionary of the version context), or the error message and the name of the exception type.
+Many requests can be sent over one connection.
+
+Results are reused for as long as HEAD, references (including packed-refs), the index and tracked
+files of the repository stay unchanged, which is checked on each request using status of these
+files, see VersionQueryService.
+"""
+
+import json
+import logging
+import os
+import pathlib
+import signal
+import socket
+import socketserver
+import stat
+import typing as t
+
+from .repo_context import RepoVersionContext
+from .service import VersionQueryService
+from .daemon_client import DAEMON_FUNCTIONS, default_socket_path
+
+__all__ = ['VersionQueryDaemon']
+
+_LOG = logging.getLogger(__name__)
+
+
+def _parsed_request(line: bytes) -> t.Tuple[str, t.List[t.Any]]:
+    """Get name of the function and its arguments from a request."""
+    request = json.loads(line)
+    function = request['function']
+    if function not in DAEMON_FUNCTIONS:
+        raise ValueError(f'unknown function "{function}"')
+    path = pathlib.Path(request['path'])
+    if not path.is_absolute():
+        raise ValueError(f'path "{path}" is not absolute')
+    if 'search_parent_directories' not in request:
+        return function, [path]
+    return function, [path, bool(request['search_parent_directories'])]
+
+
+def _error_response(err: Exception) -> t.Dict[str, t.Any]:
+    _LOG.debug('failed to answer request', exc_info=err)
+    return {'error': str(err), 'type': type(err).__name__}
+
+
+class _RequestHandler(socketserver.StreamRequestHandler):
+    """Answer requests read from a connection, one per line, until it is closed."""
+
+    server: 'VersionQueryDaemon'
+
+    def handle(self) -> None:
+        for line in self.rfile:
+            response = self.server.answer(line)
+            self.wfile.write(json.dumps(response).encode() + b'\n')
+
+
+class VersionQueryDaemon(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    """Answer version queries sent to a Unix socket, using a long-running service.
+
+    The socket is accessible only by its owner. If a socket already exists at the given path,
+    it is replaced only if no daemon is listening on it.
+    """
+
+    daemon_threads = True
+
+    def __init__(
+            self, socket_path: t.Optional[pathlib.Path] = None,
+            service: t.Optional[VersionQueryService] = None):
+        if socket_path is None:
+            socket_path = default_socket_path()
+        self.socket_path = socket_path
+        self.service = VersionQueryService(max_size=1024, track_worktree=True) \
+            if service is None else service
+        if socket_path.exists() or socket_path.is_symlink():
+            if not stat.S_ISSOCK(socket_path.lstat().st_mode):
+                raise ValueError(f'"{socket_path}" exists and it is not a socket')
+            if self._is_listening():
+                raise ValueError(f'version query daemon is already running at "{socket_path}"')
+            _LOG.warning('removing stale socket "%s"', socket_path)
+            socket_path.unlink()
+        umask = os.umask(0o177)
+        try:
+            super().__init__(os.fspath(socket_path), _RequestHandler)
+        finally:
+            os.umask(umask)
+
+    def _is_listening(self) -> bool:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as client:
+            try:
+                client.connect(os.fspath(self.socket_path))
+            except OSError:
+                return False
+        return True
+
+    def answer(self, line: bytes) -> t.Dict[str, t.Any]:
+        """Answer a single request."""
+        try:
+            function, args = _parsed_request(line)
+        except (ValueError, KeyError, TypeError) as err:
+            return _error_response(ValueError(f'invalid request {line!r}: {err}'))
+        try:
+            result = getattr(self.service, function)(*args)
+        except Exception as err:  # pylint: disable = broad-exception-caught
+            return _error_response(err)
+        if isinstance(result, RepoVersionContext):
+            return {'result': result.to_dict()}
+        return {'result': result.to_str()}
+
+    def server_close(self) -> None:
+        """Close the socket and the service, and remove the socket file."""
+        super().server_close()
+        self.service.close()
+        try:
+            self.socket_path.unlink()
+        except FileNotFoundError:
+            pass
+
+
+def _interrupt(signum: int, frame: t.Any) -> None:
+    raise KeyboardInterrupt(f'received signal {signum}')
+
+
+def serve(socket_path: t.Optional[pathlib.Path] = None) -> None:
+    """Run the daemon until interrupted or terminated, and then remove the socket."""
+    with VersionQueryDaemon(socket_path) as daemon:
+        _LOG.info('version query daemon listening at "%s"', daemon.socket_path)
+        previous_handler = signal.signal(signal.SIGTERM, _interrupt)
+        try:
+            daemon.serve_forever()
+        except KeyboardInterrupt:
+            _LOG.info('version query daemon stopped')
+        finally:
+            signal.signal(signal.SIGTERM, previous_handler)
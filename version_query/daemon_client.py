@@ -0,0 +1,89 @@
+"""Client of the version query daemon, which answers queries over a Unix socket.
+
+Only the standard library is used here, so that asking the daemon is cheap.
+"""
+
+import getpass
+import json
+import logging
+import os
+import pathlib
+import socket
+import tempfile
+import typing as t
+
+__all__ = ['SOCKET_ENVVAR', 'default_socket_path', 'daemon_request']
+
+_LOG = logging.getLogger(__name__)
+
+SOCKET_ENVVAR = 'VERSION_QUERY_SOCKET'
+
+DAEMON_FUNCTIONS = ('query_folder', 'predict_folder', 'folder_version_context')
+
+# the daemon is not used if it doesn't answer within this many seconds
+_TIMEOUT = 30.0
+
+
+def default_socket_path() -> pathlib.Path:
+    """Get path of the socket of the daemon, configured via an environment variable.
+
+    By default, the socket is in the runtime folder of the user, or in the temporary folder.
+    """
+    path = os.environ.get(SOCKET_ENVVAR)
+    if path:
+        return pathlib.Path(path)
+    folder = os.environ.get('XDG_RUNTIME_DIR') or tempfile.gettempdir()
+    return pathlib.Path(folder, f'version_query-{getpass.getuser()}.sock')
+
+
+def _is_own_socket(path: pathlib.Path) -> bool:
+    """Check if a socket exists at a given path and belongs to the current user."""
+    try:
+        stat = path.lstat()
+    except OSError:
+        return False
+    return not hasattr(os, 'getuid') or stat.st_uid == os.getuid()
+
+
+def _exchange(socket_path: pathlib.Path, request: bytes) -> bytes:
+    """Send a request line to the daemon, and get the response line."""
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as client:
+        client.settimeout(_TIMEOUT)
+        client.connect(os.fspath(socket_path))
+        client.sendall(request)
+        with client.makefile('rb') as stream:
+            return stream.readline()
+
+
+def daemon_request(
+        function_name: str, path: pathlib.Path,
+        search_parent_directories: t.Optional[bool] = None,
+        socket_path: t.Optional[pathlib.Path] = None) -> t.Any:
+    """Ask the daemon to call one of query_folder, predict_folder or folder_version_context.
+
+    Return version string, or dictionary in case of folder_version_context, or None if the daemon
+    is not running or it failed to answer. If the function failed with ValueError in the daemon,
+    raise ValueError. Other failures are not reproduced, so that the caller computes the result
+    and fails in the same way.
+    """
+    assert function_name in DAEMON_FUNCTIONS, function_name
+    if not hasattr(socket, 'AF_UNIX'):
+        return None
+    if socket_path is None:
+        socket_path = default_socket_path()
+    if not _is_own_socket(socket_path):
+        return None
+    request: t.Dict[str, t.Any] = {'function': function_name, 'path': os.path.abspath(path)}
+    if search_parent_directories is not None:
+        request['search_parent_directories'] = search_parent_directories
+    try:
+        response = json.loads(_exchange(socket_path, json.dumps(request).encode() + b'\n'))
+    except (OSError, ValueError):
+        _LOG.debug('no answer from version query daemon at "%s"', socket_path, exc_info=True)
+        return None
+    if 'error' not in response:
+        return response['result']
+    if response.get('type') == 'ValueError':
+        raise ValueError(response['error'])
+    _LOG.debug('version query daemon failed with %s: %s', response.get('type'), response['error'])
+    return None
@@ -0,0 +1,407 @@
+"""Ways of accessing git repositories, on top of which version queries are implemented.
+
+A backend provides only what version queries need: version tags with commits they point to,
+parents of commits, HEAD commit and status of the working tree. The history walk and everything
+else is implemented on top of that, in git_query module.
+
+Available backends are:
+
+* "cli", which runs git executable for all operations except opening the repository
+  and checking tracked files in the working tree,
+* "gitpython", which reads refs and objects using object model of GitPython,
+* "files", which reads repository files directly and doesn't start any processes.
+
+Backends "cli" and "gitpython" are implemented in git_python_backends module, which is imported
+only when they are used, so that "files" backend works also where GitPython cannot be imported.
+"""
+
+import contextlib
+import functools
+import importlib
+import logging
+import pathlib
+import os
+import struct
+import subprocess
+import sys
+import typing as t
+
+from .version import Version
+from .git_commit_graph import GitCommitGraph
+from .git_files import GitFilesRepo
+from .git_index import GitIndex, GitIndexEntry
+from .git_objects import GitObjectStore
+from .git_worktree import GitWorktreeOptions, is_worktree_modified
+
+if t.TYPE_CHECKING:
+    import git
+
+    from .git_python_backends import GitCliBackend, GitPythonBackend
+
+__all__ = [
+    'GitBackend', 'GitCliBackend', 'GitPythonBackend', 'GitFilesBackend', 'GIT_BACKENDS',
+    'preprocess_git_version_tag']
+
+_LOG = logging.getLogger(__name__)
+
+
+def preprocess_git_version_tag(tag: str):
+    """Remove a prefix from a version tag."""
+    if tag.startswith('ver'):
+        if len(tag) == 3:
+            raise ValueError(f'the tag "{tag}" does not contain any version information')
+        return tag[3:]
+    if tag.startswith('v'):
+        if len(tag) == 1:
+            raise ValueError(f'the tag "{tag}" does not contain any version information')
+        return tag[1:]
+    if tag and tag[0] in ('0', '1', '2', '3', '4', '5', '6', '7', '8', '9'):
+        return tag
+    raise ValueError(f'the tag "{tag}" does not appear to be a version tag')
+
+
+def _git_tag_version(repo: object, tag_name: str) -> t.Optional[Version]:
+    try:
+        tag_str = preprocess_git_version_tag(tag_name)
+    except ValueError:
+        _LOG.debug('%s: ignoring non-version tag %s', repo, tag_name)
+        return None
+    try:
+        return Version.from_str(tag_str)
+    except ValueError:
+        # except packaging.version.InvalidVersion:
+        _LOG.warning('%s: failed to convert %s (%r) to version', repo, tag_name, tag_str)
+        return None
+
+
+_TAG_REFS_FORMAT = '%(objectname) %(objecttype) %(*objectname) %(*objecttype) %(refname)'
+
+
+def _parse_version_tag_refs(
+        repo: object, output: str) -> t.Iterator[t.Tuple[str, str, Version, t.Optional[str]]]:
+    """Iterate over version tags in "git for-each-ref" output in _TAG_REFS_FORMAT.
+
+    For each tag, (reference path, tag name, version, SHA of the tagged commit) is given, where SHA
+    is None for an annotated tag which points to another annotated tag.
+    """
+    for line in output.splitlines():
+        sha, object_type, peeled_sha, peeled_type, path = line.split(' ', 4)
+        tag_name = path[len('refs/tags/'):]
+        version = _git_tag_version(repo, tag_name)
+        if version is None:
+            continue
+        if object_type == 'tag' and peeled_type == 'commit':
+            yield path, tag_name, version, peeled_sha
+        elif object_type == 'tag' and peeled_type == 'tag':
+            yield path, tag_name, version, None
+        elif object_type != 'commit':
+            _LOG.debug('%s: ignoring tag %s which points to a %s', repo, tag_name,
+                       peeled_type or object_type)
+        else:
+            yield path, tag_name, version, sha
+
+
+class _GitParents(t.Protocol):
+    """Parents of commits in history of a git repository, as needed by the history walk."""
+
+    def parents(self, commit: str) -> t.Tuple[str, ...]:
+        """Get SHAs of parents of a commit with a given SHA."""
+
+    def generation(self, commit: str) -> t.Optional[int]:
+        """Get generation number of a commit, if it is known."""
+
+
+class _GitCommits(_GitParents, t.Protocol):
+    """Parents of commits in history of a git repository, for use in a with statement."""
+
+    def close(self) -> None:
+        """Release resources used to read the commits."""
+
+    def __enter__(self) -> '_GitCommits':
+        ...
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        ...
+
+
+class _GitStoredCommits:
+    """Parents of commits in history of a git repository, read directly from its objects.
+
+    Parents of commits present in the commit-graph are read from it, and other commits are
+    read from the object store.
+    """
+
+    def __init__(
+            self, objects: GitObjectStore, commit_graph: t.Optional[GitCommitGraph] = None):
+        self._objects = objects
+        self.commit_graph = commit_graph
+
+    def parents(self, commit: str) -> t.Tuple[str, ...]:
+        """Get SHAs of parents of a commit with a given SHA."""
+        if self.commit_graph is not None:
+            parents = self.commit_graph.parents(commit)
+            if parents is not None:
+                return parents
+        return self._objects.commit_parents(commit)
+
+    def generation(self, commit: str) -> t.Optional[int]:
+        """Get generation number of a commit, if it is known from the commit-graph."""
+        if self.commit_graph is None:
+            return None
+        return self.commit_graph.generation(commit)
+
+    def close(self) -> None:
+        """Close the commit-graph."""
+        if self.commit_graph is not None:
+            self.commit_graph.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+def _commits_between(commits: _GitParents, start: str, end: str) -> t.List[str]:
+    """List commits reachable from the end commit, but not from the start commit.
+
+    Commits are listed in topological order, i.e. each commit is listed before its parents.
+    """
+    excluded = set()
+    stack = [start]
+    while stack:
+        commit = stack.pop()
+        if commit not in excluded:
+            excluded.add(commit)
+            stack.extend(commits.parents(commit))
+    order = []
+    visited = set(excluded)
+    expanded_stack = [(end, False)]
+    while expanded_stack:
+        commit, expanded = expanded_stack.pop()
+        if expanded:
+            order.append(commit)
+        elif commit not in visited:
+            visited.add(commit)
+            expanded_stack.append((commit, True))
+            expanded_stack.extend((_, False) for _ in reversed(commits.parents(commit)))
+    return order[::-1]
+
+
+class GitBackend(t.Protocol):
+    """Access to a git repository, providing what version queries need.
+
+    Backends are created using open() class method of their type, for use in a with statement.
+    """
+
+    git_dir: pathlib.Path
+    common_dir: pathlib.Path
+    working_dir: t.Optional[pathlib.Path]
+
+    def version_tag_commits(self) -> t.Mapping[str, t.Mapping[str, Version]]:
+        """Map SHAs of commits to version tags pointing to them, and tags to their versions.
+
+        Annotated tags are peeled, and tags which don't point to a commit are ignored.
+        """
+
+    def commits(self, revs: t.Sequence[str]) -> _GitCommits:
+        """Get parents of commits in history of given revisions, for use in a with statement."""
+
+    def head_commit(self) -> str:
+        """Get SHA of the commit at HEAD."""
+
+    def is_dirty(self, untracked_files: bool = False) -> bool:
+        """Check if index or tracked files in the working tree differ from the HEAD commit.
+
+        If untracked_files is True, presence of untracked files is taken into account as well.
+        """
+
+    def revision_commits(self, revision: str) -> t.List[str]:
+        """Get SHA of the commit a revision refers to, or SHAs of all commits within a range.
+
+        Commits within a range (like "v1.0..HEAD") are listed in topological order.
+        Raise ValueError if the revision cannot be resolved.
+        """
+
+
+def _worktree_index(git_dir: pathlib.Path) -> t.Optional[GitIndex]:
+    """Read index of a repository, or return None if it cannot be used to check the working tree.
+
+    It is the case if the index is split into many files, or if it is not supported.
+    """
+    index_path = git_dir.joinpath('index')
+    if not index_path.is_file():
+        return GitIndex(2, [], 0)
+    if any(git_dir.glob('sharedindex.*')):
+        _LOG.debug('"%s" is a split index', index_path)
+        return None
+    try:
+        return GitIndex.read(index_path)
+    except (ValueError, struct.error):
+        _LOG.debug('failed to read index "%s"', index_path, exc_info=True)
+        return None
+
+
+def _git_executable() -> str:
+    """Get git executable configured in GitPython, which is imported only when git is run."""
+    import git  # pylint: disable = import-outside-toplevel
+    return git.Git.GIT_PYTHON_GIT_EXECUTABLE or 'git'
+
+
+def _is_modified_in_git(working_dir: pathlib.Path, entry: GitIndexEntry) -> bool:
+    """Check if a tracked file or a submodule differs from the index, using "git diff"."""
+    result = subprocess.run(
+        [_git_executable(), 'diff', '--quiet', '--', f':(literal){os.fsdecode(entry.path)}'],
+        cwd=working_dir, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, check=False)
+    return result.returncode != 0
+
+
+def _is_worktree_dirty(
+        git_dir: pathlib.Path, common_dir: pathlib.Path,
+        working_dir: pathlib.Path) -> t.Optional[bool]:
+    """Check if tracked files in the working tree differ from the index, like "git diff" does.
+
+    Files are checked without running git, see is_worktree_modified(), and git is run only
+    to confirm that a file whose status is inconclusive is indeed modified. Return None
+    if the index cannot be used to check the working tree, see _worktree_index().
+    """
+    index = _worktree_index(git_dir)
+    if index is None:
+        return None
+    return is_worktree_modified(
+        working_dir, index, functools.partial(_is_modified_in_git, working_dir),
+        options=GitWorktreeOptions.read(common_dir.joinpath('config')))
+
+
+def _range_commits(backend: GitBackend, resolve_commit: t.Callable[[str], str],
+                   revision: str) -> t.List[str]:
+    """List commits within a revision range of the form "<start>..<end>"."""
+    start, _, end = revision.partition('..')
+    if end.startswith('.'):
+        raise ValueError(f'symmetric difference "{revision}" is not supported in {backend}')
+    start_commit = resolve_commit(start or 'HEAD')
+    end_commit = resolve_commit(end or 'HEAD')
+    with backend.commits(()) as commits:
+        return _commits_between(commits, start_commit, end_commit)
+
+
+class GitFilesBackend:
+    """Git repository read directly from its files, see GitFilesRepo.
+
+    When peeled values of tags are recorded along with the references, annotated tags
+    are not read, and only the type of the object they point to is checked. Only revision ranges
+    of the form "<start>..<end>" are supported, and see GitFilesRepo.resolve_commit()
+    for supported revisions.
+    """
+
+    def __init__(self, repo: GitFilesRepo):
+        self.repo = repo
+        self.git_dir = repo.git_dir
+        self.common_dir = repo.common_dir
+        self.working_dir = repo.working_dir
+
+    @classmethod
+    @contextlib.contextmanager
+    def open(cls, path: pathlib.Path, search_parent_directories: bool = True) -> t.Iterator[
+            'GitFilesBackend']:
+        """Open repository at a given path, for use in a with statement."""
+        with GitFilesRepo.open(path, search_parent_directories) as repo:
+            yield cls(repo)
+
+    def __repr__(self) -> str:
+        return repr(self.repo)
+
+    def version_tag_commits(self) -> t.Mapping[str, t.Mapping[str, Version]]:
+        """Map SHAs of commits to version tags pointing to them, reading refs and objects."""
+        version_tag_commits: t.Dict[str, t.Dict[str, Version]] = {}
+        for path, (sha, peeled_sha) in self.repo.refs.refs('refs/tags/').items():
+            tag_name = path[len('refs/tags/'):]
+            version = _git_tag_version(self.repo, tag_name)
+            if version is None:
+                continue
+            if peeled_sha is not None:
+                sha = peeled_sha
+            try:
+                object_type, sha = self.repo.objects.peel(sha)
+            except ValueError:
+                _LOG.warning('%s: failed to read object of tag %s', self.repo, tag_name,
+                             exc_info=True)
+                continue
+            if object_type != 'commit':
+                _LOG.debug('%s: ignoring tag %s which points to a %s',
+                           self.repo, tag_name, object_type)
+                continue
+            if sha not in version_tag_commits:
+                version_tag_commits[sha] = {}
+            version_tag_commits[sha][tag_name] = version
+        return version_tag_commits
+
+    def commits(self, revs: t.Sequence[str]) -> _GitCommits:  # pylint: disable = unused-argument
+        return _GitStoredCommits(
+            self.repo.objects, GitCommitGraph.open(self.common_dir.joinpath('objects')))
+
+    def head_commit(self) -> str:
+        return self.repo.head_commit()
+
+    def is_dirty(self, untracked_files: bool = False) -> bool:
+        """Check if index or tracked files in the working tree differ from the HEAD commit.
+
+        Untracked files are not supported by this backend, see GitFilesRepo.is_dirty().
+        """
+        if untracked_files:
+            raise ValueError(f'untracked files in {self.repo} cannot be detected by "files"'
+                             ' backend, use "cli" backend instead')
+        return self.repo.is_dirty()
+
+    def revision_commits(self, revision: str) -> t.List[str]:
+        if '..' not in revision:
+            return [self.repo.resolve_commit(revision)]
+        return _range_commits(self, self.repo.resolve_commit, revision)
+
+
+# GitPython is imported only when one of the backends using it is needed
+_LAZY_ATTRIBUTES = {
+    'GitPythonBackend': 'git_python_backends', 'GitCliBackend': 'git_python_backends'}
+
+
+def __getattr__(name: str) -> t.Any:
+    if name not in _LAZY_ATTRIBUTES:
+        raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
+    value = getattr(importlib.import_module(f'.{_LAZY_ATTRIBUTES[name]}', __package__), name)
+    globals()[name] = value
+    return value
+
+
+def _open_lazy_backend(
+        class_name: str, path: pathlib.Path,
+        search_parent_directories: bool = True) -> t.ContextManager[GitBackend]:
+    """Open repository at a given path using a backend which is imported only when needed."""
+    backend_class = __getattr__(class_name)
+    return backend_class.open(path, search_parent_directories)
+
+
+GIT_BACKENDS: t.Dict[str, t.Callable[[pathlib.Path, bool], t.ContextManager[GitBackend]]] = {
+    'cli': functools.partial(_open_lazy_backend, 'GitCliBackend'),
+    'gitpython': functools.partial(_open_lazy_backend, 'GitPythonBackend'),
+    'files': GitFilesBackend.open}
+"""Functions which open a repository at a given path, using each of the backends, by name."""
+
+
+def _is_cli_backend(backend: GitBackend) -> bool:
+    """Check if a backend is "cli" backend, without importing it if it was not imported yet."""
+    module = sys.modules.get(f'{__package__}.{_LAZY_ATTRIBUTES["GitCliBackend"]}')
+    return module is not None and isinstance(backend, module.GitCliBackend)
+
+
+def as_git_backend(repo: t.Union['git.Repo', GitFilesRepo, GitBackend]) -> GitBackend:
+    """Get backend for an already open repository, or the given backend itself.
+
+    GitPython repositories are accessed using "cli" backend.
+    """
+    if isinstance(repo, GitFilesBackend):
+        return repo
+    if isinstance(repo, GitFilesRepo):
+        return GitFilesBackend(repo)
+    if isinstance(repo, __getattr__('GitPythonBackend')):
+        return repo
+    return __getattr__('GitCliBackend')(repo)
@@ -0,0 +1,174 @@
+"""Persistent cache of version query results, stored in the git folder of a repository.
+
+Results are stored in a single JSON file, under keys which describe the state of the repository
+that the result depends on. The file is replaced atomically, and updates are serialized using
+a lock file, so that the cache can be shared between concurrent processes.
+"""
+
+import contextlib
+import hashlib
+import json
+import logging
+import os
+import pathlib
+import sys
+import tempfile
+import time
+import typing as t
+
+from .git_index import GitIndex
+from .racy import _RACY_INTERVAL_NS
+
+if sys.platform == 'win32':
+    import msvcrt  # pylint: disable = import-error
+else:
+    import fcntl
+
+_LOG = logging.getLogger(__name__)
+
+CACHE_FILE_NAME = 'version_query_cache.json'
+
+_LOCK_FILE_NAME = 'version_query_cache.lock'
+
+_CACHE_FORMAT_VERSION = 1
+
+_MAX_ENTRIES = 64
+
+
+@contextlib.contextmanager
+def _file_lock(path: pathlib.Path) -> t.Iterator[None]:
+    """Hold an exclusive lock on a given file while in this context."""
+    with path.open('a+b') as lock_file:
+        if sys.platform == 'win32':
+            lock_file.seek(0)
+            msvcrt.locking(lock_file.fileno(), msvcrt.LK_LOCK, 1)
+            try:
+                yield
+            finally:
+                lock_file.seek(0)
+                msvcrt.locking(lock_file.fileno(), msvcrt.LK_UNLCK, 1)
+        else:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+
+
+def _stat_signature(path: pathlib.Path) -> t.Tuple[int, int, int]:
+    """Get (modification time, size, mode) of a file, or zeros if it doesn't exist."""
+    try:
+        stat = path.lstat()
+    except (FileNotFoundError, NotADirectoryError):
+        return 0, 0, 0
+    return stat.st_mtime_ns, stat.st_size, stat.st_mode
+
+
+def _digest(items: t.Iterable[t.Any]) -> str:
+    return hashlib.sha1(json.dumps(list(items)).encode()).hexdigest()
+
+
+def tag_refs_fingerprint(common_dir: pathlib.Path) -> str:
+    """Fingerprint tags of a repository using status of files in which they are stored.
+
+    Shallow clone boundary is included as well, as it limits the visible history.
+    """
+    items: t.List[t.Any] = [
+        (name, *_stat_signature(common_dir.joinpath(name)))
+        for name in ('packed-refs', 'reftable/tables.list', 'shallow')]
+    folders = [common_dir.joinpath('refs', 'tags')]
+    while folders:
+        folder = folders.pop()
+        try:
+            entries = list(os.scandir(folder))
+        except (FileNotFoundError, NotADirectoryError):
+            continue
+        for entry in sorted(entries, key=lambda _: _.name):
+            if entry.is_dir():
+                folders.append(pathlib.Path(entry.path))
+                continue
+            stat = entry.stat()
+            items.append((entry.path, stat.st_mtime_ns, stat.st_size))
+    return _digest(items)
+
+
+def worktree_fingerprint(git_dir: pathlib.Path, working_dir: pathlib.Path) -> t.Optional[str]:
+    """Fingerprint the index and status of all tracked files in the working tree.
+
+    Return None if any of the files was modified so recently, that it could be modified again
+    without changing its status.
+    """
+    index_path = git_dir.joinpath('index')
+    items: t.List[t.Any] = [_stat_signature(index_path)]
+    if index_path.is_file():
+        for entry in GitIndex.read(index_path).entries:
+            items.append(_stat_signature(working_dir.joinpath(os.fsdecode(entry.path))))
+    if max(_[0] for _ in items) > time.time_ns() - _RACY_INTERVAL_NS:
+        return None
+    return _digest(items)
+
+
+class GitResultCache:
+    """Cache of results stored in a given git folder."""
+
+    def __init__(self, git_dir: pathlib.Path):
+        self.path = git_dir.joinpath(CACHE_FILE_NAME)
+        self._lock_path = git_dir.joinpath(_LOCK_FILE_NAME)
+
+    def _load(self) -> t.Dict[str, t.Any]:
+        try:
+            data = json.loads(self.path.read_text(encoding='utf-8'))
+        except FileNotFoundError:
+            return {}
+        except (OSError, ValueError):
+            _LOG.warning('ignoring unreadable cache file "%s"', self.path, exc_info=True)
+            return {}
+        if not isinstance(data, dict) or data.get('version') != _CACHE_FORMAT_VERSION:
+            return {}
+        return data.get('entries', {})
+
+    def entries(self) -> t.Dict[str, t.Any]:
+        """Get all cached values, from the oldest to the most recently stored."""
+        return self._load()
+
+    def get(self, key: str) -> t.Any:
+        """Get a cached value, or None if there is no value for a given key."""
+        value = self._load().get(key)
+        _LOG.debug('cache %s for "%s"', 'miss' if value is None else 'hit', key)
+        return value
+
+    def put(self, key: str, value: t.Any) -> None:
+        """Store a value under a given key, evicting the oldest values if needed.
+
+        If the cache file cannot be written, the value is not stored, just like unreadable
+        cache file is treated as having no values.
+        """
+        try:
+            with _file_lock(self._lock_path):
+                entries = self._load()
+                entries.pop(key, None)
+                entries[key] = value
+                while len(entries) > _MAX_ENTRIES:
+                    del entries[next(iter(entries))]
+                self._store(entries)
+        except OSError:
+            _LOG.debug('failed to store "%s" in cache file "%s"', key, self.path, exc_info=True)
+
+    def _store(self, entries: t.Dict[str, t.Any]) -> None:
+        """Replace the cache file with given entries, removing the temporary file on failure."""
+        with tempfile.NamedTemporaryFile(
+                'w', encoding='utf-8', dir=self.path.parent, prefix=f'{self.path.name}.',
+                suffix='.tmp', delete=False) as cache_file:
+            json.dump({'version': _CACHE_FORMAT_VERSION, 'entries': entries}, cache_file)
+        try:
+            os.replace(cache_file.name, self.path)
+        except OSError:
+            with contextlib.suppress(OSError):
+                os.unlink(cache_file.name)
+            raise
+
+    def clear(self) -> None:
+        """Remove all cached values."""
+        with _file_lock(self._lock_path):
+            with contextlib.suppress(FileNotFoundError):
+                self.path.unlink()
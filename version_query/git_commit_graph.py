@@ -0,0 +1,209 @@
+"""Reader of commit-graph files, which store the structure of git history.
+
+The commit-graph file (or a chain of them) lists commits in lexicographic order of their SHAs,
+and for each commit provides positions of its parents and its generation number. These are
+enough to walk the history without reading any commit objects.
+
+File format is described in git documentation, in "gitformat-commit-graph".
+"""
+
+import bisect
+import logging
+import mmap
+import pathlib
+import struct
+import typing as t
+
+_LOG = logging.getLogger(__name__)
+
+_SIGNATURE = b'CGPH'
+
+_HASH_LENGTHS = {1: 20, 2: 32}
+
+_CHUNK_OID_FANOUT = b'OIDF'
+_CHUNK_OID_LOOKUP = b'OIDL'
+_CHUNK_COMMIT_DATA = b'CDAT'
+_CHUNK_EXTRA_EDGES = b'EDGE'
+
+_PARENT_NONE = 0x70000000
+_PARENT_EXTRA_EDGES = 0x80000000
+_PARENT_POSITION_MASK = 0x7fffffff
+
+
+class CommitGraphFile:
+    """Single commit-graph file, memory-mapped for reading."""
+
+    # pylint: disable = too-many-instance-attributes
+
+    def __init__(self, path: pathlib.Path):
+        self.path = path
+        with path.open('rb') as graph_file:
+            self._data = mmap.mmap(graph_file.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            self._parse_header()
+        except (ValueError, struct.error):
+            self.close()
+            raise
+
+    def _parse_header(self) -> None:
+        signature, version, hash_version, chunk_count, self.base_graph_count = \
+            struct.unpack_from('>4sBBBB', self._data, 0)
+        if signature != _SIGNATURE or version != 1 or hash_version not in _HASH_LENGTHS:
+            raise ValueError(f'unsupported commit-graph file {self.path}: signature {signature!r},'
+                             f' version {version}, hash version {hash_version}')
+        self.hash_length = _HASH_LENGTHS[hash_version]
+        chunks = {}
+        for i in range(chunk_count):
+            chunk_id, offset = struct.unpack_from('>4sQ', self._data, 8 + 12 * i)
+            chunks[chunk_id] = offset
+        for chunk_id in (_CHUNK_OID_FANOUT, _CHUNK_OID_LOOKUP, _CHUNK_COMMIT_DATA):
+            if chunk_id not in chunks:
+                raise ValueError(f'commit-graph file {self.path} lacks {chunk_id!r} chunk')
+        self._fanout = struct.unpack_from('>256I', self._data, chunks[_CHUNK_OID_FANOUT])
+        self._oid_lookup = chunks[_CHUNK_OID_LOOKUP]
+        self._commit_data = chunks[_CHUNK_COMMIT_DATA]
+        self._extra_edges = chunks.get(_CHUNK_EXTRA_EDGES)
+        self.commit_count = self._fanout[255]
+
+    def close(self) -> None:
+        self._data.close()
+
+    def oid(self, position: int) -> bytes:
+        """Get object ID of a commit at a given position in this file."""
+        offset = self._oid_lookup + position * self.hash_length
+        return self._data[offset:offset + self.hash_length]
+
+    def position(self, oid: bytes) -> t.Optional[int]:
+        """Find position of a commit with a given object ID in this file, if it is present."""
+        low = self._fanout[oid[0] - 1] if oid[0] > 0 else 0
+        high = self._fanout[oid[0]]
+        while low < high:
+            middle = (low + high) // 2
+            middle_oid = self.oid(middle)
+            if middle_oid < oid:
+                low = middle + 1
+            elif middle_oid > oid:
+                high = middle
+            else:
+                return middle
+        return None
+
+    def commit_data(self, position: int) -> t.Tuple[int, int, int]:
+        """Get (first parent, second parent, generation number) of a commit at a given position.
+
+        Parent values are stored as-is, and they need to be decoded.
+        """
+        offset = self._commit_data + position * (self.hash_length + 16) + self.hash_length
+        parent_1, parent_2, generation_and_date = struct.unpack_from('>IIQ', self._data, offset)
+        return parent_1, parent_2, generation_and_date >> 34
+
+    def extra_edges(self, index: int) -> t.List[int]:
+        """Get positions of parents listed in the extra edges chunk, starting at a given index."""
+        if self._extra_edges is None:
+            raise ValueError(f'commit-graph file {self.path} lacks {_CHUNK_EXTRA_EDGES!r} chunk')
+        positions = []
+        while True:
+            edge, = struct.unpack_from('>I', self._data, self._extra_edges + 4 * index)
+            positions.append(edge & _PARENT_POSITION_MASK)
+            if edge & _PARENT_EXTRA_EDGES:
+                return positions
+            index += 1
+
+
+class GitCommitGraph:
+    """Commit-graph of a git repository, possibly split into a chain of files.
+
+    Positions of commits are global for the whole chain - commits from the base file come first.
+    """
+
+    def __init__(self, files: t.Sequence[CommitGraphFile]):
+        self.files = files
+        self._offsets = []
+        offset = 0
+        for graph_file in files:
+            self._offsets.append(offset)
+            offset += graph_file.commit_count
+        self.commit_count = offset
+
+    @classmethod
+    def open(cls, objects_dir: pathlib.Path) -> t.Optional['GitCommitGraph']:
+        """Open commit-graph in a given git objects folder, return None if there is none."""
+        info_dir = objects_dir.joinpath('info')
+        paths = [info_dir.joinpath('commit-graph')]
+        if not paths[0].is_file():
+            chain_path = info_dir.joinpath('commit-graphs', 'commit-graph-chain')
+            if not chain_path.is_file():
+                return None
+            paths = [chain_path.with_name(f'graph-{_}.graph')
+                     for _ in chain_path.read_text(encoding='ascii').split()]
+        files: t.List[CommitGraphFile] = []
+        for path in paths:
+            try:
+                graph_file = CommitGraphFile(path)
+            except (OSError, ValueError, struct.error):
+                _LOG.warning('failed to read commit-graph file "%s"', path, exc_info=True)
+                for opened_file in files:
+                    opened_file.close()
+                return None
+            files.append(graph_file)
+        _LOG.debug('using commit-graph in "%s" with %i files', objects_dir, len(files))
+        return cls(files)
+
+    def close(self) -> None:
+        for graph_file in self.files:
+            graph_file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def _locate(self, position: int) -> t.Tuple[CommitGraphFile, int]:
+        index = bisect.bisect_right(self._offsets, position) - 1
+        return self.files[index], position - self._offsets[index]
+
+    def position(self, sha: str) -> t.Optional[int]:
+        """Find global position of a commit with a given SHA, if it is in the commit-graph."""
+        oid = bytes.fromhex(sha)
+        for graph_file, offset in zip(reversed(self.files), reversed(self._offsets)):
+            position = graph_file.position(oid)
+            if position is not None:
+                return offset + position
+        return None
+
+    def sha(self, position: int) -> str:
+        """Get SHA of a commit at a given global position."""
+        graph_file, position = self._locate(position)
+        return graph_file.oid(position).hex()
+
+    def parent_positions(self, position: int) -> t.List[int]:
+        """Get global positions of parents of a commit at a given global position."""
+        graph_file, local_position = self._locate(position)
+        parent_1, parent_2, _ = graph_file.commit_data(local_position)
+        if parent_1 == _PARENT_NONE:
+            return []
+        if parent_2 == _PARENT_NONE:
+            return [parent_1]
+        if parent_2 & _PARENT_EXTRA_EDGES:
+            return [parent_1, *graph_file.extra_edges(parent_2 & _PARENT_POSITION_MASK)]
+        return [parent_1, parent_2]
+
+    def parents(self, sha: str) -> t.Optional[t.Tuple[str, ...]]:
+        """Get SHAs of parents of a commit, or None if the commit is not in the commit-graph."""
+        position = self.position(sha)
+        if position is None:
+            return None
+        return tuple(self.sha(_) for _ in self.parent_positions(position))
+
+    def generation(self, sha: str) -> t.Optional[int]:
+        """Get generation number of a commit, or None if the commit is not in the commit-graph.
+
+        Generation number (a.k.a. topological level) of a commit is greater than generation
+        numbers of all its ancestors. Zero means that the generation number was not computed.
+        """
+        position = self.position(sha)
+        if position is None:
+            return None
+        graph_file, position = self._locate(position)
+        return graph_file.commit_data(position)[2]
@@ -0,0 +1,220 @@
+"""Git repository read directly from its files, without running git.
+
+Only the information needed to determine the version is available: references, history of
+commits and whether tracked files differ from the last commit.
+"""
+
+import logging
+import pathlib
+import re
+import typing as t
+
+from .git_index import MODE_DIRECTORY, GitIndex
+from .git_objects import GitObjectStore
+from .git_refs import GitRefStore
+from .git_worktree import GitWorktreeOptions, is_worktree_modified
+
+_LOG = logging.getLogger(__name__)
+
+_GITDIR_FILE_PREFIX = 'gitdir: '
+
+_SHA_PATTERN = re.compile(r'[0-9a-f]{40}')
+
+_REVISION_SUFFIX_PATTERN = re.compile(r'([~^])([0-9]*)$')
+
+_REF_NAME_RULES = (
+    '{}', 'refs/{}', 'refs/tags/{}', 'refs/heads/{}', 'refs/remotes/{}', 'refs/remotes/{}/HEAD')
+
+
+class NoSuchPathError(ValueError):
+    """Path at which a repository is looked for does not exist."""
+
+
+class InvalidGitRepositoryError(ValueError):
+    """Path at which a repository is looked for is not in a git repository."""
+
+
+def _is_git_dir(path: pathlib.Path) -> bool:
+    return path.joinpath('HEAD').is_file() and (
+        path.joinpath('commondir').is_file()
+        or path.joinpath('objects').is_dir() and path.joinpath('refs').is_dir())
+
+
+def _git_dir_of(path: pathlib.Path) -> t.Optional[pathlib.Path]:
+    """Get git folder of a working tree at a given path, if there is one."""
+    dot_git = path.joinpath('.git')
+    if dot_git.is_file():
+        text = dot_git.read_text(encoding='utf-8').strip()
+        if text.startswith(_GITDIR_FILE_PREFIX):
+            dot_git = path.joinpath(text[len(_GITDIR_FILE_PREFIX):]).resolve()
+    if _is_git_dir(dot_git):
+        return dot_git
+    return None
+
+
+def find_git_dir(
+        path: pathlib.Path, search_parent_directories: bool = True) -> t.Tuple[
+            pathlib.Path, t.Optional[pathlib.Path]]:
+    """Find (git folder, working tree folder) of a repository at a given path.
+
+    Working tree folder is None for bare repositories. Raise NoSuchPathError if the path
+    does not exist, and InvalidGitRepositoryError if it is not in a repository.
+    """
+    if not path.exists():
+        raise NoSuchPathError(f'path "{path}" does not exist')
+    path = path.resolve()
+    for candidate in (path, *path.parents) if search_parent_directories else (path,):
+        git_dir = _git_dir_of(candidate)
+        if git_dir is not None:
+            return git_dir, candidate
+        if _is_git_dir(candidate):
+            return candidate, None
+    raise InvalidGitRepositoryError(f'no git repository at "{path}"')
+
+
+def find_common_dir(git_dir: pathlib.Path) -> pathlib.Path:
+    """Find common git folder of a repository, which differs from its git folder in worktrees."""
+    commondir_path = git_dir.joinpath('commondir')
+    if not commondir_path.is_file():
+        return git_dir
+    return git_dir.joinpath(commondir_path.read_text(encoding='utf-8').strip()).resolve()
+
+
+class GitFilesRepo:
+    """Git repository read directly from its files."""
+
+    def __init__(self, git_dir: pathlib.Path, working_dir: t.Optional[pathlib.Path] = None):
+        self.git_dir = git_dir
+        self.working_dir = working_dir
+        self.common_dir = find_common_dir(git_dir)
+        self.objects = GitObjectStore(self.common_dir.joinpath('objects'))
+        self.refs = GitRefStore(git_dir, self.common_dir)
+
+    @classmethod
+    def open(cls, path: pathlib.Path, search_parent_directories: bool = True) -> 'GitFilesRepo':
+        """Open repository at a given path, like git.Repo() does."""
+        return cls(*find_git_dir(path, search_parent_directories))
+
+    def __repr__(self) -> str:
+        return f'<{type(self).__name__} "{self.git_dir}">'
+
+    def close(self) -> None:
+        self.objects.close()
+        self.refs.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def head_commit(self) -> str:
+        """Get SHA of the commit at HEAD."""
+        sha = self.refs.resolve('HEAD')
+        if sha is None:
+            raise ValueError(f'HEAD of {self} does not point to any commit')
+        object_type, sha = self.objects.peel(sha)
+        if object_type != 'commit':
+            raise ValueError(f'HEAD of {self} points to a {object_type}')
+        return sha
+
+    def _commit_of_name(self, name: str) -> str:
+        """Get SHA of the commit that a given SHA or reference name refers to."""
+        sha = name if _SHA_PATTERN.fullmatch(name) else None
+        for rule in () if sha is not None else _REF_NAME_RULES:
+            sha = self.refs.resolve(rule.format(name))
+            if sha is not None:
+                break
+        if sha is None:
+            raise ValueError(f'unknown revision "{name}" in {self}')
+        object_type, sha = self.objects.peel(sha)
+        if object_type != 'commit':
+            raise ValueError(f'revision "{name}" in {self} points to a {object_type}')
+        return sha
+
+    def resolve_commit(self, revision: str) -> str:
+        """Get SHA of the commit that a given revision refers to.
+
+        Supported revisions are full SHAs and reference names, either full or abbreviated
+        (like "v1.0" or "main", looked up in the same order as by git), optionally followed
+        by any number of "~<n>" and "^<n>" suffixes.
+        """
+        suffixes = []
+        match = _REVISION_SUFFIX_PATTERN.search(revision)
+        while match is not None and match.start() > 0:
+            suffixes.append((match.group(1), int(match.group(2) or 1)))
+            revision = revision[:match.start()]
+            match = _REVISION_SUFFIX_PATTERN.search(revision)
+        sha = self._commit_of_name(revision)
+        for operator, number in reversed(suffixes):
+            for _ in range(number if operator == '~' else min(number, 1)):
+                parents = self.objects.commit_parents(sha)
+                index = 0 if operator == '~' else number - 1
+                if index >= len(parents):
+                    raise ValueError(f'commit {sha} in {self} has no parent number {index + 1}')
+                sha = parents[index]
+        return sha
+
+    def tree_entries(
+            self, sha: str, prefix: bytes = b'',
+            stop_at: t.Container[bytes] = ()) -> t.Dict[bytes, t.Tuple[int, str]]:
+        """Map paths of all entries in a given tree and its subtrees to their (mode, SHA).
+
+        Subtrees with paths in stop_at are included as entries, and not read.
+        """
+        # pylint: disable = too-many-locals
+        entries = {}
+        trees = [(prefix, sha)]
+        while trees:
+            tree_prefix, tree_sha = trees.pop()
+            object_type, data = self.objects.read(tree_sha)
+            if object_type != 'tree':
+                raise ValueError(f'object {tree_sha} is a {object_type}, not a tree')
+            offset = 0
+            while offset < len(data):
+                mode_end = data.index(b' ', offset)
+                name_end = data.index(b'\0', mode_end)
+                mode = int(data[offset:mode_end], 8)
+                path = tree_prefix + data[mode_end + 1:name_end]
+                entry_sha = data[name_end + 1:name_end + 21].hex()
+                offset = name_end + 21
+                if mode == MODE_DIRECTORY and path not in stop_at:
+                    trees.append((path + b'/', entry_sha))
+                else:
+                    entries[path] = mode, entry_sha
+        return entries
+
+    def _is_index_staged(self, index: GitIndex) -> bool:
+        """Check if index differs from the tree of the HEAD commit."""
+        sparse_dirs = {_.path.rstrip(b'/') for _ in index.entries if _.mode == MODE_DIRECTORY}
+        _, commit = self.objects.read(self.head_commit())
+        tree = commit[5:commit.index(b'\n')].decode()
+        head_entries = self.tree_entries(tree, stop_at=sparse_dirs)
+        if len(head_entries) != len(index.entries):
+            return True
+        for entry in index.entries:
+            if entry.stage or entry.intent_to_add:
+                return True
+            if head_entries.get(entry.path.rstrip(b'/')) != (entry.mode, entry.sha):
+                return True
+        return False
+
+    def is_dirty(self) -> bool:
+        """Check if index or tracked files in the working tree differ from the HEAD commit.
+
+        Files are compared with the index by their status, and hashed only if status
+        is inconclusive, see is_worktree_modified(). Content filters (like end-of-line conversion)
+        are not applied, and submodules are only checked for presence. Untracked files
+        are not taken into account, because that would require applying ignore rules.
+        """
+        if self.working_dir is None:
+            return False
+        index_path = self.git_dir.joinpath('index')
+        if not index_path.is_file():
+            return self._is_index_staged(GitIndex(2, [], 0))
+        index = GitIndex.read(index_path)
+        if self._is_index_staged(index):
+            return True
+        return is_worktree_modified(
+            self.working_dir, index,
+            options=GitWorktreeOptions.read(self.common_dir.joinpath('config')))
@@ -0,0 +1,129 @@
+"""Read-only access to the index (a.k.a. staging area) of a git repository, without running git.
+
+Index versions 2, 3 and 4 are supported. Extensions stored after the entries are not read.
+
+File format is described in git documentation, in "gitformat-index".
+"""
+
+import logging
+import mmap
+import os
+import pathlib
+import struct
+import typing as t
+
+from .git_objects import read_offset_varint
+
+_LOG = logging.getLogger(__name__)
+
+_SIGNATURE = b'DIRC'
+
+_ENTRY_STAT = struct.Struct('>10I')
+
+_FLAG_ASSUME_VALID = 0x8000
+_FLAG_EXTENDED = 0x4000
+_FLAG_STAGE_MASK = 0x3000
+_FLAG_NAME_MASK = 0x0fff
+
+_EXTENDED_FLAG_SKIP_WORKTREE = 0x4000
+_EXTENDED_FLAG_INTENT_TO_ADD = 0x2000
+
+MODE_DIRECTORY = 0o040000
+MODE_SYMLINK = 0o120000
+MODE_GITLINK = 0o160000
+
+
+class GitIndexEntry(t.NamedTuple):
+    """Single entry of git index."""
+
+    path: bytes
+    sha: str
+    mode: int
+    size: int
+    mtime_s: int
+    mtime_ns: int
+    ctime_s: int
+    ctime_ns: int
+    dev: int
+    ino: int
+    stage: int
+    assume_valid: bool
+    skip_worktree: bool
+    intent_to_add: bool
+
+
+class GitIndex:
+    """Entries of git index file, in the order in which they are stored."""
+
+    # pylint: disable = too-few-public-methods
+
+    def __init__(self, version: int, entries: t.Sequence[GitIndexEntry], mtime_ns: int):
+        self.version = version
+        self.entries = entries
+        self.mtime_ns = mtime_ns
+
+    @classmethod
+    def read(cls, path: pathlib.Path, hash_length: int = 20) -> 'GitIndex':
+        """Read git index from a given file, which is memory-mapped while it is being read."""
+        with path.open('rb') as file:
+            mtime_ns = os.fstat(file.fileno()).st_mtime_ns
+            try:
+                data = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+            except ValueError as err:  # empty file cannot be mapped
+                raise ValueError(f'unsupported index file {path}: {err}') from err
+        with data:
+            version, entries = _read_entries(path, data, hash_length)
+        _LOG.debug('read %i entries from index file "%s" version %i', len(entries), path, version)
+        return cls(version, entries, mtime_ns)
+
+
+def _name_end(data: mmap.mmap, offset: int) -> int:
+    end = data.find(b'\0', offset)
+    if end < 0:
+        raise ValueError(f'unterminated path in index entry at offset {offset}')
+    return end
+
+
+def _read_entries(
+        path: pathlib.Path, data: mmap.mmap,
+        hash_length: int) -> t.Tuple[int, t.List[GitIndexEntry]]:
+    """Read version and all entries of git index."""
+    # pylint: disable = too-many-locals
+    signature, version, entry_count = struct.unpack_from('>4sII', data, 0)
+    if signature != _SIGNATURE or version not in (2, 3, 4):
+        raise ValueError(f'unsupported index file {path}: signature {signature!r},'
+                         f' version {version}')
+    entries = []
+    offset = 12
+    previous_path = b''
+    for _ in range(entry_count):
+        entry_offset = offset
+        ctime_s, ctime_ns_part, mtime_s, mtime_ns_part, dev, ino, mode, _, _, size = \
+            _ENTRY_STAT.unpack_from(data, offset)
+        offset += _ENTRY_STAT.size
+        sha = data[offset:offset + hash_length].hex()
+        offset += hash_length
+        flags, = struct.unpack_from('>H', data, offset)
+        offset += 2
+        extended_flags = 0
+        if flags & _FLAG_EXTENDED:
+            extended_flags, = struct.unpack_from('>H', data, offset)
+            offset += 2
+        if version == 4:
+            strip_length, offset = read_offset_varint(data, offset)
+            end = _name_end(data, offset)
+            entry_path = previous_path[:len(previous_path) - strip_length] + data[offset:end]
+            offset = end + 1
+        else:
+            name_length = flags & _FLAG_NAME_MASK
+            if name_length == _FLAG_NAME_MASK:
+                name_length = _name_end(data, offset) - offset
+            entry_path = data[offset:offset + name_length]
+            offset = entry_offset + ((offset + name_length - entry_offset + 8) & ~7)
+        previous_path = entry_path
+        entries.append(GitIndexEntry(
+            entry_path, sha, mode, size, mtime_s, mtime_ns_part, ctime_s, ctime_ns_part, dev, ino,
+            (flags & _FLAG_STAGE_MASK) >> 12, bool(flags & _FLAG_ASSUME_VALID),
+            bool(extended_flags & _EXTENDED_FLAG_SKIP_WORKTREE),
+            bool(extended_flags & _EXTENDED_FLAG_INTENT_TO_ADD)))
+    return version, entries
@@ -0,0 +1,423 @@
+"""Read-only access to objects of a git repository, without running git.
+
+Objects are read either from loose object files, or from packfiles, which are located using
+their memory-mapped index files. Deltified objects in packfiles are reconstructed from their
+bases. Only the parts of objects that are needed to walk the history are interpreted.
+
+File formats are described in git documentation, in "gitformat-pack".
+"""
+
+import collections
+import logging
+import mmap
+import pathlib
+import struct
+import typing as t
+import zlib
+
+_LOG = logging.getLogger(__name__)
+
+_PACK_INDEX_SIGNATURE = b'\377tOc'
+
+_PACK_SIGNATURE = b'PACK'
+
+_OBJECT_TYPES = {1: 'commit', 2: 'tree', 3: 'blob', 4: 'tag'}
+
+_OFS_DELTA = 6
+
+_REF_DELTA = 7
+
+_LARGE_OFFSET = 0x80000000
+
+_INFLATE_CHUNK_SIZE = 8192
+
+_CACHE_SIZE = 256
+
+
+def _inflate(data: t.Union[bytes, mmap.mmap], offset: int) -> bytes:
+    """Decompress zlib stream starting at a given offset, without reading past its end."""
+    decompressor = zlib.decompressobj()
+    chunks = []
+    while not decompressor.eof:
+        chunk = data[offset:offset + _INFLATE_CHUNK_SIZE]
+        if not chunk:
+            raise ValueError(f'truncated zlib stream at offset {offset}')
+        chunks.append(decompressor.decompress(chunk))
+        offset += len(chunk)
+    return b''.join(chunks)
+
+
+def _delta_size(delta: bytes, index: int) -> t.Tuple[int, int]:
+    size = 0
+    shift = 0
+    while True:
+        byte = delta[index]
+        index += 1
+        size |= (byte & 0x7f) << shift
+        shift += 7
+        if not byte & 0x80:
+            return index, size
+
+
+def apply_delta(base: bytes, delta: bytes) -> bytes:
+    """Reconstruct an object from its base object and a delta."""
+    index, base_size = _delta_size(delta, 0)
+    if base_size != len(base):
+        raise ValueError(f'delta expects base of size {base_size} but got {len(base)}')
+    index, result_size = _delta_size(delta, index)
+    result = bytearray()
+    while index < len(delta):
+        opcode = delta[index]
+        index += 1
+        if opcode & 0x80:
+            offset = 0
+            for i in range(4):
+                if opcode & (1 << i):
+                    offset |= delta[index] << (8 * i)
+                    index += 1
+            size = 0
+            for i in range(3):
+                if opcode & (0x10 << i):
+                    size |= delta[index] << (8 * i)
+                    index += 1
+            result += base[offset:offset + (size or 0x10000)]
+        elif opcode:
+            result += delta[index:index + opcode]
+            index += opcode
+        else:
+            raise ValueError('invalid delta instruction')
+    if len(result) != result_size:
+        raise ValueError(f'delta expects result of size {result_size} but got {len(result)}')
+    return bytes(result)
+
+
+def read_offset_varint(data: t.Union[bytes, mmap.mmap], offset: int) -> t.Tuple[int, int]:
+    """Decode variable-length integer starting at a given offset, return (value, offset after).
+
+    This encoding is used for offsets of delta bases in packfiles, as well as in index
+    and reftable files.
+    """
+    byte = data[offset]
+    offset += 1
+    value = byte & 0x7f
+    while byte & 0x80:
+        byte = data[offset]
+        offset += 1
+        value = ((value + 1) << 7) | (byte & 0x7f)
+    return value, offset
+
+
+def _mmap_file(path: pathlib.Path) -> mmap.mmap:
+    with path.open('rb') as file:
+        return mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+class PackIndex:
+    """Memory-mapped index of a packfile, version 1 or 2."""
+
+    # pylint: disable = too-many-instance-attributes
+
+    def __init__(self, path: pathlib.Path, hash_length: int = 20):
+        self.path = path
+        self.hash_length = hash_length
+        self._data = _mmap_file(path)
+        if self._data[:4] == _PACK_INDEX_SIGNATURE:
+            version, = struct.unpack_from('>I', self._data, 4)
+            if version != 2:
+                self.close()
+                raise ValueError(f'unsupported pack index {path} version {version}')
+            fanout_offset = 8
+        else:
+            version = 1
+            fanout_offset = 0
+        self.version = version
+        self._fanout = struct.unpack_from('>256I', self._data, fanout_offset)
+        self.object_count = self._fanout[255]
+        self._names = fanout_offset + 256 * 4
+        if version == 2:
+            self._offsets = self._names + self.object_count * (hash_length + 4)
+            self._large_offsets = self._offsets + self.object_count * 4
+
+    def close(self) -> None:
+        self._data.close()
+
+    def _name(self, position: int) -> bytes:
+        if self.version == 1:
+            offset = self._names + position * (4 + self.hash_length) + 4
+        else:
+            offset = self._names + position * self.hash_length
+        return self._data[offset:offset + self.hash_length]
+
+    def _offset(self, position: int) -> int:
+        if self.version == 1:
+            offset, = struct.unpack_from(
+                '>I', self._data, self._names + position * (4 + self.hash_length))
+            return offset
+        offset, = struct.unpack_from('>I', self._data, self._offsets + position * 4)
+        if offset & _LARGE_OFFSET:
+            offset, = struct.unpack_from(
+                '>Q', self._data, self._large_offsets + (offset & ~_LARGE_OFFSET) * 8)
+        return offset
+
+    def offset(self, oid: bytes) -> t.Optional[int]:
+        """Find offset of an object with a given ID in the packfile, if it is present."""
+        low = self._fanout[oid[0] - 1] if oid[0] > 0 else 0
+        high = self._fanout[oid[0]]
+        while low < high:
+            middle = (low + high) // 2
+            middle_oid = self._name(middle)
+            if middle_oid < oid:
+                low = middle + 1
+            elif middle_oid > oid:
+                high = middle
+            else:
+                return self._offset(middle)
+        return None
+
+
+class Pack:
+    """Memory-mapped packfile together with its index."""
+
+    def __init__(self, index: PackIndex):
+        self.index = index
+        self.path = index.path.with_suffix('.pack')
+        self._data: t.Optional[mmap.mmap] = None
+
+    @property
+    def data(self) -> mmap.mmap:
+        """Contents of the packfile, memory-mapped on first access."""
+        if self._data is None:
+            self._data = _mmap_file(self.path)
+            if self._data[:4] != _PACK_SIGNATURE:
+                raise ValueError(f'{self.path} is not a packfile')
+        return self._data
+
+    def close(self) -> None:
+        if self._data is not None:
+            self._data.close()
+        self.index.close()
+
+    def entry(self, offset: int) -> t.Tuple[int, t.Union[int, bytes, None], int]:
+        """Get (type, delta base, offset of data) of an object at a given offset.
+
+        Delta base is an offset for offset deltas, an object ID for reference deltas,
+        and None for non-deltified objects.
+        """
+        data = self.data
+        entry_offset = offset
+        byte = data[offset]
+        object_type = (byte >> 4) & 0x7
+        offset += 1
+        while byte & 0x80:
+            byte = data[offset]
+            offset += 1
+        if object_type == _OFS_DELTA:
+            distance, offset = read_offset_varint(data, offset)
+            return object_type, entry_offset - distance, offset
+        if object_type == _REF_DELTA:
+            hash_length = self.index.hash_length
+            return object_type, data[offset:offset + hash_length], offset + hash_length
+        return object_type, None, offset
+
+    def inflate(self, offset: int) -> bytes:
+        """Decompress data of an object, starting at a given offset."""
+        return _inflate(self.data, offset)
+
+
+class GitObjectStore:
+    """Objects of a git repository, read directly from its objects folder.
+
+    Objects from alternate object stores (listed in "info/alternates") are also available.
+    """
+
+    def __init__(self, objects_dir: pathlib.Path, hash_length: int = 20):
+        self.objects_dir = objects_dir
+        self.hash_length = hash_length
+        self._packs: t.Optional[t.List[Pack]] = None
+        self._alternates: t.Optional[t.List['GitObjectStore']] = None
+        self._cache: t.OrderedDict[t.Tuple[str, int], t.Tuple[str, bytes]] = \
+            collections.OrderedDict()
+
+    @property
+    def packs(self) -> t.List[Pack]:
+        """Packfiles in the objects folder, opened on first access."""
+        if self._packs is None:
+            self._packs = [Pack(PackIndex(path, self.hash_length))
+                           for path in sorted(self.objects_dir.joinpath('pack').glob('*.idx'))]
+            _LOG.debug('found %i packfiles in "%s"', len(self._packs), self.objects_dir)
+        return self._packs
+
+    @property
+    def alternates(self) -> t.List['GitObjectStore']:
+        """Alternate object stores, opened on first access."""
+        if self._alternates is None:
+            self._alternates = []
+            alternates_path = self.objects_dir.joinpath('info', 'alternates')
+            if alternates_path.is_file():
+                for line in alternates_path.read_text(encoding='utf-8').splitlines():
+                    if line and not line.startswith('#'):
+                        self._alternates.append(GitObjectStore(
+                            self.objects_dir.joinpath(line).resolve(), self.hash_length))
+        return self._alternates
+
+    def close(self) -> None:
+        """Close all packfiles and alternate object stores."""
+        for pack in self._packs or ():
+            pack.close()
+        for alternate in self._alternates or ():
+            alternate.close()
+        self._packs = None
+        self._alternates = None
+        self._cache.clear()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def _read_loose(self, sha: str) -> t.Optional[t.Tuple[str, bytes]]:
+        path = self.objects_dir.joinpath(sha[:2], sha[2:])
+        try:
+            raw = zlib.decompress(path.read_bytes())
+        except FileNotFoundError:
+            return None
+        header, _, data = raw.partition(b'\0')
+        object_type, _, _ = header.partition(b' ')
+        return object_type.decode(), data
+
+    def _loose_object_type(self, sha: str) -> t.Optional[str]:
+        path = self.objects_dir.joinpath(sha[:2], sha[2:])
+        try:
+            object_file = path.open('rb')
+        except FileNotFoundError:
+            return None
+        with object_file:
+            decompressor = zlib.decompressobj()
+            header = b''
+            while b' ' not in header:
+                chunk = object_file.read(_INFLATE_CHUNK_SIZE)
+                if not chunk:
+                    raise ValueError(f'truncated object file {path}')
+                header += decompressor.decompress(chunk, 64)
+        return header.partition(b' ')[0].decode()
+
+    def _packed_object_type(self, pack: Pack, offset: int) -> str:
+        """Get type of an object in a packfile, reading only headers of the entries."""
+        while True:
+            entry_type, base, _ = pack.entry(offset)
+            if entry_type in _OBJECT_TYPES:
+                return _OBJECT_TYPES[entry_type]
+            if entry_type == _OFS_DELTA:
+                assert isinstance(base, int), base
+                offset = base
+                continue
+            if entry_type != _REF_DELTA:
+                raise ValueError(f'unsupported object type {entry_type} in {pack.path}')
+            assert isinstance(base, bytes), base
+            base_offset = pack.index.offset(base)
+            if base_offset is None:
+                return self.object_type(base.hex())
+            offset = base_offset
+
+    def _object_type(self, sha: str) -> t.Optional[str]:
+        object_type = self._loose_object_type(sha)
+        if object_type is not None:
+            return object_type
+        oid = bytes.fromhex(sha)
+        for pack in self.packs:
+            offset = pack.index.offset(oid)
+            if offset is not None:
+                return self._packed_object_type(pack, offset)
+        for alternate in self.alternates:
+            object_type = alternate._object_type(sha)  # pylint: disable = protected-access
+            if object_type is not None:
+                return object_type
+        return None
+
+    def object_type(self, sha: str) -> str:
+        """Get type of an object with a given SHA, without reading all of its contents."""
+        object_type = self._object_type(sha)
+        if object_type is None:
+            raise ValueError(f'object {sha} not found in "{self.objects_dir}"')
+        return object_type
+
+    def _read_packed(self, pack: Pack, offset: int) -> t.Tuple[str, bytes]:
+        """Read an object from a packfile, applying all deltas needed to reconstruct it."""
+        deltas = []
+        while True:
+            key = (str(pack.path), offset)
+            if key in self._cache:
+                object_type, data = self._cache[key]
+                break
+            entry_type, base, data_offset = pack.entry(offset)
+            if entry_type in _OBJECT_TYPES:
+                object_type, data = _OBJECT_TYPES[entry_type], pack.inflate(data_offset)
+                break
+            deltas.append(((str(pack.path), offset), pack.inflate(data_offset)))
+            if entry_type == _OFS_DELTA:
+                assert isinstance(base, int), base
+                offset = base
+                continue
+            if entry_type != _REF_DELTA:
+                raise ValueError(f'unsupported object type {entry_type} in {pack.path}')
+            assert isinstance(base, bytes), base
+            base_offset = pack.index.offset(base)
+            if base_offset is None:
+                object_type, data = self.read(base.hex())
+                break
+            offset = base_offset
+        for key, delta in reversed(deltas):
+            data = apply_delta(data, delta)
+            self._cache[key] = object_type, data
+            if len(self._cache) > _CACHE_SIZE:
+                self._cache.popitem(last=False)
+        return object_type, data
+
+    def _read(self, sha: str) -> t.Optional[t.Tuple[str, bytes]]:
+        loose_object = self._read_loose(sha)
+        if loose_object is not None:
+            return loose_object
+        oid = bytes.fromhex(sha)
+        for pack in self.packs:
+            offset = pack.index.offset(oid)
+            if offset is not None:
+                return self._read_packed(pack, offset)
+        for alternate in self.alternates:
+            alternate_object = alternate._read(sha)  # pylint: disable = protected-access
+            if alternate_object is not None:
+                return alternate_object
+        return None
+
+    def read(self, sha: str) -> t.Tuple[str, bytes]:
+        """Get (type, contents) of an object with a given SHA."""
+        stored_object = self._read(sha)
+        if stored_object is None:
+            raise ValueError(f'object {sha} not found in "{self.objects_dir}"')
+        return stored_object
+
+    def commit_parents(self, sha: str) -> t.Tuple[str, ...]:
+        """Get SHAs of parents of a commit with a given SHA."""
+        object_type, data = self.read(sha)
+        if object_type != 'commit':
+            raise ValueError(f'object {sha} is a {object_type}, not a commit')
+        parents = []
+        for line in data.split(b'\n'):
+            if not line:
+                break
+            if line.startswith(b'parent '):
+                parents.append(line[7:].decode())
+        return tuple(parents)
+
+    def peel(self, sha: str) -> t.Tuple[str, str]:
+        """Get (type, SHA) of the object pointed to by a given object, following any tags.
+
+        Objects other than tags are not read, only their type is checked.
+        """
+        while True:
+            object_type = self.object_type(sha)
+            if object_type != 'tag':
+                return object_type, sha
+            _, data = self.read(sha)
+            header = dict(_.split(b' ', 1) for _ in data.split(b'\n\n', 1)[0].split(b'\n'))
+            sha = header[b'object'].decode()
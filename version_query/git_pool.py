@@ -0,0 +1,163 @@
+"""Pool of open git repositories, reused by many version queries.
+
+GitPython starts persistent git processes (cat-file --batch and --batch-check) for each
+repository object when it needs to read objects, and stops them when the object is closed.
+Keeping the repository objects open between queries avoids starting these processes
+over and over again.
+"""
+
+import contextlib
+import contextvars
+import logging
+import os
+import threading
+import time
+import typing as t
+import weakref
+
+import git
+
+__all__ = ['GitRepoPool']
+
+_LOG = logging.getLogger(__name__)
+
+_IdleRepo = t.Tuple[str, git.Repo, float]
+
+_active_pool: contextvars.ContextVar[t.Optional['GitRepoPool']] = \
+    contextvars.ContextVar('active_git_repo_pool', default=None)
+
+
+def active_git_repo_pool() -> t.Optional['GitRepoPool']:
+    """Get the pool from which repositories are borrowed in the current context, if any."""
+    return _active_pool.get()
+
+
+def _close_repos(repos: t.Iterable[git.Repo]) -> None:
+    for repo in repos:
+        _LOG.debug('closing pooled repository %s', repo.git_dir)
+        repo.close()
+
+
+def _close_idle_repos(idle: t.List[_IdleRepo]) -> None:
+    _close_repos([repo for _, repo, _ in idle])
+    idle.clear()
+
+
+class GitRepoPool:
+    """Bounded pool of open git repositories, keyed by their git folders.
+
+    A borrowed repository is used exclusively by the borrower, and when it is returned,
+    it is kept open for reuse. At most max_size repositories are kept open while not borrowed,
+    and the ones that are not borrowed for longer than idle_timeout seconds are closed
+    (which is checked whenever the pool is used). All repositories are closed when the pool
+    is closed, or when the process exits.
+
+    Version queries borrow repositories from the pool only while it is active, see activated().
+    """
+
+    def __init__(self, max_size: int = 8, idle_timeout: float = 60.0):
+        if max_size < 1:
+            raise ValueError(f'maximum size of pool must be positive, not {max_size}')
+        self.max_size = max_size
+        self.idle_timeout = idle_timeout
+        self._lock = threading.Lock()
+        self._idle: t.List[_IdleRepo] = []
+        self._git_dirs: t.Dict[t.Tuple[str, bool], str] = {}
+        self._closed = False
+        self._finalizer = weakref.finalize(self, _close_idle_repos, self._idle)
+
+    def __len__(self) -> int:
+        """Get the number of repositories that are open and not borrowed."""
+        with self._lock:
+            return len(self._idle)
+
+    def _evict(self, now: float) -> t.List[git.Repo]:
+        """Remove from the pool repositories which were idle for too long, or are excess."""
+        evicted = [repo for _, repo, since in self._idle if now - since > self.idle_timeout]
+        self._idle[:] = [_ for _ in self._idle if now - _[2] <= self.idle_timeout]
+        while len(self._idle) > self.max_size:
+            evicted.append(self._idle.pop(0)[1])
+        return evicted
+
+    def _take(self, git_dir: t.Optional[str]) -> t.Optional[git.Repo]:
+        with self._lock:
+            if self._closed:
+                raise ValueError('the pool of git repositories is closed')
+            evicted = self._evict(time.monotonic())
+            repo = None
+            for i, (idle_git_dir, idle_repo, _) in enumerate(self._idle):
+                if idle_git_dir == git_dir:
+                    repo = idle_repo
+                    del self._idle[i]
+                    break
+        _close_repos(evicted)
+        return repo
+
+    def _put(self, git_dir: str, repo: git.Repo) -> None:
+        with self._lock:
+            if self._closed:
+                evicted = [repo]
+            else:
+                self._idle.append((git_dir, repo, time.monotonic()))
+                evicted = self._evict(time.monotonic())
+        _close_repos(evicted)
+
+    @contextlib.contextmanager
+    def borrow(
+            self, repo_path: os.PathLike, search_parent_directories: bool = True,
+            ) -> t.Iterator[git.Repo]:
+        """Borrow an open repository from the pool, or open a new one if none is available.
+
+        The repository is returned to the pool after use, unless an exception (other than
+        ValueError, which version queries raise when they fail) was raised while it was
+        borrowed, in which case it is closed, as it might be in an inconsistent state.
+        """
+        location = (os.path.abspath(repo_path), search_parent_directories)
+        with self._lock:
+            git_dir = self._git_dirs.get(location)
+        repo = self._take(git_dir)
+        if repo is None:
+            # opening a repository doesn't start any processes, so it's cheap enough
+            # to find its git folder, and to close it if there is an open one in the pool
+            new_repo = git.Repo(
+                os.fspath(repo_path), search_parent_directories=search_parent_directories)
+            git_dir = os.fspath(new_repo.git_dir)
+            with self._lock:
+                self._git_dirs[location] = git_dir
+            repo = self._take(git_dir)
+            if repo is None:
+                repo = new_repo
+            else:
+                new_repo.close()
+        try:
+            yield repo
+        except ValueError:
+            self._put(os.fspath(repo.git_dir), repo)
+            raise
+        except BaseException:
+            repo.close()
+            raise
+        self._put(os.fspath(repo.git_dir), repo)
+
+    @contextlib.contextmanager
+    def activated(self) -> t.Iterator['GitRepoPool']:
+        """Make version queries in the current context borrow repositories from this pool."""
+        token = _active_pool.set(self)
+        try:
+            yield self
+        finally:
+            _active_pool.reset(token)
+
+    def close(self) -> None:
+        """Close all repositories in the pool, and the ones borrowed when they are returned."""
+        with self._lock:
+            self._closed = True
+            idle = list(self._idle)
+            self._idle.clear()
+        _close_repos([repo for _, repo, _ in idle])
+
+    def __enter__(self) -> 'GitRepoPool':
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.close()
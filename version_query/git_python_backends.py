@@ -0,0 +1,251 @@
+"""Backends which access git repositories using GitPython, see git_backends module.
+
+This module is imported only when one of these backends is used, because importing GitPython
+requires git executable to be installed.
+"""
+
+import contextlib
+import logging
+import pathlib
+import typing as t
+
+import git
+
+from .version import Version
+from .git_backends import \
+    _GitCommits, _TAG_REFS_FORMAT, _git_tag_version, _is_worktree_dirty, _parse_version_tag_refs, \
+    _range_commits
+from .git_commit_graph import GitCommitGraph
+from .git_pool import active_git_repo_pool
+
+__all__ = ['GitPythonBackend', 'GitCliBackend']
+
+_LOG = logging.getLogger(__name__)
+
+
+class _GitCommitStream:
+    """Parents of commits in history of a git repository, read from a single git process.
+
+    The "git rev-list --topo-order --parents" output is consumed lazily, line by line, only until
+    the parents of the requested commit are known. Once the history walk is over, the process
+    is killed without reading the rest of its output.
+
+    If commit-graph is provided, parents of commits present in it are read from it instead,
+    and the git process is started only if some commit is missing from the commit-graph.
+    """
+
+    def __init__(
+            self, repo: git.Repo, rev: t.Union[str, t.Sequence[str]] = 'HEAD',
+            commit_graph: t.Optional[GitCommitGraph] = None):
+        self._repo = repo
+        self._revs = [rev] if isinstance(rev, str) else list(rev)
+        self._process: t.Any = None
+        self._parents: t.Dict[str, t.Tuple[str, ...]] = {}
+        self.commit_graph = commit_graph
+
+    def parents(self, commit: str) -> t.Tuple[str, ...]:
+        """Get SHAs of parents of a commit with a given SHA."""
+        if self.commit_graph is not None and commit not in self._parents:
+            parents = self.commit_graph.parents(commit)
+            if parents is not None:
+                return parents
+        if self._process is None and commit not in self._parents:
+            self._process = self._repo.git.rev_list(
+                '--topo-order', '--parents', *self._revs, as_process=True)
+        while commit not in self._parents:
+            line = self._process.stdout.readline()
+            if not line:
+                raise ValueError(f'commit {commit} not found in the history')
+            sha, *parents = line.decode().split()
+            self._parents[sha] = tuple(parents)
+        return self._parents[commit]
+
+    def generation(self, commit: str) -> t.Optional[int]:
+        """Get generation number of a commit, if it is known from the commit-graph."""
+        if self.commit_graph is None:
+            return None
+        return self.commit_graph.generation(commit)
+
+    def close(self) -> None:
+        """Close the commit-graph and kill the git process, if it is still running."""
+        if self.commit_graph is not None:
+            self.commit_graph.close()
+        if self._process is None or self._process.proc is None:
+            return
+        process = self._process.proc
+        if process.poll() is None:
+            process.kill()
+        process.wait()
+        for stream in (process.stdout, process.stderr):
+            if stream is not None:
+                stream.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+class _GitObjectCommits:
+    """Parents of commits in history of a git repository, read using object model of GitPython.
+
+    Generation numbers are never known.
+    """
+
+    def __init__(self, repo: git.Repo):
+        self._repo = repo
+
+    def parents(self, commit: str) -> t.Tuple[str, ...]:
+        """Get SHAs of parents of a commit with a given SHA."""
+        return tuple(parent.hexsha for parent in self._repo.commit(commit).parents)
+
+    def generation(self, commit: str) -> t.Optional[int]:  # pylint: disable = unused-argument
+        """Get generation number of a commit, which is never known."""
+        # pylint: disable = no-self-use
+        return None
+
+    def close(self) -> None:
+        """Do nothing, as objects are read by the repository itself."""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+class GitPythonBackend:
+    """Git repository accessed using object model of GitPython.
+
+    Refs are read by GitPython, and objects are read using a long-running "git cat-file" process.
+    Status of the working tree is checked using "git diff". Only revision ranges of the form
+    "<start>..<end>" are supported.
+    """
+
+    def __init__(self, repo: git.Repo):
+        self.repo = repo
+        self.git_dir = pathlib.Path(repo.git_dir)
+        self.common_dir = pathlib.Path(repo.common_dir)
+        self.working_dir = None if repo.working_tree_dir is None \
+            else pathlib.Path(repo.working_tree_dir)
+
+    @classmethod
+    @contextlib.contextmanager
+    def open(cls, path: pathlib.Path, search_parent_directories: bool = True) -> t.Iterator[
+            'GitPythonBackend']:
+        """Open repository at a given path, for use in a with statement.
+
+        If a pool of git repositories is active, the repository is borrowed from it.
+        """
+        pool = active_git_repo_pool()
+        if pool is not None:
+            with pool.borrow(path, search_parent_directories) as repo:
+                yield cls(repo)
+            return
+        with git.Repo(str(path), search_parent_directories=search_parent_directories) as repo:
+            yield cls(repo)
+
+    def __repr__(self) -> str:
+        return repr(self.repo)
+
+    def version_tag_commits(self) -> t.Mapping[str, t.Mapping[str, Version]]:
+        """Map SHAs of commits to version tags pointing to them, peeling tags using GitPython."""
+        version_tag_commits: t.Dict[str, t.Dict[str, Version]] = {}
+        for tag in self.repo.tags:
+            version = _git_tag_version(self.repo, tag.name)
+            if version is None:
+                continue
+            try:
+                sha = tag.commit.hexsha
+            except ValueError:
+                _LOG.debug('%s: ignoring tag %s which does not point to a commit',
+                           self.repo, tag.name)
+                continue
+            if sha not in version_tag_commits:
+                version_tag_commits[sha] = {}
+            version_tag_commits[sha][tag.name] = version
+        return version_tag_commits
+
+    def commits(self, revs: t.Sequence[str]) -> _GitCommits:  # pylint: disable = unused-argument
+        return _GitObjectCommits(self.repo)
+
+    def head_commit(self) -> str:
+        return self.repo.head.commit.hexsha
+
+    def is_dirty(self, untracked_files: bool = False) -> bool:
+        """Check if index or tracked files in the working tree differ from the HEAD commit.
+
+        Index is compared with HEAD commit using "git diff --cached". Tracked files are compared
+        with the index mostly without running git, see _is_worktree_dirty(), and using
+        "git diff" only if the index cannot be read.
+        """
+        if untracked_files or self.working_dir is None:
+            return self.repo.is_dirty(untracked_files=untracked_files)
+        if self.repo.is_dirty(working_tree=False):
+            return True
+        is_worktree_dirty = _is_worktree_dirty(self.git_dir, self.common_dir, self.working_dir)
+        if is_worktree_dirty is None:
+            return self.repo.is_dirty(index=False)
+        return is_worktree_dirty
+
+    def _resolve_commit(self, revision: str) -> str:
+        try:
+            return self.repo.rev_parse(f'{revision}^{{commit}}').hexsha
+        except (ValueError, git.BadName, git.BadObject) as err:
+            raise ValueError(f'unknown revision "{revision}" in {self.repo}: {err}') from err
+
+    def revision_commits(self, revision: str) -> t.List[str]:
+        if '..' not in revision:
+            return [self._resolve_commit(revision)]
+        return _range_commits(self, self._resolve_commit, revision)
+
+
+class GitCliBackend(GitPythonBackend):
+    """Git repository accessed by running git executable.
+
+    Repository is opened using GitPython, and GitPython is used to run git, but neither refs
+    nor objects are read by GitPython, except for finding the HEAD commit.
+    """
+
+    def version_tag_commits(self) -> t.Mapping[str, t.Mapping[str, Version]]:
+        """Map SHAs of commits to version tags pointing to them.
+
+        All tags are listed and resolved using a single "git for-each-ref" call, which provides
+        the SHA of the tagged object, as well as of the object pointed to by an annotated tag.
+        """
+        version_tag_commits: t.Dict[str, t.Dict[str, Version]] = {}
+        output = self.repo.git.for_each_ref('refs/tags', format=_TAG_REFS_FORMAT)
+        for path, tag_name, version, sha in _parse_version_tag_refs(self.repo, output):
+            if sha is None:
+                try:
+                    sha = git.TagReference(self.repo, path).commit.hexsha
+                except ValueError:
+                    _LOG.debug('%s: ignoring tag %s which does not point to a commit',
+                               self.repo, tag_name)
+                    continue
+            if sha not in version_tag_commits:
+                version_tag_commits[sha] = {}
+            version_tag_commits[sha][tag_name] = version
+        return version_tag_commits
+
+    def commits(self, revs: t.Sequence[str]) -> _GitCommits:
+        return _GitCommitStream(
+            self.repo, revs, GitCommitGraph.open(self.common_dir.joinpath('objects')))
+
+    def head_commit(self) -> str:
+        return git.SymbolicReference.dereference_recursive(self.repo, 'HEAD')
+
+    def _commits_list(self, command: str, *args: str) -> t.List[str]:
+        """Run a git command that lists commit SHAs, and raise ValueError if it fails."""
+        try:
+            return getattr(self.repo.git, command.replace('-', '_'))(*args).split()
+        except git.GitCommandError as err:
+            raise ValueError(
+                f'git {command} failed in {self.repo}: {err.stderr.strip()}') from err
+
+    def revision_commits(self, revision: str) -> t.List[str]:
+        if '..' not in revision:
+            return self._commits_list(
+                'rev-parse', '--verify', '--end-of-options', f'{revision}^{{commit}}')
+        return self._commits_list('rev-list', '--topo-order', revision)
@@ -1,168 +1,745 @@
 """Git repository version query tools."""
 
-import datetime
+import bisect
+import itertools
 import logging
+import os
 import pathlib
+import sys
 import typing as t
 
-import git
-
 from .version import Version
+from .git_backends import \
+    GIT_BACKENDS, GitBackend, _GitParents, _is_cli_backend, as_git_backend, \
+    preprocess_git_version_tag
+from .git_cache import GitResultCache, tag_refs_fingerprint, worktree_fingerprint
+from .git_files import GitFilesRepo, InvalidGitRepositoryError
+
+if t.TYPE_CHECKING:
+    import git
+from .repo_context import _apply_commit_distance, _apply_dirty, RepoVersionContext
 
 _LOG = logging.getLogger(__name__)
 
+GIT_BACKEND_ENVVAR = 'VERSION_QUERY_GIT_BACKEND'
 
-def preprocess_git_version_tag(tag: str):
-    """Remove a prefix from a version tag."""
-    if tag.startswith('ver'):
-        if len(tag) == 3:
-            raise ValueError(f'the tag "{tag}" does not contain any version information')
-        return tag[3:]
-    if tag.startswith('v'):
-        if len(tag) == 1:
-            raise ValueError(f'the tag "{tag}" does not contain any version information')
-        return tag[1:]
-    if tag and tag[0] in ('0', '1', '2', '3', '4', '5', '6', '7', '8', '9'):
-        return tag
-    raise ValueError(f'the tag "{tag}" does not appear to be a version tag')
-
-
-def _git_version_tags(repo: git.Repo) -> t.Mapping[git.Tag, Version]:
-    versions = {}
-    for tag in repo.tags:
-        try:
-            tag_str = preprocess_git_version_tag(tag.name)
-        except ValueError:
-            _LOG.debug('%s: ignoring non-version tag %s', repo, tag)
-            continue
-        try:
-            versions[tag] = Version.from_str(tag_str)
-        except ValueError:
-            # except packaging.version.InvalidVersion:
-            _LOG.warning('%s: failed to convert %s (%r) to version', repo, tag.name, tag_str)
-            continue
-    return versions
+CACHE_ENVVAR = 'VERSION_QUERY_CACHE'
 
+_AnyRepo = t.Union['git.Repo', GitFilesRepo, GitBackend]
 
-def _git_version_tag_commits(
-        version_tags: t.Iterable[git.Tag]) -> t.Mapping[git.objects.Commit, t.Set[git.Tag]]:
-    version_tag_commits: t.Dict[git.objects.Commit, t.Set[git.Tag]] = {}
-    for tag in version_tags:
-        _commit = tag.commit
-        if _commit not in version_tag_commits:
-            version_tag_commits[_commit] = set()
-        version_tag_commits[_commit].add(tag)
-    return version_tag_commits
-
-
-def _latest_git_version_tag_on_branches(
-        repo: git.Repo, assume_if_none: bool, commit: git.objects.Commit, commit_distance: int,
-        skip_commits: t.Set[git.objects.Commit]) -> t.Union[int, t.Tuple[
-            t.Optional[git.objects.Commit], t.Optional[git.TagReference], t.Optional[Version],
-            int]]:
-    _LOG.log(logging.NOTSET, 'entering %i branches...', len(commit.parents))
-    results: t.List[t.Tuple[
-        t.Optional[git.objects.Commit], t.Optional[git.TagReference], Version, int]] = []
-    main_commit_distance = None
-    for parent in commit.parents:
-        try:
-            result = _latest_git_version_tag(
-                repo, assume_if_none, parent, commit_distance, skip_commits)
-        except ValueError:
-            continue
-        if main_commit_distance is None:
-            main_commit_distance = result[3]
-        if result[2] is not None:
-            results.append(result)  # type: ignore
-    if not results:
-        if main_commit_distance is None:
-            raise ValueError(f'reached max commit distance {MAX_COMMIT_DISTANCE}'
-                             f' with no version tags in repo {repo}')
-        return main_commit_distance
-    final_result = sorted(results, key=lambda _: _[2])[-1]
-    _LOG.log(logging.NOTSET, 'result from %i branches is %s and %s',
-             len(commit.parents), *final_result[1:3])
-    return final_result
+__all__ = [
+    'GIT_BACKEND_ENVVAR', 'CACHE_ENVVAR', 'preprocess_git_version_tag',
+    'query_git_revisions', 'predict_git_revisions', 'query_git_repo', 'predict_git_repo',
+    'git_repo_version_context', 'warm_git_cache', 'clear_git_cache']
+
+
+class _GitVersionTagIndex:
+    """Version tags of a git repository, indexed by commits they point to.
+
+    Building the index enumerates and parses all tags of the repository, therefore it should be
+    built once per query and passed down the history walk. It can be also built from version tags
+    already mapped to commits they point to.
+    """
+
+    def __init__(self, repo: t.Union[_AnyRepo, t.Mapping[str, t.Mapping[str, Version]]]):
+        if isinstance(repo, t.Mapping):
+            self.commits = repo
+        else:
+            self.commits = as_git_backend(repo).version_tag_commits()
+        self.tags = {tag: commit for commit, tags in self.commits.items() for tag in tags}
+
+    def __bool__(self) -> bool:
+        return bool(self.commits)
+
+    def __contains__(self, commit: str) -> bool:
+        return commit in self.commits
+
+    def tags_at(self, commit: str) -> t.Mapping[str, Version]:
+        """Get version tags pointing to a given commit, together with their versions."""
+        return self.commits.get(commit, {})
 
+    def latest_tag_at(self, commit: str) -> t.Tuple[str, Version]:
+        """Get the version tag with the highest version among tags pointing to a given commit."""
+        current_version_tags = self.commits[commit]
+        _LOG.log(logging.NOTSET, 'found version data %s', current_version_tags)
+        return sorted(current_version_tags.items(), key=lambda _: _[1])[-1]
+
+
+_GitWalkResult = t.Tuple[t.Optional[str], t.Optional[str], t.Optional[Version], int]
 
 MAX_COMMIT_DISTANCE = 999
 
 
-def _latest_git_version_tag(
-        repo: git.Repo, assume_if_none: bool = False,
-        base_commit: t.Optional[git.objects.Commit] = None, commit_distance: int = 0,
-        skip_commits: t.Optional[t.Set[git.objects.Commit]] = None) -> t.Tuple[
-            t.Optional[git.objects.Commit], t.Optional[git.TagReference], t.Optional[Version], int]:
-    """Return (commit, tag at that commit if any, latest version, distance from the version)."""
-    version_tags = _git_version_tags(repo)
-    version_tag_commits = _git_version_tag_commits(version_tags.keys())
-    current_version_tags = {}
-    commit = None
-    if skip_commits is None:
-        skip_commits = set()
-    for commit in repo.iter_commits(rev=base_commit):
-        if commit in skip_commits:
-            return None, None, None, -1
-        _LOG.log(logging.NOTSET, 'iterating over commit %s', commit)
-        skip_commits.add(commit)
-        if commit in version_tag_commits:
-            current_tags = version_tag_commits[commit]
-            current_version_tags = {tag: version for tag, version in version_tags.items()
-                                    if tag in current_tags}
-            _LOG.log(logging.NOTSET, 'found version data %s', current_version_tags)
-            break
-        if commit_distance >= MAX_COMMIT_DISTANCE:
-            raise ValueError(f'reached max commit distance {MAX_COMMIT_DISTANCE}'
-                             f' with no version tags in repo {repo}')
-        commit_distance += 1
-        if len(commit.parents) <= 1:
-            continue
-        result = _latest_git_version_tag_on_branches(
-            repo, assume_if_none, commit, commit_distance, skip_commits)
-        if not isinstance(result, tuple):
-            commit_distance = result  # main_commit_distance
-            break
-        return result
-    if not current_version_tags:
-        if assume_if_none:
+class _MergedBranches:
+    """State of the history walk at a merge commit, while its parents are being walked."""
+
+    # pylint: disable = too-few-public-methods
+
+    def __init__(self, commit: str, commit_distance: int, parents: t.Sequence[str]):
+        self.commit = commit
+        self.commit_distance = commit_distance
+        self.parents = parents
+        self.next_parent = 0
+        self.results: t.List[t.Tuple[t.Optional[str], t.Optional[str], Version, int]] = []
+        self.main_commit_distance: t.Optional[int] = None
+
+    def collect(self, result: _GitWalkResult) -> None:
+        """Take into account the result of walking one of the parents."""
+        if self.main_commit_distance is None:
+            self.main_commit_distance = result[3]
+        if result[2] is not None:
+            self.results.append(result)  # type: ignore
+
+
+def _outcome_of(function: t.Callable[..., t.Any], *args) -> t.Any:
+    """Call a function, but return the ValueError instead of raising it."""
+    try:
+        return function(*args)
+    except ValueError as err:
+        return err
+
+
+class _VersionsByGeneration:
+    """Highest versions among version tags on commits up to a given generation number.
+
+    Only commits with known generation numbers are taken into account. If generation number
+    of any tagged commit is known to be not computed, no bounds can be given.
+    """
+
+    # pylint: disable = too-few-public-methods
+
+    def __init__(self, tag_index: _GitVersionTagIndex, commits: _GitParents):
+        pairs = []
+        self.usable = True
+        for commit in tag_index.commits:
+            generation = commits.generation(commit)
+            if generation is None:
+                continue
+            if generation == 0:
+                self.usable = False
+                break
+            pairs.append((generation, tag_index.latest_tag_at(commit)[1]))
+        pairs.sort(key=lambda _: _[0])
+        self.generations = [generation for generation, _ in pairs]
+        self.versions = list(itertools.accumulate((version for _, version in pairs), max))
+
+    def highest_version(self, generation: int) -> t.Optional[Version]:
+        """Get highest version tagged on a commit with generation number not above the given."""
+        index = bisect.bisect_right(self.generations, generation)
+        return self.versions[index - 1] if index > 0 else None
+
+
+class _GitHistoryWalk:
+    """Search for the latest version tag in the history of a git repository.
+
+    The history is walked iteratively, starting from a given commit and following the parents.
+    At a merge commit, all parents are walked one after another, and the highest version found
+    on any of the merged branches wins. Commits are visited at most once per walk -- a branch
+    that reaches a commit that was already visited is not followed any further.
+
+    When generation numbers of commits are known, merged branches which contain only tags
+    with versions lower than the highest version already found on other branches are skipped.
+    """
+
+    # pylint: disable = too-few-public-methods, too-many-instance-attributes
+
+    def __init__(
+            self, repo: object, commits: _GitParents, tag_index: _GitVersionTagIndex,
+            assume_if_none: bool = False):
+        self.repo = repo
+        self.commits = commits
+        self.tag_index = tag_index
+        self.assume_if_none = assume_if_none
+        self.visited_commits: t.Set[str] = set()
+        self._versions_by_generation: t.Optional[_VersionsByGeneration] = None
+        self.skipped_branches = 0
+        self.depth = -1
+        self.reached_max_commit_distance = False
+
+    def _walk_branch(self, commit: str, commit_distance: int) -> t.Union[
+            _GitWalkResult, _MergedBranches]:
+        """Walk history until a version tag, a merge commit or a visited commit is reached."""
+        while True:
+            if commit in self.visited_commits:
+                return None, None, None, -1
+            _LOG.log(logging.NOTSET, 'iterating over commit %s', commit)
+            self.visited_commits.add(commit)
+            if commit in self.tag_index:
+                tag, version = self.tag_index.latest_tag_at(commit)
+                _LOG.log(logging.NOTSET, 'result is %s and %s', tag, version)
+                return commit, tag, version, commit_distance
+            if commit_distance >= MAX_COMMIT_DISTANCE:
+                self.reached_max_commit_distance = True
+                raise ValueError(f'reached max commit distance {MAX_COMMIT_DISTANCE}'
+                                 f' with no version tags in repo {self.repo}')
+            self.depth = max(self.depth, commit_distance)
+            commit_distance += 1
+            parents = self.commits.parents(commit)
+            if len(parents) > 1:
+                _LOG.log(logging.NOTSET, 'entering %i branches...', len(parents))
+                return _MergedBranches(commit, commit_distance, parents)
+            if not parents:
+                return self._no_version_tags(commit, commit_distance)
+            commit = parents[0]
+
+    def _no_version_tags(self, commit: str, commit_distance: int) -> _GitWalkResult:
+        if self.assume_if_none:
             return commit, None, Version.from_str('0.1.0.dev0'), commit_distance
-        raise ValueError(f'the given repo {repo} has no version tags')
-    tag, version = sorted(current_version_tags.items(), key=lambda _: _[1])[-1]
-    _LOG.log(logging.NOTSET, 'result is %s and %s', tag, version)
+        raise ValueError(f'the given repo {self.repo} has no version tags')
+
+    def _merge_branches(self, merge: _MergedBranches) -> _GitWalkResult:
+        """Combine results of walking all parents of a merge commit."""
+        if not merge.results:
+            if merge.main_commit_distance is None:
+                raise ValueError(f'reached max commit distance {MAX_COMMIT_DISTANCE}'
+                                 f' with no version tags in repo {self.repo}')
+            return self._no_version_tags(merge.commit, merge.main_commit_distance)
+        final_result = sorted(merge.results, key=lambda _: _[2])[-1]
+        _LOG.log(logging.NOTSET, 'result from %i branches is %s and %s',
+                 len(merge.parents), *final_result[1:3])
+        return final_result
+
+    def _is_branch_irrelevant(self, commit: str, merge: _MergedBranches) -> bool:
+        """Check if walking a merged branch starting at a given commit cannot change the result.
+
+        Ancestors of a commit have lower generation numbers than it, so if all versions tagged
+        on commits with generation not higher than the given commit's are lower than the version
+        already found on other branches, walking the branch is pointless.
+        Branches that were not walked don't block walking other branches, but this could matter
+        only for tags with versions which are lower anyway.
+        """
+        if not merge.results:
+            return False
+        generation = self.commits.generation(commit)
+        if not generation:
+            return False
+        if self._versions_by_generation is None:
+            self._versions_by_generation = _VersionsByGeneration(self.tag_index, self.commits)
+        if not self._versions_by_generation.usable:
+            return False
+        found_version = max(_[2] for _ in merge.results)
+        highest_version = self._versions_by_generation.highest_version(generation)
+        if highest_version is not None and not highest_version < found_version:
+            return False
+        return not self.assume_if_none or Version.from_str('0.1.0.dev0') < found_version
+
+    def _next_parent(self, merge: _MergedBranches) -> t.Optional[str]:
+        """Get the next parent of a merge commit that needs to be walked, if any."""
+        while merge.next_parent < len(merge.parents):
+            parent = merge.parents[merge.next_parent]
+            merge.next_parent += 1
+            if not self._is_branch_irrelevant(parent, merge):
+                return parent
+            _LOG.log(logging.NOTSET, 'skipping branch starting at %s', parent)
+            self.skipped_branches += 1
+        return None
+
+    def run(self, commit: str) -> _GitWalkResult:
+        """Walk the history starting at a given commit and return the result.
+
+        Merge commits whose parents are still being walked are kept on an explicit stack,
+        and failure to find a version tag on a merged branch only discards that branch.
+        """
+        stack: t.List[_MergedBranches] = []
+        outcome = _outcome_of(self._walk_branch, commit, 0)
+        while True:
+            if isinstance(outcome, _MergedBranches):
+                stack.append(outcome)
+            elif not stack:
+                break
+            elif not isinstance(outcome, ValueError):
+                stack[-1].collect(outcome)
+            merge = stack[-1]
+            parent = self._next_parent(merge)
+            if parent is None:
+                stack.pop()
+                outcome = _outcome_of(self._merge_branches, merge)
+            else:
+                outcome = _outcome_of(self._walk_branch, parent, merge.commit_distance)
+        if isinstance(outcome, ValueError):
+            raise outcome
+        return outcome
+
+
+_DESCRIBE_MATCH_PATTERNS = ('v[0-9]*', 'ver[0-9]*', '[0-9]*')
+
+
+def _described_git_version_tag(
+        repo: 'git.Repo', tag_index: _GitVersionTagIndex, base_commit: str) -> t.Optional[
+            _GitWalkResult]:
+    """Find the latest version tag using "git describe", if the result is unambiguous.
+
+    The nearest tag that looks like a version tag is found by git itself. Such tag is the same
+    as the one that the history walk would find only if it is a valid version tag, and if there
+    are no merge commits between it and the base commit. Otherwise, None is returned.
+    """
+    import git  # pylint: disable = import-outside-toplevel, redefined-outer-name
+    try:
+        description: t.Optional[str] = repo.git.describe(
+            '--tags', '--long', *[f'--match={_}' for _ in _DESCRIBE_MATCH_PATTERNS], base_commit)
+    except git.GitCommandError:
+        description = None
+    described = _described_tag_commit(repo, tag_index, description)
+    if described is None:
+        return None
+    merge_count = repo.git.rev_list('--count', '--min-parents=2', f'{described[0]}..{base_commit}')
+    return _described_walk_result(repo, tag_index, *described, merge_count)
+
+
+def _described_tag_commit(
+        repo: object, tag_index: _GitVersionTagIndex,
+        description: t.Optional[str]) -> t.Optional[t.Tuple[str, int]]:
+    """Get commit of the version tag in "git describe --long" output, and the distance from it."""
+    if description is None:
+        _LOG.debug('%s: no version tags found by git describe', repo)
+        return None
+    tag_name, commit_distance, _ = description.rsplit('-', 2)
+    commit = tag_index.tags.get(tag_name)
+    if commit is None or int(commit_distance) > MAX_COMMIT_DISTANCE:
+        return None
+    return commit, int(commit_distance)
+
+
+def _described_walk_result(repo: object, tag_index: _GitVersionTagIndex, commit: str,
+                           commit_distance: int, merge_count: str) -> t.Optional[_GitWalkResult]:
+    """Get the result of the history walk from "git describe", if there are no merge commits."""
+    if int(merge_count) > 0:
+        _LOG.debug('%s: %s merge commits since %s found by git describe',
+                   repo, merge_count, commit)
+        return None
+    tag, version = tag_index.latest_tag_at(commit)
     return commit, tag, version, commit_distance
 
 
-def _upcoming_git_version_tag(repo: git.Repo, ignore_untracked_files: bool = True) -> t.Tuple[
-        t.Optional[git.objects.Commit], t.Optional[git.TagReference], t.Optional[Version], int,
-        bool]:
-    commit, tag, version, commit_distance = _latest_git_version_tag(repo, True)
-    is_repo_dirty = repo.is_dirty(untracked_files=not ignore_untracked_files)
+def _memoised_git_version_tag(
+        commits: _GitParents, tag_index: _GitVersionTagIndex,
+        memo: t.Mapping[str, t.Sequence[t.Any]], base_commit: str) -> t.Optional[
+            t.Tuple[_GitWalkResult, int]]:
+    """Find the latest version tag using a result memoised for an ancestor of the base commit.
+
+    Result for a commit which is not tagged and has a single parent is the result for its parent,
+    only one commit further. Therefore, history is followed only until a memoised commit is
+    reached. Result for a merge commit depends on the order in which its branches are walked,
+    and not only on results for its parents, so None is returned if a merge commit, a version tag
+    or the root commit is reached first.
+
+    Each memoised result is accompanied by the depth of its walk, i.e. the highest distance
+    of an untagged commit visited during the walk, or None if max commit distance was reached
+    anywhere. Walking from a commit further away would make the walk reach max commit distance
+    on different branches, so memoised result is used only if it cannot happen.
+    """
+    commit = base_commit
+    commit_distance = 0
+    while commit not in memo:
+        if commit in tag_index or commit_distance >= MAX_COMMIT_DISTANCE:
+            return None
+        parents = commits.parents(commit)
+        if len(parents) != 1:
+            return None
+        commit = parents[0]
+        commit_distance += 1
+    entry = _shifted_memo_entry(memo[commit], commit_distance)
+    if entry is None:
+        return None
+    _LOG.debug('using result memoised for commit %s, %i commits before %s',
+               commit, commit_distance, base_commit)
+    return _memo_entry_result(entry), entry[4]
+
+
+def _memo_entry(result: _GitWalkResult, depth: t.Optional[int]) -> t.List[t.Any]:
+    """Convert result of the history walk and its depth into a memo entry."""
+    commit, tag, version, commit_distance = result
+    assert version is not None
+    return [commit, tag, version.to_str(), commit_distance, depth]
+
+
+def _memo_entry_result(entry: t.Sequence[t.Any]) -> _GitWalkResult:
+    """Convert a memo entry into a result of the history walk."""
+    commit, tag, version_str, commit_distance, _ = entry
+    return commit, tag, Version.from_str(version_str), commit_distance
+
+
+def _shifted_memo_entry(
+        entry: t.Sequence[t.Any], commit_distance: int) -> t.Optional[t.List[t.Any]]:
+    """Get memo entry for a commit a given number of linear commits after the memoised one.
+
+    Return None if the result cannot be derived, see _memoised_git_version_tag().
+    """
+    tag_commit, tag, version_str, tag_distance, depth = entry
+    if depth is None or depth + commit_distance >= MAX_COMMIT_DISTANCE:
+        return None
+    if tag_distance >= 0:  # distance -1 means that base commit was visited on another branch
+        tag_distance += commit_distance
+    return [tag_commit, tag, version_str, tag_distance, depth + commit_distance]
+
+
+class _GitHistoryMemo:
+    """Latest version tags of many commits, found using results for their ancestors.
+
+    History is followed from each commit through untagged commits with a single parent, until
+    a commit with already known result is reached. Otherwise, the history is walked starting
+    at the commit where the followed part ends, i.e. a merge commit, a tagged commit
+    or the root commit, and results for all commits on the way are derived from the result.
+    """
+
+    # pylint: disable = too-few-public-methods
+
+    def __init__(
+            self, repo: object, commits: _GitParents, tag_index: _GitVersionTagIndex,
+            assume_if_none: bool = False):
+        self.repo = repo
+        self.commits = commits
+        self.tag_index = tag_index
+        self.assume_if_none = assume_if_none
+        self.memo: t.Dict[str, t.List[t.Any]] = {}
+        self.walks = 0
+
+    def _walk(self, commit: str) -> t.List[t.Any]:
+        self.walks += 1
+        walk = _GitHistoryWalk(self.repo, self.commits, self.tag_index, self.assume_if_none)
+        result = walk.run(commit)
+        return _memo_entry(result, None if walk.reached_max_commit_distance else walk.depth)
+
+    def latest(self, base_commit: str) -> _GitWalkResult:
+        """Find the latest version tag for a given commit, like _latest_git_version_tag()."""
+        commit = base_commit
+        linear_commits: t.List[str] = []
+        while commit not in self.memo and commit not in self.tag_index \
+                and len(linear_commits) < MAX_COMMIT_DISTANCE:
+            parents = self.commits.parents(commit)
+            if len(parents) != 1:
+                break
+            linear_commits.append(commit)
+            commit = parents[0]
+        if commit not in self.memo:
+            outcome = _outcome_of(self._walk, commit)
+            if isinstance(outcome, ValueError):
+                if not linear_commits:
+                    raise outcome
+                outcome = self._walk(base_commit)
+                linear_commits.clear()
+                commit = base_commit
+            self.memo[commit] = outcome
+        for commit_distance, linear_commit in enumerate(reversed(linear_commits), 1):
+            entry = _shifted_memo_entry(self.memo[commit], commit_distance)
+            if entry is None:
+                break
+            self.memo[linear_commit] = entry
+        if base_commit not in self.memo:
+            self.memo[base_commit] = self._walk(base_commit)
+        return _memo_entry_result(self.memo[base_commit])
+
+
+def _latest_git_version_tag(
+        repo: _AnyRepo, assume_if_none: bool = False,
+        base_commit: t.Optional[str] = None,
+        tag_index: t.Optional[_GitVersionTagIndex] = None,
+        memo: t.Optional[t.Mapping[str, t.Sequence[t.Any]]] = None) -> _GitWalkResult:
+    """Return (commit SHA, tag at that commit if any, latest version, distance from the version).
+
+    Version tags are enumerated only once per query, unless a tag index built beforehand
+    is provided. If results memoised for some commits are provided, and one of them is
+    a close ancestor of the base commit, it is used. In simple cases, result of "git describe"
+    is used, and the history walk is only a fallback. "git describe" is used only by "cli"
+    backend, and other backends always walk the history.
+    """
+    return _latest_git_version_tag_and_depth(
+        repo, assume_if_none, base_commit, tag_index, memo)[0]
+
+
+def _latest_git_version_tag_and_depth(
+        repo: _AnyRepo, assume_if_none: bool = False,
+        base_commit: t.Optional[str] = None,
+        tag_index: t.Optional[_GitVersionTagIndex] = None,
+        memo: t.Optional[t.Mapping[str, t.Sequence[t.Any]]] = None) -> t.Tuple[
+            _GitWalkResult, t.Optional[int]]:
+    """Find the latest version tag, and the depth of the history walk as well.
+
+    See _memoised_git_version_tag() for the definition of the depth.
+    """
+    backend = as_git_backend(repo)
+    if tag_index is None:
+        tag_index = _GitVersionTagIndex(backend)
+    if not tag_index and not assume_if_none:
+        raise ValueError(f'the given repo {repo} has no version tags')
+    if base_commit is None:
+        base_commit = backend.head_commit()
+    with backend.commits([base_commit]) as commits:
+        if memo:
+            memoised = _memoised_git_version_tag(commits, tag_index, memo, base_commit)
+            if memoised is not None:
+                return memoised
+        if tag_index and _is_cli_backend(backend):
+            result = _described_git_version_tag(
+                t.cast(t.Any, backend).repo, tag_index, base_commit)
+            if result is not None:
+                return result, result[3] - 1
+        walk = _GitHistoryWalk(backend, commits, tag_index, assume_if_none)
+        result = walk.run(base_commit)
+    return result, None if walk.reached_max_commit_distance else walk.depth
+
+
+def _git_walk_memo(
+        cache: GitResultCache, mode: str, fingerprint: str) -> t.Dict[str, t.Sequence[t.Any]]:
+    """Get cached results of a given mode, for the current tags, indexed by commit SHA."""
+    memo = {}
+    for key, value in cache.entries().items():
+        key_mode, commit, key_fingerprint, max_commit_distance = (key.split(' ') + [''] * 3)[:4]
+        if (key_mode, key_fingerprint, max_commit_distance) \
+                == (mode, fingerprint, str(MAX_COMMIT_DISTANCE)):
+            memo[commit] = value
+    return memo
+
+
+def _cached_latest_git_version_tag(
+        repo: GitBackend, assume_if_none: bool = False,
+        cache: t.Optional[GitResultCache] = None,
+        tag_index: t.Optional[_GitVersionTagIndex] = None) -> _GitWalkResult:
+    """Find the latest version tag, unless the result for the current state is cached.
+
+    The result depends only on the HEAD commit and on tags, which are fingerprinted using
+    status of files in which they are stored. Cached results for other commits, with the same
+    tags, are used as a memo for the history walk.
+    """
+    if cache is None:
+        return _latest_git_version_tag(repo, assume_if_none, tag_index=tag_index)
+    head_commit = repo.head_commit()
+    mode = 'predict' if assume_if_none else 'query'
+    fingerprint = tag_refs_fingerprint(repo.common_dir)
+    memo = _git_walk_memo(cache, mode, fingerprint)
+    cached = memo.get(head_commit)
+    _LOG.debug('cache %s for commit %s', 'miss' if cached is None else 'hit', head_commit)
+    if cached is not None:
+        return _memo_entry_result(cached)
+    result, depth = _latest_git_version_tag_and_depth(
+        repo, assume_if_none, head_commit, tag_index, memo)
+    cache.put(f'{mode} {head_commit} {fingerprint} {MAX_COMMIT_DISTANCE}',
+              _memo_entry(result, depth))
+    return result
+
+
+def _is_git_repo_dirty(
+        repo: GitBackend, ignore_untracked_files: bool = True,
+        cache: t.Optional[GitResultCache] = None) -> bool:
+    """Check if repository is dirty, unless the result for the current state is cached.
+
+    The result depends on the HEAD commit, the index and the tracked files, which are
+    fingerprinted using their status. Untracked files are not fingerprinted.
+    """
+    if cache is None or not ignore_untracked_files or repo.working_dir is None:
+        return repo.is_dirty(untracked_files=not ignore_untracked_files)
+    fingerprint = worktree_fingerprint(repo.git_dir, repo.working_dir)
+    if fingerprint is None:
+        return repo.is_dirty()
+    key = f'dirty {repo.head_commit()} {fingerprint}'
+    is_repo_dirty = cache.get(key)
+    if is_repo_dirty is None:
+        is_repo_dirty = repo.is_dirty()
+        cache.put(key, is_repo_dirty)
+    return is_repo_dirty
+
+
+def _upcoming_git_version_tag(
+        repo: GitBackend, ignore_untracked_files: bool = True,
+        cache: t.Optional[GitResultCache] = None) -> t.Tuple[
+            t.Optional[str], t.Optional[str], t.Optional[Version], int, bool]:
+    commit, tag, version, commit_distance = _cached_latest_git_version_tag(repo, True, cache)
+    is_repo_dirty = _is_git_repo_dirty(repo, ignore_untracked_files, cache)
     return commit, tag, version, commit_distance, is_repo_dirty
 
 
-def query_git_repo(repo_path: pathlib.Path, search_parent_directories: bool = True) -> Version:
+def _invalid_git_repo_errors() -> t.Tuple[t.Type[Exception], ...]:
+    """Get types of errors raised by backends when a path is not in a git repository.
+
+    Errors of GitPython are included only if it was imported already, as otherwise they cannot
+    be raised.
+    """
+    git_module = sys.modules.get('git')
+    if git_module is None:
+        return (InvalidGitRepositoryError,)
+    return (InvalidGitRepositoryError, git_module.InvalidGitRepositoryError)
+
+
+def _git_backend(backend: t.Optional[str] = None) -> str:
+    """Get the way of accessing git repositories, unless given, configured via an env. variable.
+
+    Either "cli" (the default), "gitpython" or "files", see git_backends module.
+    """
+    if backend is None:
+        backend = os.environ.get(GIT_BACKEND_ENVVAR, 'cli')
+        if backend not in GIT_BACKENDS:
+            raise ValueError(f'{GIT_BACKEND_ENVVAR} must be one of {tuple(GIT_BACKENDS)},'
+                             f' but it is "{backend}"')
+    elif backend not in GIT_BACKENDS:
+        raise ValueError(f'git backend must be one of {tuple(GIT_BACKENDS)}, not "{backend}"')
+    return backend
+
+
+def _open_git_repo(
+        repo_path: pathlib.Path, search_parent_directories: bool,
+        backend: t.Optional[str] = None) -> t.ContextManager[GitBackend]:
+    """Open a git repository using a given backend, or the configured one, for a with statement.
+
+    If a pool of git repositories is active, GitPython repository is borrowed from it.
+    """
+    return GIT_BACKENDS[_git_backend(backend)](repo_path, search_parent_directories)
+
+
+def _git_result_cache(repo: GitBackend, cache: t.Optional[bool]) -> t.Optional[GitResultCache]:
+    """Get result cache of a repository if caching is enabled.
+
+    Caching is enabled explicitly, or if it is not specified, via an environment variable.
+    """
+    if cache is None:
+        cache = os.environ.get(CACHE_ENVVAR) == '1'
+    return GitResultCache(repo.git_dir) if cache else None
+
+
+def _git_revision_commits(repo: GitBackend, revisions: t.Sequence[str]) -> t.Dict[str, str]:
+    """Map given revisions to SHAs of commits they refer to.
+
+    Revision ranges (like "v1.0..HEAD") are expanded, and each commit within a range is mapped
+    to itself. Supported revisions depend on the backend.
+    """
+    revision_commits: t.Dict[str, str] = {}
+    for revision in revisions:
+        commits = repo.revision_commits(revision)
+        if '..' in revision:
+            revision_commits.update((_, _) for _ in commits)
+        else:
+            revision_commits[revision], = commits
+    return revision_commits
+
+
+def _git_revision_version(
+        history: _GitHistoryMemo, revision: str, commit: str,
+        assume_if_none: bool) -> t.Optional[Version]:
+    """Determine version of a revision, or None if no version tag is reachable from it."""
+    try:
+        _, _, version, commit_distance = history.latest(commit)
+    except ValueError as err:
+        _LOG.debug('%s: no version of revision %s: %s', history.repo, revision, err)
+        return None
+    assert isinstance(version, Version), version
+    if assume_if_none:
+        _apply_commit_distance(version, commit_distance, commit)
+    return version
+
+
+def _git_revisions_versions(
+        repo_path: pathlib.Path, revisions: t.Sequence[str], search_parent_directories: bool,
+        assume_if_none: bool, backend: t.Optional[str]) -> t.Dict[str, t.Optional[Version]]:
+    with _open_git_repo(repo_path, search_parent_directories, backend) as repo:
+        revision_commits = _git_revision_commits(repo, revisions)
+        tag_index = _GitVersionTagIndex(repo)
+        if not tag_index and not assume_if_none:
+            raise ValueError(f'the given repo {repo} has no version tags')
+        with repo.commits(list(dict.fromkeys(revision_commits.values()))) as commits:
+            history = _GitHistoryMemo(repo, commits, tag_index, assume_if_none)
+            versions = {
+                revision: _git_revision_version(history, revision, commit, assume_if_none)
+                for revision, commit in revision_commits.items()}
+        _LOG.debug('found versions of %i commits using %i history walks',
+                   len(revision_commits), history.walks)
+    return versions
+
+
+def query_git_revisions(
+        repo_path: pathlib.Path, revisions: t.Sequence[str],
+        search_parent_directories: bool = True,
+        backend: t.Optional[str] = None) -> t.Dict[str, t.Optional[Version]]:
+    """Determine versions from tags of a git repository for many revisions at once.
+
+    Each revision is either a single revision (like "main" or "HEAD~2"), or a revision range
+    (like "v1.0..HEAD"), which stands for all commits within the range. Versions are returned
+    in a dictionary with given revisions as keys, except for ranges, for which SHAs of all commits
+    within them are used as keys. Version is None for revisions from which no version tag
+    is reachable, and ValueError is raised only if there are no version tags at all.
+
+    History shared by the revisions is walked only once.
+
+    The repository is accessed using a given backend ("cli", "gitpython" or "files"), or if it is
+    not specified, the one configured via an environment variable (the same applies to other
+    functions of this module).
+    """
+    return _git_revisions_versions(
+        repo_path, revisions, search_parent_directories, False, backend)
+
+
+def predict_git_revisions(
+        repo_path: pathlib.Path, revisions: t.Sequence[str],
+        search_parent_directories: bool = True,
+        backend: t.Optional[str] = None) -> t.Dict[str, Version]:
+    """Predict versions from tags and commit history of a git repository for many revisions.
+
+    See query_git_revisions() for how revisions are given and how results are returned.
+    Index status is not taken into account, because it is unrelated to any revision.
+    """
+    versions = _git_revisions_versions(
+        repo_path, revisions, search_parent_directories, True, backend)
+    return t.cast(t.Dict[str, Version], versions)
+
+
+def query_git_repo(
+        repo_path: pathlib.Path, search_parent_directories: bool = True,
+        cache: t.Optional[bool] = None, backend: t.Optional[str] = None) -> Version:
     """Determine version from tags of a git repository."""
     _LOG.debug('looking for git repository in "%s"', repo_path)
-    repo = git.Repo(str(repo_path), search_parent_directories=search_parent_directories)
-    _LOG.debug('found git repository in "%s"', repo.working_dir)
-    version = _latest_git_version_tag(repo)[2]
+    with _open_git_repo(repo_path, search_parent_directories, backend) as repo:
+        _LOG.debug('found git repository in "%s"', repo.working_dir)
+        version = _cached_latest_git_version_tag(repo, False, _git_result_cache(repo, cache))[2]
     assert isinstance(version, Version), version
     return version
 
 
-def predict_git_repo(repo_path: pathlib.Path, search_parent_directories: bool = True) -> Version:
+def predict_git_repo(
+        repo_path: pathlib.Path, search_parent_directories: bool = True,
+        cache: t.Optional[bool] = None, backend: t.Optional[str] = None) -> Version:
     """Predict version from tags, commit history and index status of git repository."""
-    repo = git.Repo(str(repo_path), search_parent_directories=search_parent_directories)
-    version, commit_distance, is_repo_dirty = _upcoming_git_version_tag(repo)[2:]
-    assert isinstance(version, Version), version
-    if commit_distance > 0:
-        version.devel_increment(commit_distance)
-        version.local = (f'git{repo.head.commit.hexsha[:8]}',)
+    with _open_git_repo(repo_path, search_parent_directories, backend) as repo:
+        version, commit_distance, is_repo_dirty = _upcoming_git_version_tag(
+            repo, cache=_git_result_cache(repo, cache))[2:]
+        assert isinstance(version, Version), version
+        _apply_commit_distance(version, commit_distance, repo.head_commit())
     if is_repo_dirty:
-        dt_ = f'dirty{datetime.datetime.strftime(datetime.datetime.now(), "%Y%m%d%H%M%S")}'
-        if version.has_local:
-            assert version.local is not None  # mypy needs this
-            version.local = (*version.local, '.', dt_)
-        else:
-            version.local = (dt_,)
+        _apply_dirty(version)
     return version
+
+
+def git_repo_version_context(
+        repo_path: pathlib.Path, search_parent_directories: bool = True,
+        cache: t.Optional[bool] = None,
+        backend: t.Optional[str] = None) -> RepoVersionContext:
+    """Determine version information of a git repository, for both version query and prediction.
+
+    The repository is opened once, and tags are enumerated and history is walked once, unless
+    no version tag is found, in which case the history is walked again only for the query.
+    """
+    with _open_git_repo(repo_path, search_parent_directories, backend) as repo:
+        result_cache = _git_result_cache(repo, cache)
+        tag_index = None if result_cache is not None else _GitVersionTagIndex(repo)
+        commit, tag, version, commit_distance = _cached_latest_git_version_tag(
+            repo, True, result_cache, tag_index)
+        assert isinstance(version, Version), version
+        queried: t.Union[Version, ValueError] = version
+        if tag is None:
+            queried = _outcome_of(
+                lambda: _cached_latest_git_version_tag(repo, False, result_cache, tag_index)[2])
+        return RepoVersionContext(
+            version, tag, commit, commit_distance, _is_git_repo_dirty(repo, True, result_cache),
+            repo.head_commit(), queried)
+
+
+def warm_git_cache(repo_path: pathlib.Path, search_parent_directories: bool = True) -> Version:
+    """Store results of version query and prediction in the cache, return predicted version."""
+    try:
+        query_git_repo(repo_path, search_parent_directories, cache=True)
+    except ValueError:
+        _LOG.debug('no version tags to cache in "%s"', repo_path)
+    return predict_git_repo(repo_path, search_parent_directories, cache=True)
+
+
+def clear_git_cache(repo_path: pathlib.Path, search_parent_directories: bool = True) -> None:
+    """Remove all cached results of a git repository."""
+    with _open_git_repo(repo_path, search_parent_directories) as repo:
+        GitResultCache(repo.git_dir).clear()
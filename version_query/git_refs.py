@@ -0,0 +1,375 @@
+"""Read-only access to references of a git repository, without running git.
+
+References are read either from loose reference files and from the "packed-refs" file,
+or from the stack of reftable files, if the repository uses the reftable format.
+
+File formats are described in git documentation, in "gitrepository-layout"
+and in "reftable" technical document.
+"""
+
+import logging
+import mmap
+import os
+import pathlib
+import struct
+import typing as t
+
+from .git_objects import read_offset_varint
+
+_LOG = logging.getLogger(__name__)
+
+_SYMBOLIC_REF_PREFIX = 'ref: '
+
+_MAX_SYMBOLIC_REF_DEPTH = 5
+
+_PACKED_REFS_HEADER = b'# pack-refs with:'
+
+_REFTABLE_SIGNATURE = b'REFT'
+
+_REFTABLE_HEADER_SIZES = {1: 24, 2: 28}
+
+_REFTABLE_FOOTER_SIZES = {1: 68, 2: 72}
+
+_REFTABLE_HASH_LENGTHS = {b'sha1': 20, b's256': 32}
+
+_REFTABLE_DELETION = 0
+_REFTABLE_VALUE = 1
+_REFTABLE_VALUE_AND_PEELED = 2
+_REFTABLE_SYMREF = 3
+
+RefValue = t.Tuple[str, t.Optional[str]]
+"""SHA that a reference points to, and SHA of the object that it peels to (if known)."""
+
+_ReftableRecord = t.Tuple[int, t.Tuple[str, ...]]
+
+
+def _line_end(data: mmap.mmap, offset: int) -> int:
+    end = data.find(b'\n', offset)
+    return len(data) if end < 0 else end
+
+
+def _mmap_file(path: pathlib.Path) -> t.Optional[mmap.mmap]:
+    """Memory-map a file, return None if it doesn't exist or is empty."""
+    try:
+        file = path.open('rb')
+    except FileNotFoundError:
+        return None
+    with file:
+        if os.fstat(file.fileno()).st_size == 0:
+            return None
+        return mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+class PackedRefs:
+    """Memory-mapped "packed-refs" file.
+
+    If the file declares that it is sorted, references with a given prefix are found using
+    binary search, without reading the whole file. Peeled values are provided for annotated
+    tags, and for other references if the file declares that they are fully peeled.
+    """
+
+    def __init__(self, path: pathlib.Path):
+        self.path = path
+        self._data = _mmap_file(path)
+        self._body = 0
+        self.traits: t.FrozenSet[str] = frozenset()
+        if self._data is not None \
+                and self._data[:len(_PACKED_REFS_HEADER)] == _PACKED_REFS_HEADER:
+            self._body = self._data.find(b'\n') + 1 or len(self._data)
+            header = self._data[len(_PACKED_REFS_HEADER):self._body]
+            self.traits = frozenset(header.decode().split())
+
+    def close(self) -> None:
+        if self._data is not None:
+            self._data.close()
+
+    def _record_start(self, data: mmap.mmap, offset: int) -> int:
+        """Find start of the record (reference line) that contains a given offset."""
+        start = max(data.rfind(b'\n', self._body, offset) + 1, self._body)
+        if data[start:start + 1] == b'^' and start > self._body:
+            start = max(data.rfind(b'\n', self._body, start - 1) + 1, self._body)
+        return start
+
+    def _bisect(self, data: mmap.mmap, name: bytes) -> int:
+        """Find offset of the first record with reference name not lower than a given one."""
+        low, high = self._body, len(data)
+        while low < high:
+            start = self._record_start(data, (low + high) // 2)
+            end = _line_end(data, start)
+            if data[start:end].partition(b' ')[2] < name:
+                low = end + 1
+                if data[low:low + 1] == b'^':
+                    low = _line_end(data, low) + 1
+            else:
+                high = start
+        return low
+
+    def refs(self, prefix: str = '') -> t.Iterator[t.Tuple[str, RefValue]]:
+        """Iterate over (name, value) of references starting with a given prefix."""
+        data = self._data
+        if data is None:
+            return
+        encoded_prefix = prefix.encode()
+        is_sorted = 'sorted' in self.traits
+        is_peeled = 'fully-peeled' in self.traits \
+            or 'peeled' in self.traits and prefix.startswith('refs/tags/')
+        offset = self._bisect(data, encoded_prefix) if is_sorted else self._body
+        while offset < len(data):
+            end = _line_end(data, offset)
+            line = data[offset:end]
+            offset = end + 1
+            if not line or line[:1] in (b'#', b'^'):
+                continue
+            sha, _, name = line.partition(b' ')
+            if not name.startswith(encoded_prefix):
+                if is_sorted:
+                    break
+                continue
+            peeled: t.Optional[str] = sha.decode() if is_peeled else None
+            if data[offset:offset + 1] == b'^':
+                end = _line_end(data, offset)
+                peeled = data[offset + 1:end].decode()
+                offset = end + 1
+            yield name.decode(), (sha.decode(), peeled)
+
+    def get(self, name: str) -> t.Optional[RefValue]:
+        """Get value of a reference with a given name, if it is present."""
+        for ref_name, value in self.refs(name):
+            if ref_name == name:
+                return value
+            if 'sorted' in self.traits:
+                break
+        return None
+
+
+class Reftable:
+    """Single reftable file, memory-mapped for reading.
+
+    Only reference blocks are read, sequentially; indexes and logs are ignored.
+    """
+
+    def __init__(self, path: pathlib.Path):
+        self.path = path
+        data = _mmap_file(path)
+        if data is None:
+            raise ValueError(f'reftable file {path} is empty')
+        self._data = data
+        signature, version = struct.unpack_from('>4sB', data, 0)
+        if signature != _REFTABLE_SIGNATURE or version not in _REFTABLE_HEADER_SIZES:
+            self.close()
+            raise ValueError(f'unsupported reftable file {path}: signature {signature!r},'
+                             f' version {version}')
+        self._header_size = _REFTABLE_HEADER_SIZES[version]
+        self._footer_start = len(data) - _REFTABLE_FOOTER_SIZES[version]
+        self.hash_length = _REFTABLE_HASH_LENGTHS[data[24:28]] if version == 2 else 20
+
+    def close(self) -> None:
+        self._data.close()
+
+    def _block_records(
+            self, offset: int, records_end: int) -> t.Iterator[t.Tuple[str, _ReftableRecord]]:
+        data = self._data
+        name = b''
+        while offset < records_end:
+            prefix_length, offset = read_offset_varint(data, offset)
+            suffix_and_type, offset = read_offset_varint(data, offset)
+            suffix_length, value_type = suffix_and_type >> 3, suffix_and_type & 0x7
+            name = name[:prefix_length] + data[offset:offset + suffix_length]
+            offset += suffix_length
+            _, offset = read_offset_varint(data, offset)  # update index delta
+            values: t.Tuple[str, ...] = ()
+            if value_type in (_REFTABLE_VALUE, _REFTABLE_VALUE_AND_PEELED):
+                end = offset + value_type * self.hash_length
+                values = tuple(data[_:_ + self.hash_length].hex()
+                               for _ in range(offset, end, self.hash_length))
+                offset = end
+            elif value_type == _REFTABLE_SYMREF:
+                target_length, offset = read_offset_varint(data, offset)
+                values = (data[offset:offset + target_length].decode(),)
+                offset += target_length
+            elif value_type != _REFTABLE_DELETION:
+                raise ValueError(f'unsupported value type {value_type} in {self.path}')
+            yield name.decode(), (value_type, values)
+
+    def records(self) -> t.Iterator[t.Tuple[str, _ReftableRecord]]:
+        """Iterate over (name, (value type, values)) of all reference records, in order."""
+        data = self._data
+        block_start = 0
+        while block_start < self._footer_start:
+            header_offset = block_start + (self._header_size if block_start == 0 else 0)
+            if data[header_offset:header_offset + 1] != b'r':
+                break
+            block_end = block_start + int.from_bytes(
+                data[header_offset + 1:header_offset + 4], 'big')
+            restart_count, = struct.unpack_from('>H', data, block_end - 2)
+            yield from self._block_records(header_offset + 4, block_end - 2 - 3 * restart_count)
+            block_start = block_end
+            while block_start < self._footer_start and data[block_start] == 0:
+                block_start += 1  # padding of aligned blocks
+
+
+class ReftableStack:
+    """Stack of reftable files, listed in "tables.list" from the oldest to the newest."""
+
+    def __init__(self, reftable_dir: pathlib.Path):
+        self.reftable_dir = reftable_dir
+        names = reftable_dir.joinpath('tables.list').read_text(encoding='utf-8').split()
+        self.tables: t.List[Reftable] = []
+        for name in names:
+            try:
+                table = Reftable(reftable_dir.joinpath(name))
+            except (OSError, ValueError, struct.error):
+                self.close()
+                raise
+            self.tables.append(table)
+        self._refs: t.Optional[t.Dict[str, _ReftableRecord]] = None
+
+    @classmethod
+    def open(cls, git_dir: pathlib.Path) -> t.Optional['ReftableStack']:
+        """Open the stack of reftable files in a given git folder, return None if there is none."""
+        reftable_dir = git_dir.joinpath('reftable')
+        if not reftable_dir.joinpath('tables.list').is_file():
+            return None
+        return cls(reftable_dir)
+
+    def close(self) -> None:
+        for table in self.tables:
+            table.close()
+
+    @property
+    def refs(self) -> t.Dict[str, _ReftableRecord]:
+        """All existing references sorted by name, mapped to their (value type, values)."""
+        if self._refs is None:
+            refs: t.Dict[str, _ReftableRecord] = {}
+            for table in self.tables:
+                refs.update(table.records())
+            self._refs = {name: record for name, record in sorted(refs.items())
+                          if record[0] != _REFTABLE_DELETION}
+        return self._refs
+
+
+def _is_worktree_ref(name: str) -> bool:
+    return not name.startswith('refs/') \
+        or name.startswith(('refs/bisect/', 'refs/worktree/', 'refs/rewritten/'))
+
+
+class GitRefStore:
+    """References of a git repository, read directly from its files.
+
+    In a linked worktree, HEAD is read from the worktree's own git folder, and other references
+    from the common git folder of the repository.
+    """
+
+    def __init__(self, git_dir: pathlib.Path, common_dir: t.Optional[pathlib.Path] = None):
+        self.git_dir = git_dir
+        self.common_dir = git_dir if common_dir is None else common_dir
+        self._packed_refs: t.Optional[PackedRefs] = None
+        self._reftables: t.Dict[pathlib.Path, t.Optional[ReftableStack]] = {}
+
+    @property
+    def packed_refs(self) -> PackedRefs:
+        """The packed-refs file, memory-mapped on first access."""
+        if self._packed_refs is None:
+            self._packed_refs = PackedRefs(self.common_dir.joinpath('packed-refs'))
+        return self._packed_refs
+
+    def _reftable(self, git_dir: pathlib.Path) -> t.Optional[ReftableStack]:
+        if git_dir not in self._reftables:
+            self._reftables[git_dir] = ReftableStack.open(git_dir)
+        return self._reftables[git_dir]
+
+    def close(self) -> None:
+        """Close all memory-mapped files."""
+        if self._packed_refs is not None:
+            self._packed_refs.close()
+            self._packed_refs = None
+        for stack in self._reftables.values():
+            if stack is not None:
+                stack.close()
+        self._reftables.clear()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def _ref_dir(self, name: str) -> pathlib.Path:
+        return self.git_dir if _is_worktree_ref(name) else self.common_dir
+
+    def _read(self, name: str) -> t.Optional[str]:
+        """Get raw value of a reference: a SHA, or a symbolic reference prefixed with "ref: "."""
+        ref_dir = self._ref_dir(name)
+        stack = self._reftable(ref_dir)
+        if stack is not None:
+            value_type, values = stack.refs.get(name, (_REFTABLE_DELETION, ()))
+            if value_type == _REFTABLE_SYMREF:
+                return f'{_SYMBOLIC_REF_PREFIX}{values[0]}'
+            return values[0] if values else None
+        try:
+            return ref_dir.joinpath(name).read_text(encoding='utf-8').strip()
+        except (FileNotFoundError, IsADirectoryError, NotADirectoryError):
+            pass
+        packed_value = self.packed_refs.get(name)
+        return None if packed_value is None else packed_value[0]
+
+    def resolve(self, name: str = 'HEAD') -> t.Optional[str]:
+        """Get SHA that a given reference points to, following symbolic references.
+
+        Return None if the reference (or the reference it points to) does not exist.
+        """
+        for _ in range(_MAX_SYMBOLIC_REF_DEPTH):
+            value = self._read(name)
+            if value is None or not value.startswith(_SYMBOLIC_REF_PREFIX):
+                return value
+            name = value[len(_SYMBOLIC_REF_PREFIX):]
+        raise ValueError(f'symbolic reference {name} in "{self.git_dir}" is nested too deeply')
+
+    def _loose_refs(self, prefix: str) -> t.Iterator[t.Tuple[str, str]]:
+        """Iterate over (name, raw value) of loose references in a given folder, recursively."""
+        folders = [prefix]
+        while folders:
+            folder = folders.pop()
+            try:
+                entries = list(os.scandir(self.common_dir.joinpath(folder)))
+            except (FileNotFoundError, NotADirectoryError):
+                continue
+            for entry in entries:
+                name = f'{folder}{entry.name}'
+                if entry.is_dir():
+                    folders.append(f'{name}/')
+                elif not entry.name.endswith('.lock'):
+                    with open(entry.path, encoding='utf-8') as ref_file:
+                        yield name, ref_file.read().strip()
+
+    def _reftable_refs(
+            self, stack: ReftableStack, prefix: str) -> t.Iterator[t.Tuple[str, RefValue]]:
+        for name, (value_type, values) in stack.refs.items():
+            if not name.startswith(prefix):
+                continue
+            if value_type == _REFTABLE_SYMREF:
+                resolved = self.resolve(name)
+                if resolved is not None:
+                    yield name, (resolved, None)
+            else:
+                yield name, (values[0], values[-1])
+
+    def refs(self, prefix: str = 'refs/tags/') -> t.Dict[str, RefValue]:
+        """Get all references in a given folder, mapped to their values.
+
+        References are sorted by name, like in the output of "git for-each-ref".
+        Symbolic references are resolved, and peeled SHAs are provided if they are recorded.
+        """
+        assert prefix.endswith('/'), prefix
+        stack = self._reftable(self.common_dir)
+        if stack is not None:
+            return dict(self._reftable_refs(stack, prefix))
+        refs = dict(self.packed_refs.refs(prefix))
+        for name, value in self._loose_refs(prefix):
+            if value.startswith(_SYMBOLIC_REF_PREFIX):
+                resolved = self.resolve(name)
+                if resolved is None:
+                    continue
+                value = resolved
+            refs[name] = value, None
+        return dict(sorted(refs.items()))
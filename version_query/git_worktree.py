@@ -0,0 +1,213 @@
+"""Checking if tracked files in the working tree of a git repository differ from the index.
+
+Status of each tracked file is compared with the status cached in the index, like git does.
+Files are read and hashed only when their status is inconclusive, i.e. when the size is the same
+(or not cached) but the rest of the status differs, or when the file was modified so soon after
+the index was written that the status cannot tell (so-called racy git problem).
+Status of files is checked by many threads, because it is dominated by waiting for the filesystem,
+and checking stops as soon as any modified file is found.
+
+Like in git, status of a file consists of its size, modification and change times, and inode
+and device numbers. Change times, inode and device numbers are not compared if core.trustCtime
+option of the repository is false or core.checkStat is "minimal", and executable bits and types
+of files are not compared on filesystems which don't support them, according to core.fileMode
+and core.symlinks options.
+"""
+
+import concurrent.futures
+import functools
+import hashlib
+import logging
+import os
+import pathlib
+import re
+import stat
+import threading
+import typing as t
+
+from .git_index import MODE_DIRECTORY, MODE_SYMLINK, MODE_GITLINK, GitIndex, GitIndexEntry
+
+__all__ = ['GitWorktreeOptions', 'is_worktree_modified']
+
+_LOG = logging.getLogger(__name__)
+
+# each thread checks this many files at once, and smaller indexes are checked without threads
+_ENTRIES_PER_TASK = 1024
+
+_CONFIG_SECTION_PATTERN = re.compile(r'\[\s*([^\]\s"]+)\s*("[^"]*")?\s*\]')
+
+_CONFIG_TRUE_VALUES = ('true', 'yes', 'on', '1')
+
+
+class GitWorktreeOptions(t.NamedTuple):
+    """Options of a git repository which affect comparing its working tree with the index."""
+
+    file_mode: bool = True
+    symlinks: bool = True
+    trust_ctime: bool = True
+    check_stat: bool = True
+
+    @classmethod
+    def read(cls, config_path: pathlib.Path) -> 'GitWorktreeOptions':
+        """Read core.fileMode, core.symlinks, core.trustCtime and core.checkStat options.
+
+        Options which are not set, or the whole file if it does not exist, default to true,
+        and core.checkStat is false only if it is "minimal". Only the given git config file
+        is read, and not the global or system config, nor included files.
+        """
+        try:
+            text = config_path.read_text(encoding='utf-8')
+        except FileNotFoundError:
+            return cls()
+        values: t.Dict[str, str] = {}
+        section = None
+        for line in text.splitlines():
+            line = line.strip()
+            match = _CONFIG_SECTION_PATTERN.match(line)
+            if match is not None:
+                section = match.group(1).lower() if match.group(2) is None else None
+                continue
+            if section != 'core' or not line or line[0] in '#;':
+                continue
+            name, equals, value = line.partition('=')
+            value = re.split('[#;]', value, maxsplit=1)[0].strip().strip('"').lower()
+            values[name.strip().lower()] = value if equals else 'true'
+        return cls(
+            values.get('filemode', 'true') in _CONFIG_TRUE_VALUES,
+            values.get('symlinks', 'true') in _CONFIG_TRUE_VALUES,
+            values.get('trustctime', 'true') in _CONFIG_TRUE_VALUES,
+            values.get('checkstat') != 'minimal')
+
+
+def _blob_sha(data: bytes) -> str:
+    return hashlib.sha1(b'blob %i\0%b' % (len(data), data)).hexdigest()
+
+
+def _is_type_changed(
+        entry: GitIndexEntry, file_stat: os.stat_result, options: GitWorktreeOptions) -> bool:
+    """Check if type of a file or its executable bit differs from its index entry."""
+    if entry.mode == MODE_GITLINK:
+        return not stat.S_ISDIR(file_stat.st_mode)
+    if entry.mode == MODE_SYMLINK:
+        # without support for symlinks, git checks them out as files which contain their targets
+        return not stat.S_ISLNK(file_stat.st_mode) \
+            and (options.symlinks or not stat.S_ISREG(file_stat.st_mode))
+    return not stat.S_ISREG(file_stat.st_mode) or options.file_mode \
+        and bool(file_stat.st_mode & stat.S_IXUSR) != bool(entry.mode & stat.S_IXUSR)
+
+
+def _is_stat_changed(
+        entry: GitIndexEntry, file_stat: os.stat_result, options: GitWorktreeOptions) -> bool:
+    """Check if status of a file other than its size differs from its index entry.
+
+    Like in git, inode and device numbers are compared only as far as they fit in the index.
+    """
+    if file_stat.st_mtime_ns != entry.mtime_s * 1_000_000_000 + entry.mtime_ns:
+        return True
+    if not options.check_stat:
+        return False
+    if options.trust_ctime \
+            and file_stat.st_ctime_ns != entry.ctime_s * 1_000_000_000 + entry.ctime_ns:
+        return True
+    return (file_stat.st_ino & 0xffffffff, file_stat.st_dev & 0xffffffff) \
+        != (entry.ino, entry.dev)
+
+
+def _is_status_clean(
+        entry: GitIndexEntry, file_stat: os.stat_result, index_mtime_ns: int,
+        options: GitWorktreeOptions) -> bool:
+    """Check if status of a file of the same size as its index entry proves it is not modified.
+
+    It does not if the file was modified so soon after the index was written that the status
+    cannot tell, or if the size in the entry is 0, which is what git stores for such racily clean
+    entries, and what some tools store always.
+    """
+    if entry.size == 0 or _is_stat_changed(entry, file_stat, options):
+        return False
+    return entry.mtime_s * 1_000_000_000 + entry.mtime_ns < index_mtime_ns
+
+
+def _is_entry_modified(
+        working_dir: pathlib.Path, entry: GitIndexEntry, index_mtime_ns: int,
+        confirm: t.Optional[t.Callable[[GitIndexEntry], bool]],
+        options: GitWorktreeOptions) -> bool:
+    """Check if a file in the working tree differs from its index entry."""
+    # pylint: disable = too-many-return-statements
+    if entry.assume_valid or entry.skip_worktree or entry.mode == MODE_DIRECTORY:
+        return False
+    path = working_dir.joinpath(os.fsdecode(entry.path))
+    try:
+        file_stat = path.lstat()
+    except (FileNotFoundError, NotADirectoryError):
+        return True
+    if _is_type_changed(entry, file_stat, options):
+        return confirm is None or confirm(entry)
+    if entry.mode == MODE_GITLINK:
+        return confirm is not None and confirm(entry)
+    if entry.size not in (file_stat.st_size, 0):
+        return confirm is None or confirm(entry)
+    if _is_status_clean(entry, file_stat, index_mtime_ns, options):
+        return False
+    if stat.S_ISLNK(file_stat.st_mode):
+        data = os.fsencode(os.readlink(path))
+    else:
+        data = path.read_bytes()
+    if _blob_sha(data) == entry.sha:
+        return False
+    return confirm is None or confirm(entry)
+
+
+def _first_modified_entry(
+        working_dir: pathlib.Path, entries: t.Sequence[GitIndexEntry],
+        is_modified: t.Callable[[GitIndexEntry], bool],
+        found: t.Optional[threading.Event] = None) -> t.Optional[GitIndexEntry]:
+    """Find the first modified file among given entries, unless a modified file is found elsewhere.
+
+    Return None if none of the entries is modified, or if the found event was set meanwhile.
+    """
+    for entry in entries:
+        if found is not None and found.is_set():
+            return None
+        if is_modified(entry):
+            _LOG.debug('"%s" in "%s" is modified', os.fsdecode(entry.path), working_dir)
+            if found is not None:
+                found.set()
+            return entry
+    return None
+
+
+def is_worktree_modified(
+        working_dir: pathlib.Path, index: GitIndex,
+        confirm: t.Optional[t.Callable[[GitIndexEntry], bool]] = None,
+        jobs: t.Optional[int] = None, options: GitWorktreeOptions = GitWorktreeOptions()) -> bool:
+    """Check if any tracked file in the working tree differs from its entry in the index.
+
+    Submodules are checked only for presence. Content filters (like end-of-line conversion)
+    are not applied when hashing files, so a file that differs only because of them looks
+    modified. Therefore, if confirm is given, it is called to confirm that a submodule or a file
+    whose type, size or hash differs is indeed modified, for example using git.
+
+    Status of files is checked using a pool of jobs threads, or if jobs is None, the default
+    number of workers of the pool.
+    """
+    entries = index.entries
+    is_modified = functools.partial(
+        _is_entry_modified, working_dir, index_mtime_ns=index.mtime_ns, confirm=confirm,
+        options=options)
+    if len(entries) <= _ENTRIES_PER_TASK or jobs == 1:
+        return _first_modified_entry(working_dir, entries, is_modified) is not None
+    found = threading.Event()
+    with concurrent.futures.ThreadPoolExecutor(jobs) as executor:
+        futures = [
+            executor.submit(
+                _first_modified_entry, working_dir, entries[start:start + _ENTRIES_PER_TASK],
+                is_modified, found)
+            for start in range(0, len(entries), _ENTRIES_PER_TASK)]
+        try:
+            return any(
+                future.result() is not None
+                for future in concurrent.futures.as_completed(futures))
+        finally:
+            found.set()
+            for future in futures:
+                future.cancel()
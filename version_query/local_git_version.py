@@ -9,14 +9,73 @@ dynamic = ["version"]
 
 [tool.setuptools.dynamic]
 version = {attr = "version_query.local_git_version.PREDICTED"}
+
+Attributes QUERIED and PREDICTED are computed on first access, and only then the git repository
+in the folder given by PROJECT_FOLDER environment variable (or in the current folder) is examined.
+
+The version can be also provided without examining the repository, which is useful for example
+when building from a source archive without git history:
+
+- VERSION_QUERY_VERSION environment variable, if set, is used as both QUERIED and PREDICTED;
+- otherwise, VERSION_QUERY_VERSION_FILE environment variable can point to a file with
+  the version (relative paths are relative to the project folder).
 """
 
+import functools
 import os
 import pathlib
+import typing as t
+
+from .version import Version
+from .repo_context import RepoVersionContext
+
+__all__ = ['QUERIED', 'PREDICTED']
 
-from .git_query import query_git_repo, predict_git_repo
+VERSION_ENVVAR = 'VERSION_QUERY_VERSION'
+VERSION_FILE_ENVVAR = 'VERSION_QUERY_VERSION_FILE'
 
 _CURRENT_FOLDER: pathlib.Path = pathlib.Path()
-_PROJECT_FOLDER: pathlib.Path = pathlib.Path(os.environ.get('PROJECT_FOLDER', _CURRENT_FOLDER))
-QUERIED: str = query_git_repo(_PROJECT_FOLDER).to_str()
-PREDICTED: str = predict_git_repo(_PROJECT_FOLDER).to_str()
+
+QUERIED: str
+PREDICTED: str
+
+
+def _project_folder() -> pathlib.Path:
+    return pathlib.Path(os.environ.get('PROJECT_FOLDER', _CURRENT_FOLDER))
+
+
+def _overridden_version() -> t.Optional[Version]:
+    """Get the version provided via environment, if any."""
+    version_str = os.environ.get(VERSION_ENVVAR)
+    if not version_str and os.environ.get(VERSION_FILE_ENVVAR):
+        version_file = _project_folder().joinpath(os.environ[VERSION_FILE_ENVVAR])
+        version_str = version_file.read_text(encoding='utf-8').strip()
+    if not version_str:
+        return None
+    return Version.from_str(version_str)
+
+
+@functools.lru_cache(maxsize=None)
+def _context() -> RepoVersionContext:
+    version = _overridden_version()
+    if version is not None:
+        return RepoVersionContext(version)
+    from .git_query import git_repo_version_context  # pylint: disable = import-outside-toplevel
+    return git_repo_version_context(_project_folder())
+
+
+_ATTRIBUTES: t.Dict[str, t.Callable[[RepoVersionContext], Version]] = {
+    'QUERIED': lambda context: context.queried,
+    'PREDICTED': lambda context: context.predicted}
+
+
+def __getattr__(name: str) -> str:
+    if name not in _ATTRIBUTES:
+        raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
+    value = _ATTRIBUTES[name](_context()).to_str()
+    globals()[name] = value
+    return value
+
+
+def __dir__() -> t.List[str]:
+    return sorted({*globals(), *_ATTRIBUTES})
@@ -1,43 +1,263 @@
 """Command-line interface of version_query package."""
 
 import argparse
+import functools
+import json
 import pathlib
+import sys
+import typing as t
 
-from boilerplates.cli import make_copyright_notice, add_version_option
+from .version import VersionComponent, Version
+from .query import query_folder, predict_folder, folder_version_context
+from .daemon_client import SOCKET_ENVVAR, daemon_request
 
-from ._version import VERSION
-from .version import VersionComponent
-from .query import query_folder, predict_folder
+if t.TYPE_CHECKING:
+    from .batch import QueryResult
+
+# boilerplates.cli, git_query module (which imports GitPython) and version of this package
+# (which is predicted from its git repository if there is one) are determined only when needed
+
+
+@functools.lru_cache(maxsize=None)
+def _copyright_notice() -> str:
+    from boilerplates.cli import make_copyright_notice  # pylint: disable = import-outside-toplevel
+    return make_copyright_notice(
+        2017, 2026, author='the contributors', url='https://github.com/mbdevpl/version-query')
+
+
+class _ArgumentParser(argparse.ArgumentParser):
+    """Argument parser which adds the copyright notice to the help only when it is printed."""
+
+    def format_help(self) -> str:
+        if self.epilog is None:
+            self.epilog = _copyright_notice()
+        return super().format_help()
+
+
+class _VersionAction(argparse.Action):
+    """Print version of this package and exit, like "version" action of argparse.
+
+    The version is determined only when this option is used.
+    """
+
+    def __init__(self, option_strings, dest=argparse.SUPPRESS, default=argparse.SUPPRESS):
+        super().__init__(option_strings, dest=dest, default=default, nargs=0,
+                         help="show program's version number and exit")
+
+    def __call__(self, parser, namespace, values, option_string=None):
+        from ._version import VERSION  # pylint: disable = import-outside-toplevel
+        print(f'{parser.prog} {VERSION}, Python {sys.version}')
+        parser.exit()
+
+
+def cache_main(args=None, namespace=None) -> None:
+    """Run the cache subcommand of the command-line interface.
+
+    Either warm or clear the cache of results in a given git repository.
+    """
+    parser = _ArgumentParser(
+        prog='version_query cache',
+        description='''Manage the cache of results of querying and predicting version of a git
+        repository. The cache is stored in the git folder of the repository, and it is used when
+        VERSION_QUERY_CACHE environment variable is set to 1.''',
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter)
+    parser.add_argument('action', choices=['warm', 'clear'], help='''warm: query and predict
+                        version, and store results in the cache; clear: remove all results from
+                        the cache''')
+    parser.add_argument('path', type=pathlib.Path, nargs='?', default=pathlib.Path('.'))
+    parsed_args = parser.parse_args(args=args, namespace=namespace)
+    # pylint: disable = import-outside-toplevel
+    from .git_query import warm_git_cache, clear_git_cache
+    if parsed_args.action == 'warm':
+        print(warm_git_cache(parsed_args.path))
+    else:
+        clear_git_cache(parsed_args.path)
+
+
+def revisions_main(args=None, namespace=None) -> None:
+    """Run the revisions subcommand of the command-line interface.
+
+    Either query or predict versions of many revisions of a git repository at once.
+    """
+    parser = _ArgumentParser(
+        prog='version_query revisions',
+        description='''Tool for querying versions of many revisions of a git repository at once.
+        For each revision, a line with the revision and its version is printed. Revision ranges
+        (like v1.0..HEAD) are expanded, and a line for each commit within the range is printed.
+        Revisions from which no version tag is reachable are listed in an error at the end.''',
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter)
+    parser.add_argument('-p', '--predict', action='store_true', help='''operate in prediction mode,
+                        i.e. infer versions from tags and commit history''')
+    parser.add_argument('-r', '--repo', type=pathlib.Path, default=pathlib.Path('.'),
+                        help='path to the git repository')
+    parser.add_argument('revisions', nargs='+', metavar='revision')
+    parsed_args = parser.parse_args(args=args, namespace=namespace)
+    # pylint: disable = import-outside-toplevel
+    from .git_query import query_git_revisions, predict_git_revisions
+    versions: t.Mapping[str, t.Optional[Version]]
+    if parsed_args.predict:
+        versions = predict_git_revisions(parsed_args.repo, parsed_args.revisions)
+    else:
+        versions = query_git_revisions(parsed_args.repo, parsed_args.revisions)
+    unknown = [revision for revision, version in versions.items() if version is None]
+    for revision, version in versions.items():
+        if version is not None:
+            print(revision, version)
+    if unknown:
+        raise ValueError(f'no version tags are reachable from {len(unknown)} of {len(versions)}'
+                         f' revisions: {", ".join(unknown)}')
+
+
+def _version(path: pathlib.Path, predict: bool) -> Version:
+    """Query or predict version of a path, asking the daemon if it is running."""
+    version_str = daemon_request('predict_folder' if predict else 'query_folder', path)
+    if version_str is not None:
+        return Version.from_str(version_str)
+    return predict_folder(path) if predict else query_folder(path)
+
+
+def _context_dict(path: pathlib.Path) -> t.Dict[str, t.Any]:
+    """Determine version information of a path, asking the daemon if it is running."""
+    context = daemon_request('folder_version_context', path)
+    if context is None:
+        context = folder_version_context(path).to_dict()
+    return context
+
+
+def _is_many(paths: t.List[pathlib.Path]) -> bool:
+    return len(paths) > 1 or str(paths[0]) == '-'
+
+
+def _iter_paths(paths: t.Iterable[pathlib.Path]) -> t.Iterator[pathlib.Path]:
+    """Yield given paths, and instead of "-" yield paths read from standard input, one per line."""
+    for path in paths:
+        if str(path) != '-':
+            yield path
+            continue
+        for line in sys.stdin:
+            line = line.rstrip('\r\n')
+            if line:
+                yield pathlib.Path(line)
+
+
+def _json_record(result: 'QueryResult', increment: bool) -> t.Dict[str, t.Any]:
+    """Convert result of a query of one of many paths to a dictionary that can be serialized."""
+    context = {} if result.context is None else result.context.to_dict()
+    record = {'path': str(result.path), 'version': None}
+    if result.version is not None:
+        if increment:
+            result.version.increment(VersionComponent.Patch)
+        record['version'] = result.version.to_str()
+    for key in ('tag', 'commit', 'commit_distance', 'is_dirty', 'head_commit'):
+        record[key] = context.get(key)
+    record['error'] = None if result.error is None else str(result.error)
+    return record
+
+
+def _many_main(parsed_args: argparse.Namespace) -> None:
+    """Query or predict versions of many paths in parallel, and print them as they are ready."""
+    from .batch import iter_query_many  # pylint: disable = import-outside-toplevel
+    paths_count = 0
+    failed = []
+    for result in iter_query_many(
+            _iter_paths(parsed_args.paths), parsed_args.predict, parsed_args.jobs,
+            with_context=parsed_args.json):
+        paths_count += 1
+        if result.error is not None:
+            failed.append(result.path)
+        if parsed_args.json:
+            print(json.dumps(_json_record(result, parsed_args.increment)), flush=True)
+            continue
+        if result.error is not None:
+            print(f'{result.path}: {result.error}', file=sys.stderr)
+            continue
+        assert result.version is not None
+        if parsed_args.increment:
+            result.version.increment(VersionComponent.Patch)
+        print(result.path, result.version, flush=True)
+    if failed:
+        raise ValueError(f'failed to determine version of {len(failed)} of'
+                         f' {paths_count} paths: {", ".join(map(str, failed))}')
+
+
+def serve_main(args=None, namespace=None) -> None:
+    """Run the serve subcommand of the command-line interface.
+
+    Run the version query daemon until interrupted.
+    """
+    parser = _ArgumentParser(
+        prog='version_query serve',
+        description=f'''Run a daemon which keeps state of git repositories in memory, and answers
+        version queries over a Unix socket. While it is running, the command-line interface
+        asks it instead of determining versions by itself. By default, the socket is taken
+        from {SOCKET_ENVVAR} environment variable, or it is in the runtime folder of the user.''',
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter)
+    parser.add_argument('--socket', type=pathlib.Path, help='path of the socket')
+    parsed_args = parser.parse_args(args=args, namespace=namespace)
+    from .daemon import serve  # pylint: disable = import-outside-toplevel
+    serve(parsed_args.socket)
+
+
+_SUBCOMMANDS = {'cache': cache_main, 'revisions': revisions_main, 'serve': serve_main}
 
 
 def main(args=None, namespace=None) -> None:
     """Run the command-line interface.
 
-    Either query or predict version in a given folder according to the arguments.
+    Either query or predict version in a given folder according to the arguments,
+    or run a subcommand if the first argument is one of: "cache", "revisions", "serve".
+    For compatibility, the first argument is a path and not a subcommand if it is an existing
+    folder.
+
+    If the version query daemon is running, it is asked for the version of a single path.
     """
-    parser = argparse.ArgumentParser(
+    if args is None:
+        args = sys.argv[1:]
+    if args and args[0] in _SUBCOMMANDS and not pathlib.Path(args[0]).is_dir():
+        _SUBCOMMANDS[args[0]](args[1:], namespace)
+        return
+    parser = _ArgumentParser(
         prog='version_query',
         description='''Tool for querying current versions of Python packages. Use LOGGING_LEVEL
         environment variable to adjust logging level.''',
-        epilog=make_copyright_notice(
-            2017, 2026, author='the contributors', url='https://github.com/mbdevpl/version-query'),
         formatter_class=argparse.ArgumentDefaultsHelpFormatter)
-    add_version_option(parser, VERSION)
+    parser.add_argument('--version', action=_VersionAction)
 
     parser.add_argument('-i', '--increment', action='store_true', help='''output version string for
                         next patch release, i.e. if version is 1.0.3, output 1.0.4''')
     parser.add_argument('-p', '--predict', action='store_true', help='''operate in prediction mode,
                         i.e. assume existence of git repository and infer current version from
                         its tags, history and working tree status''')
-    parser.add_argument('path', type=pathlib.Path)
+    parser.add_argument('-c', '--context', action='store_true', help='''output all version
+                        information as JSON: queried and predicted version, latest version tag,
+                        distance from it, working tree status and HEAD commit''')
+    parser.add_argument('-j', '--jobs', type=int, default=1, help='''number of paths to handle
+                        in parallel, if many paths are given''')
+    parser.add_argument('--json', action='store_true', help='''for each path, output a line
+                        with JSON object with the path, its version, latest version tag, its
+                        commit, distance from it, working tree status, HEAD commit and error
+                        message if the version could not be determined; version information is
+                        determined like for --context, for any number of paths''')
+    parser.add_argument('paths', type=pathlib.Path, nargs='+', metavar='path', help='''if many
+                        paths are given, a line with the path and its version is printed for each
+                        one of them, in the order of the paths, as soon as it is ready; "-" stands
+                        for paths read from standard input, one per line''')
     parsed_args = parser.parse_args(args=args, namespace=namespace)
     if parsed_args.predict and parsed_args.increment:
         raise ValueError(
             'choose one: either increment current version, or predict upcoming version')
-    if parsed_args.predict:
-        version = predict_folder(parsed_args.path)
-    else:
-        version = query_folder(parsed_args.path)
+    if parsed_args.jobs < 1:
+        raise ValueError(f'number of jobs must be positive, not {parsed_args.jobs}')
+    if parsed_args.context:
+        if parsed_args.predict or parsed_args.increment or parsed_args.json \
+                or _is_many(parsed_args.paths):
+            raise ValueError('context output cannot be combined with other options')
+        print(json.dumps(_context_dict(parsed_args.paths[0])))
+        return
+    if parsed_args.json or _is_many(parsed_args.paths):
+        _many_main(parsed_args)
+        return
+    version = _version(parsed_args.paths[0], parsed_args.predict)
     if parsed_args.increment:
         version.increment(VersionComponent.Patch)
     print(version)
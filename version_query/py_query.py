@@ -1,13 +1,65 @@
 """Python package version query tools."""
 
+import bisect
 import logging
 import json
+import os
 import pathlib
+import time
+import typing as t
 
 from .version import Version
+from .racy import _RACY_INTERVAL_NS
 
 _LOG = logging.getLogger(__name__)
 
+_METADATA_FOLDER_SUFFIXES = ('.dist-info', '.egg-info')
+
+_metadata_folders_index: t.Dict[str, t.Tuple[int, t.List[t.Tuple[str, str]]]] = {}
+
+
+def _metadata_folders(folder: pathlib.Path) -> t.List[t.Tuple[str, str]]:
+    """List *.dist-info and *.egg-info entries in a folder, as sorted (normalised, name) pairs.
+
+    Folders are scanned once, and the results are reused for the lifetime of the process,
+    for as long as modification time of the folder stays the same.
+    """
+    key = os.fspath(folder)
+    try:
+        mtime = os.stat(key).st_mtime_ns
+    except OSError:
+        return []
+    cached = _metadata_folders_index.get(key)
+    if cached is not None and cached[0] == mtime:
+        return cached[1]
+    try:
+        names = os.listdir(key)
+    except OSError:
+        return []
+    metadata_folders = sorted(
+        (os.path.normcase(name), name) for name in names
+        if os.path.normcase(name).endswith(_METADATA_FOLDER_SUFFIXES))
+    if time.time_ns() - mtime > _RACY_INTERVAL_NS:
+        _metadata_folders_index[key] = (mtime, metadata_folders)
+    return metadata_folders
+
+
+def _metadata_paths(
+        folder: pathlib.Path, prefix: str, suffix: str, file_name: str) -> t.List[pathlib.Path]:
+    """Find the same paths as folder.glob(f'{prefix}*{suffix}/{file_name}'), using the index."""
+    normalised_prefix = os.path.normcase(prefix)
+    metadata_folders = _metadata_folders(folder)
+    paths = []
+    for normalised, name in metadata_folders[
+            bisect.bisect_left(metadata_folders, (normalised_prefix, '')):]:
+        if not normalised.startswith(normalised_prefix):
+            break
+        if normalised.endswith(suffix) and len(normalised) >= len(prefix) + len(suffix):
+            path = folder.joinpath(name, file_name)
+            if path.exists():
+                paths.append(path)
+    return paths
+
 
 def query_metadata_json(path: pathlib.Path) -> Version:
     """Get version from metadata.json file."""
@@ -31,9 +83,9 @@ def query_package_folder(path: pathlib.Path, search_parent_directories: bool = F
     """Get version from Python package folder."""
     global_metadata_json_paths, global_pkg_info_paths = [], []
     if path.joinpath('pyproject.toml').exists() or path.joinpath('setup.py').exists():
-        metadata_json_paths = list(path.glob('*.dist-info/metadata.json'))
-        pkg_info_paths = list(path.glob('*.egg-info/PKG-INFO'))
-        pkg_info_paths += list(path.glob('*.dist-info/METADATA'))
+        metadata_json_paths = _metadata_paths(path, '', '.dist-info', 'metadata.json')
+        pkg_info_paths = _metadata_paths(path, '', '.egg-info', 'PKG-INFO')
+        pkg_info_paths += _metadata_paths(path, '', '.dist-info', 'METADATA')
         if len(metadata_json_paths) == 1 and not pkg_info_paths:
             return query_metadata_json(metadata_json_paths[0])
         if not metadata_json_paths and len(pkg_info_paths) == 1:
@@ -50,9 +102,9 @@ def query_package_folder(path: pathlib.Path, search_parent_directories: bool = F
     if search_parent_directories:
         paths += path.parents
     for pth in paths:
-        metadata_json_paths = list(pth.parent.glob(f'{pth.name}*.dist-info/metadata.json'))
-        pkg_info_paths = list(pth.parent.glob(f'{pth.name}*.egg-info/PKG-INFO'))
-        pkg_info_paths += list(pth.parent.glob(f'{pth.name}*.dist-info/METADATA'))
+        metadata_json_paths = _metadata_paths(pth.parent, pth.name, '.dist-info', 'metadata.json')
+        pkg_info_paths = _metadata_paths(pth.parent, pth.name, '.egg-info', 'PKG-INFO')
+        pkg_info_paths += _metadata_paths(pth.parent, pth.name, '.dist-info', 'METADATA')
         if len(metadata_json_paths) == 1 and not pkg_info_paths:
             return query_metadata_json(metadata_json_paths[0])
         if not metadata_json_paths and len(pkg_info_paths) == 1:
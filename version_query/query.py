@@ -2,44 +2,188 @@
 
 import inspect
 import logging
+import os
 import pathlib
-
-import git
+import time
+import typing as t
 
 from .version import Version
-from .git_query import query_git_repo, predict_git_repo
 from .py_query import query_package_folder
+from .racy import _RACY_INTERVAL_NS
+from .repo_context import RepoVersionContext
 
 _LOG = logging.getLogger(__name__)
 
 
+_caller_folders: t.Dict[str, pathlib.Path] = {}
+
+# git_query function name, folder and search_parent_directories -> result, for caller functions
+_GitResultsMemo = t.Dict[t.Tuple[str, pathlib.Path, bool], t.Any]
+
+_caller_git_results: _GitResultsMemo = {}
+
+_caller_versions: t.Dict[t.Tuple[str, pathlib.Path], Version] = {}
+
+
 def _caller_folder(stack_level: int = 1) -> pathlib.Path:
-    """Determine folder in which the caller module of a function is located."""
-    frame_info = inspect.getouterframes(inspect.currentframe())[stack_level]
-    caller_path = frame_info[1]  # frame_info.filename
+    """Determine folder in which the caller module of a function is located.
+
+    Only the frame of the caller is inspected, and folders of already seen modules are reused.
+    """
+    frame = inspect.currentframe()
+    for _ in range(stack_level):
+        assert frame is not None
+        frame = frame.f_back
+    assert frame is not None
+    caller_path = frame.f_code.co_filename
+    del frame
+    if caller_path in _caller_folders:
+        return _caller_folders[caller_path]
 
     here = pathlib.Path(caller_path).absolute()
-    assert here.name == '<string>' or here.is_file(), here
+    is_file = here.is_file()
+    assert here.name == '<string>' or is_file, here
     here = here.parent.resolve()
     assert here.is_dir(), here
     _LOG.debug('found directory "%s"', here)
 
+    if is_file:  # code that is not in a file is treated as located in current working directory
+        _caller_folders[caller_path] = here
     return here
 
 
-def query_folder(path: pathlib.Path, search_parent_directories: bool = False) -> Version:
-    """Determine version of code in a given folder."""
+class _FolderProbe(t.NamedTuple):
+    """Kinds of sources of version information found in a folder."""
+
+    git: t.Optional[str]
+    """Either "worktree" (there is .git folder), "gitfile" (there is .git file), "git dir"
+    (the folder itself may be a git folder, as it has HEAD file) or None."""
+    has_project_file: bool
+    """There is pyproject.toml or setup.py file."""
+    has_metadata: bool
+    """There are some *.dist-info or *.egg-info entries."""
+
+
+_folder_probes: t.Dict[str, t.Tuple[int, _FolderProbe]] = {}
+
+
+def _probe_folder(folder: pathlib.Path) -> t.Optional[_FolderProbe]:
+    """Classify a folder, or return None if it is not an existing folder.
+
+    Each folder is listed once, and the result is reused for the lifetime of the process,
+    for as long as modification time of the folder stays the same.
+    """
+    key = os.fspath(folder)
     try:
-        return query_git_repo(path, search_parent_directories=search_parent_directories)
-    except git.InvalidGitRepositoryError:
-        pass
+        stat = os.stat(key)
+    except OSError:
+        return None
+    cached = _folder_probes.get(key)
+    if cached is not None and cached[0] == stat.st_mtime_ns:
+        return cached[1]
+    try:
+        names = {os.path.normcase(name) for name in os.listdir(key)}
+    except OSError:
+        return None
+    git = None
+    if '.git' in names:
+        git = 'worktree' if os.path.isdir(os.path.join(key, '.git')) else 'gitfile'
+    elif os.path.normcase('HEAD') in names:
+        git = 'git dir'
+    probe = _FolderProbe(
+        git, 'pyproject.toml' in names or 'setup.py' in names,
+        any(name.endswith(('.dist-info', '.egg-info')) for name in names))
+    if time.time_ns() - stat.st_mtime_ns > _RACY_INTERVAL_NS:
+        _folder_probes[key] = (stat.st_mtime_ns, probe)
+    return probe
+
+
+def _git_repo_folder(
+        path: pathlib.Path, search_parent_directories: bool) -> t.Optional[pathlib.Path]:
+    """Find the folder from which GitPython would find a git repository for a given path.
+
+    Return None only if there certainly is no git repository. Otherwise, return the first folder
+    (among the path and, if searched, its parents) that may hold the repository. If the path
+    is not an existing folder, return it as it is, so that GitPython reports the problem.
+    """
+    probe = _probe_folder(path)
+    if probe is None or probe.git is not None:
+        return path
+    if not search_parent_directories:
+        return None
+    for folder in pathlib.Path(os.path.abspath(path)).parents:
+        probe = _probe_folder(folder)
+        if probe is not None and probe.git is not None:
+            return folder
+    return None
+
+
+def _from_git_repo(
+        function_name: str, path: pathlib.Path, search_parent_directories: bool,
+        memo: t.Optional[_GitResultsMemo] = None) -> t.Any:
+    """Call a function of git_query module on a path, or return None if there is no repository.
+
+    git_query module is imported only if there may be a git repository at the path, and it starts
+    searching from the folder in which the repository may be. If memo is given, results
+    are reused for all paths for which the search starts from the same folder.
+    """
+    folder = _git_repo_folder(path, search_parent_directories)
+    if folder is None:
+        return None
+    key = (function_name, folder, search_parent_directories)
+    if memo is not None and key in memo:
+        return memo[key]
+    from . import git_query  # pylint: disable = import-outside-toplevel
+    try:
+        result = getattr(git_query, function_name)(
+            folder, search_parent_directories=search_parent_directories)
+    except git_query._invalid_git_repo_errors():  # pylint: disable = protected-access
+        result = None
+    if memo is not None:
+        memo[key] = result
+    return result
+
+
+def _may_be_package_folder(path: pathlib.Path) -> bool:
+    """Check if query_package_folder() without searching parent directories may succeed."""
+    probe, parent_probe = _probe_folder(path), _probe_folder(path.parent)
+    return probe is None or probe.has_project_file \
+        or parent_probe is None or parent_probe.has_metadata
+
+
+def _query_folder(
+        path: pathlib.Path, search_parent_directories: bool,
+        memo: t.Optional[_GitResultsMemo] = None) -> Version:
+    version = _from_git_repo('query_git_repo', path, search_parent_directories, memo)
+    if version is not None:
+        return version
     return query_package_folder(path, search_parent_directories=search_parent_directories)
 
 
+def query_folder(path: pathlib.Path, search_parent_directories: bool = False) -> Version:
+    """Determine version of code in a given folder."""
+    return _query_folder(path, search_parent_directories)
+
+
+def _caller_version(function_name: str, stack_level: int) -> Version:
+    """Determine or predict the version of code associated with a caller of a caller function.
+
+    Results are reused for the lifetime of the process: for modules from the same folder,
+    and for all modules that get their version from the same git repository.
+    """
+    here = _caller_folder(stack_level + 1)
+    key = (function_name, here)
+    if key not in _caller_versions:
+        if function_name == 'query':
+            _caller_versions[key] = _query_folder(here, True, _caller_git_results)
+        else:
+            _caller_versions[key] = _predict_folder(here, True, _caller_git_results)
+    return Version.from_version(_caller_versions[key])
+
+
 def query_caller(stack_level: int = 1) -> Version:
     """Determine the version of code associated with the caller of this function."""
-    here = _caller_folder(stack_level + 1)
-    return query_folder(here, True)
+    return _caller_version('query', stack_level + 1)
 
 
 def query_version_str() -> str:
@@ -56,30 +200,35 @@ def query_version_str() -> str:
     return query_caller(2).to_str()
 
 
-def predict_folder(path: pathlib.Path, search_parent_directories: bool = True) -> Version:
-    """Predict version of code residing in a given folder."""
+def _predict_folder(
+        path: pathlib.Path, search_parent_directories: bool,
+        memo: t.Optional[_GitResultsMemo] = None) -> Version:
     priority_cutoff = 2
     paths = [path] + (list(path.parents)[:priority_cutoff] if search_parent_directories else [])
     for pth in paths:
+        version = _from_git_repo('predict_git_repo', pth, False, memo)
+        if version is not None:
+            return version
+    if _may_be_package_folder(path):
         try:
-            return predict_git_repo(pth, search_parent_directories=False)
-        except git.InvalidGitRepositoryError:
+            return query_package_folder(path, search_parent_directories=False)
+        except ValueError:
             pass
-    try:
-        return query_package_folder(path, search_parent_directories=False)
-    except ValueError:
-        pass
-    try:
-        return predict_git_repo(path, search_parent_directories=search_parent_directories)
-    except git.InvalidGitRepositoryError:
-        pass
-    return query_folder(path, search_parent_directories=search_parent_directories)
+    version = _from_git_repo('predict_git_repo', path, search_parent_directories, memo)
+    if version is not None:
+        return version
+    # query_folder() would try the same git repository again, so go straight to package metadata
+    return query_package_folder(path, search_parent_directories=search_parent_directories)
+
+
+def predict_folder(path: pathlib.Path, search_parent_directories: bool = True) -> Version:
+    """Predict version of code residing in a given folder."""
+    return _predict_folder(path, search_parent_directories)
 
 
 def predict_caller(stack_level: int = 1) -> Version:
     """Predict the version of code associated with the caller of this function."""
-    here = _caller_folder(stack_level + 1)
-    return predict_folder(here, True)
+    return _caller_version('predict', stack_level + 1)
 
 
 def predict_version_str() -> str:
@@ -94,3 +243,29 @@ def predict_version_str() -> str:
     '''
     """
     return predict_caller(2).to_str()
+
+
+def folder_version_context(
+        path: pathlib.Path, search_parent_directories: bool = True) -> RepoVersionContext:
+    """Determine version information of code residing in a given folder.
+
+    The folder is searched for like in predict_folder(), and the resulting context provides both
+    the queried and the predicted version, without examining the repository twice.
+    """
+    priority_cutoff = 2
+    paths = [path] + (list(path.parents)[:priority_cutoff] if search_parent_directories else [])
+    for pth in paths:
+        context = _from_git_repo('git_repo_version_context', pth, False)
+        if context is not None:
+            return context
+    if _may_be_package_folder(path):
+        try:
+            return RepoVersionContext(
+                query_package_folder(path, search_parent_directories=False))
+        except ValueError:
+            pass
+    context = _from_git_repo('git_repo_version_context', path, search_parent_directories)
+    if context is not None:
+        return context
+    return RepoVersionContext(
+        query_package_folder(path, search_parent_directories=search_parent_directories))
@@ -0,0 +1,9 @@
+"""Limit on how recently modified files may be to cache results derived from their status.
+
+A file or folder modified very recently may be still changing, and it may change again without
+changing its modification time, because of the limited precision of timestamps (so-called racy
+timestamps). Therefore, results derived from status of files or folders modified less than
+_RACY_INTERVAL_NS nanoseconds ago are not cached.
+"""
+
+_RACY_INTERVAL_NS = 3_000_000_000
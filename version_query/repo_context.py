@@ -0,0 +1,87 @@
+"""Version information of a repository, for both version query and prediction."""
+
+import datetime
+import typing as t
+
+from .version import Version
+
+
+def _apply_commit_distance(version: Version, commit_distance: int, commit: str) -> None:
+    """Make a version a development version of a given commit, if it is after the version tag."""
+    if commit_distance > 0:
+        version.devel_increment(commit_distance)
+        version.local = (f'git{commit[:8]}',)
+
+
+def _apply_dirty(version: Version) -> None:
+    """Mark a version as a version of a modified working tree, using the current time."""
+    dt_ = f'dirty{datetime.datetime.strftime(datetime.datetime.now(), "%Y%m%d%H%M%S")}'
+    if version.has_local:
+        assert version.local is not None  # mypy needs this
+        version.local = (*version.local, '.', dt_)
+    else:
+        version.local = (dt_,)
+
+
+class RepoVersionContext:
+    """Version information of a repository, determined once for both version query and prediction.
+
+    The latest version tag, the distance from it and the working tree status are found once,
+    and then both the queried and the predicted versions are derived from them.
+
+    When there is no version tag, the version is 0.1.0.dev0 and the tag is None. Querying
+    the version raises ValueError in such case. When version information comes from package
+    metadata instead of a git repository, all git-related attributes are None, and both
+    the queried and the predicted versions are the same.
+    """
+
+    # pylint: disable = too-many-arguments, too-many-positional-arguments
+
+    def __init__(
+            self, version: Version, tag: t.Optional[str] = None, commit: t.Optional[str] = None,
+            commit_distance: t.Optional[int] = None, is_dirty: t.Optional[bool] = None,
+            head_commit: t.Optional[str] = None,
+            queried: t.Union[Version, ValueError, None] = None):
+        self.version = version
+        self.tag = tag
+        self.commit = commit
+        self.commit_distance = commit_distance
+        self.is_dirty = is_dirty
+        self.head_commit = head_commit
+        self._queried = version if queried is None else queried
+
+    def __repr__(self) -> str:
+        return (f'{type(self).__name__}({self.version!r}, tag={self.tag!r},'
+                f' commit={self.commit!r}, commit_distance={self.commit_distance!r},'
+                f' is_dirty={self.is_dirty!r}, head_commit={self.head_commit!r})')
+
+    @property
+    def queried(self) -> Version:
+        """Current version, like the one returned by query_git_repo()."""
+        if isinstance(self._queried, ValueError):
+            raise self._queried
+        return Version.from_version(self._queried)
+
+    @property
+    def predicted(self) -> Version:
+        """Upcoming version, like the one returned by predict_git_repo()."""
+        version = Version.from_version(self.version)
+        if self.head_commit is None:
+            return version
+        assert self.commit_distance is not None
+        _apply_commit_distance(version, self.commit_distance, self.head_commit)
+        if self.is_dirty:
+            _apply_dirty(version)
+        return version
+
+    def to_dict(self) -> t.Dict[str, t.Any]:
+        """Convert to a dictionary that can be serialized to JSON.
+
+        Versions are converted to strings, and the queried version is None if querying fails.
+        """
+        queried = None if isinstance(self._queried, ValueError) else self._queried.to_str()
+        return {
+            'queried': queried, 'predicted': self.predicted.to_str(),
+            'version': self.version.to_str(), 'tag': self.tag, 'commit': self.commit,
+            'commit_distance': self.commit_distance, 'is_dirty': self.is_dirty,
+            'head_commit': self.head_commit}
@@ -0,0 +1,195 @@
+"""Thread-safe in-process service for answering many version queries."""
+
+import collections
+import concurrent.futures
+import os
+import pathlib
+import threading
+import time
+import typing as t
+
+from .version import Version
+from .git_cache import _stat_signature, tag_refs_fingerprint, worktree_fingerprint
+from .git_files import find_common_dir, find_git_dir
+from .git_pool import GitRepoPool
+from .query import _git_repo_folder, query_folder, predict_folder, folder_version_context
+from .racy import _RACY_INTERVAL_NS
+from .repo_context import RepoVersionContext
+
+__all__ = ['VersionQueryService']
+
+_Key = t.Tuple[str, str, bool]
+
+
+def _git_dirs(folder: pathlib.Path) -> t.Optional[t.Tuple[pathlib.Path, pathlib.Path]]:
+    """Find git folder and common git folder for a folder which may hold a git repository."""
+    try:
+        git_dir, _ = find_git_dir(folder, search_parent_directories=False)
+    except ValueError:
+        return None
+    return git_dir, find_common_dir(git_dir)
+
+
+def _git_signature(
+        folder: pathlib.Path, worktree: bool) -> t.Optional[t.Tuple[t.Any, ...]]:
+    """Get signature of state of HEAD, references and index of a git repository.
+
+    If worktree is True, status of tracked files is included as well. Return None if state
+    of the repository cannot be reliably determined.
+    """
+    git_dirs = _git_dirs(folder)
+    if git_dirs is None:
+        return None
+    git_dir, common_dir = git_dirs
+    try:
+        head = git_dir.joinpath('HEAD').read_text(encoding='utf-8').strip()
+    except OSError:
+        return None
+    head_ref = _stat_signature(common_dir.joinpath(head[len('ref: '):])) \
+        if head.startswith('ref: ') else (0, 0, 0)
+    index = _stat_signature(git_dir.joinpath('index'))
+    if max(head_ref[0], index[0]) > time.time_ns() - _RACY_INTERVAL_NS:
+        return None
+    signature: t.Tuple[t.Any, ...] = (head, head_ref, index, tag_refs_fingerprint(common_dir))
+    if worktree and folder.joinpath('.git').exists():
+        fingerprint = worktree_fingerprint(git_dir, folder)
+        if fingerprint is None:
+            return None
+        signature += (fingerprint,)
+    return signature
+
+
+def _folder_signature(
+        path: pathlib.Path, search_parent_directories: bool,
+        worktree: bool) -> t.Optional[t.Tuple[t.Any, ...]]:
+    """Get signature of state of sources of version information of a given folder.
+
+    It consists of the state of the first git repository found at the path (or, if searched,
+    in its parents), and of status of the folder and its parent, which changes when project files
+    or package metadata are added or removed. Return None if the state cannot be reliably
+    determined, for example if some of it changed very recently.
+    """
+    folders = [path, path.parent]
+    stats = tuple(_stat_signature(folder) for folder in folders)
+    if max(_[0] for _ in stats) > time.time_ns() - _RACY_INTERVAL_NS:
+        return None
+    folder = _git_repo_folder(path, search_parent_directories)
+    if folder is None:
+        return stats
+    signature = _git_signature(folder, worktree)
+    if signature is None:
+        return None
+    return (*stats, str(folder), *signature)
+
+
+class VersionQueryService:
+    """Answer version queries from many threads, reusing results while the sources don't change.
+
+    Results are kept in a bounded cache with least-recently-used eviction. A cached result
+    is used only if signature of the sources of version information is unchanged. For git
+    repositories, the signature covers HEAD, references and the index, and if track_worktree
+    is True, also status of all tracked files (otherwise, changes of files which are not staged
+    are not noticed when predicting version).
+
+    Concurrent identical requests are coalesced: only one of them is computed, and the other
+    ones wait for its outcome.
+
+    Numbers of cache hits, cache misses, and requests that waited for a concurrent identical
+    request, are available in statistics().
+
+    Git repositories are borrowed from a pool of open repositories, so that git processes
+    started by GitPython are reused between requests. Unless a pool is given, the service has
+    its own one, which is closed when the service is closed.
+    """
+
+    # pylint: disable = too-many-instance-attributes
+
+    def __init__(
+            self, max_size: int = 128, track_worktree: bool = False,
+            repo_pool: t.Optional[GitRepoPool] = None):
+        if max_size < 1:
+            raise ValueError(f'maximum size of cache must be positive, not {max_size}')
+        self.max_size = max_size
+        self.track_worktree = track_worktree
+        self._owns_repo_pool = repo_pool is None
+        self.repo_pool = GitRepoPool() if repo_pool is None else repo_pool
+        self._lock = threading.Lock()
+        self._results: t.OrderedDict[_Key, t.Tuple[t.Tuple[t.Any, ...], t.Any]] = \
+            collections.OrderedDict()
+        self._pending: t.Dict[t.Tuple[_Key, t.Any], concurrent.futures.Future] = {}
+        self._statistics: t.Counter[str] = collections.Counter(hits=0, misses=0, waits=0)
+
+    def _get(self, function: t.Callable[[pathlib.Path, bool], t.Any], path: pathlib.Path,
+             search_parent_directories: bool) -> t.Any:
+        key = (function.__name__, os.path.abspath(path), search_parent_directories)
+        signature = _folder_signature(path, search_parent_directories, self.track_worktree)
+        with self._lock:
+            entry = self._results.get(key)
+            if signature is not None and entry is not None and entry[0] == signature:
+                self._results.move_to_end(key)
+                self._statistics['hits'] += 1
+                return entry[1]
+            future = self._pending.get((key, signature))
+            is_computing = future is None
+            if future is None:
+                future = concurrent.futures.Future()
+                self._pending[key, signature] = future
+                self._statistics['misses'] += 1
+            else:
+                self._statistics['waits'] += 1
+        if not is_computing:
+            return future.result()
+        with self.repo_pool.activated():
+            try:
+                result = function(path, search_parent_directories)
+            except BaseException as err:
+                with self._lock:
+                    del self._pending[key, signature]
+                future.set_exception(err)
+                raise
+        with self._lock:
+            del self._pending[key, signature]
+            if signature is not None:
+                self._results[key] = (signature, result)
+                self._results.move_to_end(key)
+                while len(self._results) > self.max_size:
+                    self._results.popitem(last=False)
+        future.set_result(result)
+        return result
+
+    def query_folder(
+            self, path: pathlib.Path, search_parent_directories: bool = False) -> Version:
+        """Determine version of code in a given folder, like the function of query module."""
+        return Version.from_version(self._get(query_folder, path, search_parent_directories))
+
+    def predict_folder(
+            self, path: pathlib.Path, search_parent_directories: bool = True) -> Version:
+        """Predict version of code residing in a given folder, like the function of query module."""
+        return Version.from_version(self._get(predict_folder, path, search_parent_directories))
+
+    def folder_version_context(
+            self, path: pathlib.Path,
+            search_parent_directories: bool = True) -> RepoVersionContext:
+        """Determine version information of code in a given folder, like query module does."""
+        return self._get(folder_version_context, path, search_parent_directories)
+
+    def statistics(self) -> t.Dict[str, int]:
+        """Get numbers of cache hits, misses and waits for concurrent requests, and cache size."""
+        with self._lock:
+            return {**self._statistics, 'size': len(self._results)}
+
+    def clear(self) -> None:
+        """Remove all results from the cache."""
+        with self._lock:
+            self._results.clear()
+
+    def close(self) -> None:
+        """Close the pool of git repositories, if it is owned by this service."""
+        if self._owns_repo_pool:
+            self.repo_pool.close()
+
+    def __enter__(self) -> 'VersionQueryService':
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.close()
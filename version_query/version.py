@@ -6,12 +6,14 @@ import itertools
 import logging
 import typing as t
 
-import packaging.version
-import semver
-
 from . import patterns
 from .parser import parse_release_str, parse_pre_release_str, parse_local_str
 
+if t.TYPE_CHECKING:
+    # packaging and semver are imported only when versions are converted from or to their types
+    import packaging.version
+    import semver
+
 _LOG = logging.getLogger(__name__)
 
 PY_PRE_RELEASE_INDICATORS = {'a', 'b', 'c', 'rc'}
@@ -72,8 +74,9 @@ class Version(collections.abc.Hashable):
         return cls(**version_dict)
 
     @classmethod
-    def from_py_version(cls, py_version: packaging.version.Version):
+    def from_py_version(cls, py_version: 'packaging.version.Version'):
         """Create version from a standard Python version object."""
+        import packaging.version  # pylint: disable = import-outside-toplevel
         if not isinstance(py_version, packaging.version.Version):
             _LOG.warning('attempting to parse %s as packaging.version.Version...', type(py_version))
         ver = py_version._version  # pylint: disable = protected-access
@@ -109,8 +112,9 @@ class Version(collections.abc.Hashable):
         return cls(major, minor, patch, pre_release=pre_release, local=local)
 
     @classmethod
-    def from_sem_version(cls, sem_version: t.Union[dict, semver.VersionInfo]):
+    def from_sem_version(cls, sem_version: t.Union[dict, 'semver.VersionInfo']):
         """Create version from semantic version object."""
+        import semver  # pylint: disable = import-outside-toplevel
         _LOG.debug('parsing %s %s', type(sem_version), sem_version)
         local: str | tuple | None
         if isinstance(sem_version, semver.VersionInfo):
@@ -506,10 +510,12 @@ class Version(collections.abc.Hashable):
     def to_dict(self) -> dict:
         return {field[1:]: value for field, value in vars(self).items()}
 
-    def to_py_version(self) -> packaging.version.Version:
+    def to_py_version(self) -> 'packaging.version.Version':
+        import packaging.version  # pylint: disable = import-outside-toplevel
         return packaging.version.Version(self.to_str())
 
-    def to_sem_version(self) -> semver.VersionInfo:
+    def to_sem_version(self) -> 'semver.VersionInfo':
+        import semver  # pylint: disable = import-outside-toplevel
         return semver.VersionInfo.parse(self.to_str())
 
     def __repr__(self):